@@ -0,0 +1,201 @@
+"""
+Analytics Daemon for Course Platform Analytics
+Keeps connections, the course catalog and cached results warm behind a local Unix socket,
+so single get_* requests skip the interpreter's import and connect costs
+"""
+
+from daemon_client import DEFAULT_SOCKET, MAX_MESSAGE_BYTES, RESULT_FORMATS, is_running, method_name
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+
+# The analytics modules are imported by run_daemon(), see daemon_client for the client side
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsDaemon:
+    """
+    Unix socket server answering get_* requests from a warm AsyncAnalyticsEngine
+    
+    The protocol is one JSON object per line in each direction:
+    - {"op": "get", "name": "churn_analysis", "format": "csv"} returns the
+      result as CSV text (or {"columns", "data"} with "format": "json"), or
+      writes it to "path" when one is given
+    - {"op": "ping"} returns the daemon's uptime, request count, pool and cache statistics
+    - {"op": "stop"} shuts the daemon down
+    
+    Requests are served concurrently on the engine's connection pool, and
+    identical concurrent requests share one execution. Results come from the
+    engine's QueryCache while the tables they read are unchanged.
+    """
+    
+    def __init__(self, engine, socket_path: str = DEFAULT_SOCKET, cache=None, catalog=None):
+        """
+        Initialize the daemon
+        
+        Args:
+            engine: Connected AsyncAnalyticsEngine
+            socket_path: Socket to listen on, readable by the current user only
+            cache: QueryCache of the engine, for the statistics
+            catalog: CourseCatalog kept loaded, for the statistics
+        """
+        self.engine = engine
+        self.socket_path = socket_path
+        self.cache = cache
+        self.catalog = catalog
+        self.started = time.time()
+        self.stats = {'requests': 0, 'errors': 0, 'busy_seconds': 0.0}
+        self._stopping: Optional[asyncio.Event] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+    
+    async def get(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one analytic and render or write its result"""
+        fmt = message.get('format', 'csv')
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {fmt} (choose from {', '.join(RESULT_FORMATS)})")
+        dataframe = await self.engine.call(method_name(message['name']))
+        if dataframe is None:
+            raise RuntimeError(f"{method_name(message['name'])} failed, see the daemon log")
+        
+        response = {'ok': True, 'rows': len(dataframe)}
+        path = message.get('path')
+        if path:
+            await self.engine.db.run_blocking(dataframe.to_csv, path, index=False)
+            response['path'] = path
+        elif fmt == 'csv':
+            response['csv'] = dataframe.to_csv(index=False)
+        else:
+            response.update(json.loads(dataframe.to_json(orient='split', index=False, date_format='iso')))
+        return response
+    
+    def status(self) -> Dict[str, Any]:
+        """Uptime, request counts, pool and cache statistics"""
+        status = {'ok': True, 'pid': os.getpid(), 'socket': self.socket_path,
+                  'uptime_seconds': time.time() - self.started, **self.stats,
+                  'pool': self.engine.db.pool_stats()}
+        if self.cache is not None:
+            status['cache'] = dict(self.cache.stats)
+        if self.catalog is not None:
+            status['catalog'] = {'courses': len(self.catalog),
+                                 'bytes': int(self.catalog.memory_usage().sum())}
+        return status
+    
+    async def dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one request"""
+        op = message.get('op')
+        if op == 'get':
+            return await self.get(message)
+        if op == 'ping':
+            return self.status()
+        if op == 'stop':
+            self._stopping.set()
+            return {'ok': True}
+        raise ValueError(f"Unknown operation: {op}")
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of one client connection"""
+        self._clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                started = time.perf_counter()
+                self.stats['requests'] += 1
+                try:
+                    response = await self.dispatch(json.loads(line))
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Request failed: {e}")
+                    response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                seconds = time.perf_counter() - started
+                self.stats['busy_seconds'] += seconds
+                response['seconds'] = seconds
+                writer.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            # ValueError: a request line longer than MAX_MESSAGE_BYTES
+            logger.warning(f"Client connection dropped: {e}")
+        finally:
+            writer.close()
+            self._clients.pop(asyncio.current_task(), None)
+    
+    async def serve(self):
+        """Listen on the socket until a stop request, SIGTERM or SIGINT"""
+        if os.path.exists(self.socket_path):
+            if is_running(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._stopping.set)
+        
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path, limit=MAX_MESSAGE_BYTES)
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Analytics daemon {os.getpid()} listening on {self.socket_path}")
+        try:
+            async with server:
+                await self._stopping.wait()
+            # Closing the idle connections ends their handlers, which finish the request they are serving
+            for writer in list(self._clients.values()):
+                writer.close()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logger.info(f"Analytics daemon stopped after {self.stats['requests']} requests")
+
+async def run_daemon(socket_path: str = DEFAULT_SOCKET, snapshot: Optional[str] = None, engine: str = 'duckdb',
+                     pool_size: int = 4, in_memory: bool = False, catalog_path: Optional[str] = None,
+                     probe_interval: float = 5.0) -> bool:
+    """
+    Connect, warm up and serve until stopped
+    
+    Args:
+        socket_path: Socket to listen on
+        snapshot: Serve an embedded database loaded from this snapshot instead of MySQL
+        engine: Embedded engine used with snapshot, 'duckdb' or 'sqlite'
+        pool_size: Pooled connections, requests run concurrently
+        in_memory: Serve from PandasAnalyticsEngine's pulled tables instead of SQL
+        catalog_path: With in_memory, course catalog snapshot kept mapped
+        probe_interval: Seconds table fingerprints are reused before a cached result is revalidated
+    
+    Returns:
+        bool: True once the daemon stopped after serving, False if it could not start
+    """
+    from async_analytics import AsyncAnalyticsEngine
+    from async_database import AsyncDatabaseConnection
+    from database_connection import DatabaseConnection
+    from main import DB_CONFIG
+    from query_cache import QueryCache
+    
+    if snapshot:
+        from embedded_backend import EmbeddedConnection
+        db = EmbeddedConnection(snapshot, engine=engine)
+    else:
+        db = DatabaseConnection(**DB_CONFIG)
+    async_db = AsyncDatabaseConnection(db, pool_size=pool_size)
+    if not await async_db.connect():
+        logger.error("Failed to connect to database, the daemon is not started")
+        return False
+    
+    try:
+        cache = QueryCache(cache_dir=None, probe_interval=probe_interval)
+        catalog = None
+        if in_memory:
+            from course_catalog import CourseCatalog
+            from pandas_engine import PandasAnalyticsEngine
+            catalog = CourseCatalog.load_cached(catalog_path, db=db, cache=cache) if catalog_path else None
+            analytics = AsyncAnalyticsEngine(async_db, engine=PandasAnalyticsEngine(db, cache=cache, catalog=catalog))
+        else:
+            analytics = AsyncAnalyticsEngine(async_db, cache=cache)
+        await AnalyticsDaemon(analytics, socket_path, cache, catalog).serve()
+        return True
+    finally:
+        await async_db.close()
@@ -5,50 +5,261 @@ Contains all analytics queries and data export functions
 
 import pandas as pd
 from database_connection import DatabaseConnection
+from query_cache import QueryCache
+from incremental_aggregates import IncrementalAggregates
+from sketches import SketchStore
+from exporters import CSVExporter, Exporter, Frames, XLSXExporter, make_exporters
+from rankings import DEFAULT_RANKINGS, ranking_query, validate_rankings
+from query_filters import describe_filters, filter_predicates, retention_window, validate_filters, where_clause
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import os
+import threading
+import time
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (AnalyticsEngine method, CSV file) for every exported analytic
+EXPORT_TASKS = [
+    ('get_user_distribution', 'user_distribution.csv'),
+    ('get_user_registration_trends', 'user_registration_trends.csv'),
+    ('get_course_popularity', 'course_popularity.csv'),
+    ('get_course_rankings', 'course_rankings.csv'),
+    ('get_completion_rates', 'course_completion_rates.csv'),
+    ('get_revenue_metrics', 'revenue_metrics.csv'),
+    ('get_churn_analysis', 'churn_analysis.csv'),
+    ('get_engagement_metrics', 'user_engagement.csv'),
+    ('get_cohort_analysis', 'cohort_analysis.csv'),
+    ('get_platform_kpis', 'platform_kpis.csv')
+]
+
+# Courses listed by get_course_popularity
+POPULARITY_LIMIT = 20
+
 class AnalyticsEngine:
     """Handles all analytics queries and data exports"""
     
-    def __init__(self, db_connection: DatabaseConnection):
+    # Concurrent export workers each get their own connection; engines that
+    # compute from memory set this to share one engine across the workers
+    shares_engine_across_workers = False
+    
+    def __init__(self, db_connection: DatabaseConnection, cache: Optional[QueryCache] = None,
+                 incremental: bool = False, rankings: Optional[Dict[str, int]] = None,
+                 filters: Optional[Dict[str, Any]] = None, sketches: Optional[SketchStore] = None):
         """
         Initialize analytics engine with database connection
         
         Args:
             db_connection: DatabaseConnection instance
+            cache: Optional QueryCache that serves repeated queries without re-running them
+            incremental: Serve registration trends and cohorts from incrementally
+                         maintained summary tables instead of scanning the user table
+            rankings: Course rankings of get_course_rankings, ranking name ('global' or a
+                      course column from rankings.RANKING_KEYS) -> K (default: DEFAULT_RANKINGS)
+            filters: Default time window and filters of every get_* method, see
+                     query_filters.validate_filters (default: all data)
+            sketches: Serve approximate engagement metrics from these activity
+                      sketches instead of COUNT(DISTINCT) queries
         """
         self.db = db_connection
+        self.cache = cache
+        self.rankings = validate_rankings(rankings or DEFAULT_RANKINGS)
+        self.filters = validate_filters(filters)
+        self.aggregates = IncrementalAggregates(db_connection) if incremental else None
+        self.sketches = sketches
+        self._captured = None
+        # Shared scan results of the current export run, see _scan()
+        self._scans = None
+        self._scans_lock = threading.Lock()
+        # Exporters of the current export run, see export_all_analytics()
+        self._exporters = None
         self.export_dir = "data_exports"
         
         # Create export directory if it doesn't exist
         if not os.path.exists(self.export_dir):
             os.makedirs(self.export_dir)
     
-    def get_user_distribution(self) -> pd.DataFrame:
-        """Get user subscription type distribution"""
-        query = """
+    def _filters(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the filters of one call: its own when given, else the engine's"""
+        return self.filters if filters is None else validate_filters(filters)
+    
+    def _fetch(self, name: str, query: str, tables: List[str],
+               params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Run an analytics query, through the result cache when one is configured
+        
+        Args:
+            name: Query name, used for cache TTLs and logging
+            query: SQL query string
+            tables: Base tables the query reads, used for cache invalidation
+            params: Values of the query's named %(name)s parameters
+        
+        Returns:
+            pd.DataFrame: Query results or None if error
+        """
+        if self._captured is not None:
+            self._captured[name] = (query, tables, params)
+            return pd.DataFrame()
+        if self.cache is not None:
+            return self.cache.fetch(self.db, name, query, tables, params,
+                                    loader=lambda: self.db.fetch_dataframe(query, label=name, params=params))
+        return self.db.fetch_dataframe(query, label=name, params=params)
+    
+    def registered_queries(self) -> Dict[str, Tuple[str, List[str], Optional[Dict[str, Any]]]]:
+        """
+        Collect the SQL of every exported analytic without running it
+        
+        Returns:
+            dict: query name -> (SQL query string, base tables it reads, values of its parameters)
+        """
+        self._captured = {}
+        aggregates, self.aggregates = self.aggregates, None
+        try:
+            for method_name, _ in EXPORT_TASKS:
+                getattr(self, method_name)()
+            return self._captured
+        finally:
+            self._captured = None
+            self.aggregates = aggregates
+    
+    def _scan(self, name: str, query: str, tables: List[str],
+              params: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """
+        Run a base table scan, once per export run
+        
+        During export_all_analytics every analytic derived from the same scan
+        shares one result (concurrent callers wait for the first one); outside
+        an export run each call runs the scan.
+        
+        Args:
+            name: Scan name, used like a query name by _fetch
+            query: SQL query string
+            tables: Base tables the scan reads
+            params: Values of the query's named parameters, scans with different values are not shared
+        
+        Returns:
+            pd.DataFrame: Scan result or None if error
+        """
+        key = (name, tuple(sorted((params or {}).items())))
+        with self._scans_lock:
+            scans = self._scans
+            if scans is None or self._captured is not None:
+                future = None
+            elif key in scans:
+                return scans[key].result()
+            else:
+                future = scans[key] = Future()
+        
+        df = None
+        try:
+            df = self._fetch(name, query, tables, params)
+            return df
+        finally:
+            if future is not None:
+                future.set_result(df)
+    
+    def _user_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """
+        Scan user once for the distribution and the user KPIs, users registered in the window
+        
+        Ties are ordered by subscription type with NULL first on every backend
+        (DuckDB sorts NULL last by default), so exports are reproducible.
+        """
+        predicates, params = filter_predicates(self._filters(filters), window='regi_date', country='country')
+        query = f"""
         SELECT
             subscription_type,
             COUNT(*) AS user_count,
-            ROUND(COUNT(*) / (SELECT COUNT(*) FROM user) * 100, 2) AS percentage 
+            ROUND(COUNT(*) / SUM(COUNT(*)) OVER () * 100, 2) AS percentage,
+            COUNT(CASE WHEN is_active = TRUE THEN 1 END) AS active_users
         FROM user
+        {where_clause(predicates)}
         GROUP BY subscription_type
-        ORDER BY user_count DESC
+        ORDER BY user_count DESC, subscription_type IS NOT NULL, subscription_type
         """
-        return self.db.fetch_dataframe(query)
+        return self._scan('user_scan', query, ['user'], params)
     
-    def get_user_registration_trends(self) -> pd.DataFrame:
+    def _subscription_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Scan subscriptions once for churn, revenue and recurring revenue, subscriptions started in the window, by plan"""
+        predicates, params = filter_predicates(self._filters(filters), date_window='start_date',
+                                               plan_type='plan_type', user_id='user_id')
+        query = f"""
+        SELECT
+            plan_type,
+            COUNT(*) AS total_subscriptions,
+            COUNT(CASE WHEN status = 'cancelled' THEN 1 END) AS churned,
+            ROUND(COUNT(CASE WHEN status = 'cancelled' THEN 1 END) * 100.0/COUNT(*), 2) AS churn_rate,
+            COUNT(CASE WHEN status = 'active' THEN 1 END) AS active_subscriptions,
+            SUM(CASE WHEN status = 'active' THEN monthely_fee END) AS monthly_revenue,
+            AVG(CASE WHEN status = 'active' THEN monthely_fee END) AS avg_monthly_fee,
+            SUM(SUM(CASE WHEN status = 'active' THEN monthely_fee END)) OVER () AS monthly_recurring_revenue
+        FROM subscriptions
+        {where_clause(predicates)}
+        GROUP BY plan_type
+        ORDER BY plan_type IS NOT NULL, plan_type
+        """
+        return self._scan('subscription_scan', query, ['subscriptions'] + (['user'] if 'country' in params else []),
+                          params)
+    
+    def _catalog_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Read the course count of the subject and the average rating of enrollments in the window"""
+        filters = self._filters(filters)
+        course_predicates, params = filter_predicates(filters, subject='subject')
+        rating_predicates, rating_params = filter_predicates(filters, window='erp_date', course_id='course_id',
+                                                             user_id='user_id')
+        params.update(rating_params)
+        query = f"""
+        SELECT
+            (SELECT COUNT(*) FROM course {where_clause(course_predicates)}) AS total_courses,
+            (SELECT AVG(rating_given) FROM erp WHERE rating_given IS NOT NULL {where_clause(rating_predicates, 'AND')}) AS avg_course_rating
+        """
+        return self._scan('catalog_scan', query, ['course', 'erp'] + (['user'] if 'country' in params else []),
+                          params)
+    
+    def _course_filters(self, filters: Dict[str, Any]) -> Tuple[List[str], List[str], Dict[str, Any]]:
+        """
+        Predicates of the per-course enrollment aggregations
+        
+        Returns:
+            tuple: (predicates on the courses c, predicates on the enrollments e
+            counted, applied in the join, bound parameters)
+        """
+        course_predicates, params = filter_predicates(filters, subject='c.subject')
+        enrollment_predicates, enrollment_params = filter_predicates(filters, window='e.erp_date',
+                                                                     user_id='e.user_id')
+        params.update(enrollment_params)
+        return course_predicates, enrollment_predicates, params
+    
+    def _ranking_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Aggregate enrollments per course once and rank the courses for every ranking"""
+        course_predicates, enrollment_predicates, params = self._course_filters(self._filters(filters))
+        query = ranking_query(self.rankings, course_predicates, enrollment_predicates)
+        return self._scan('course_rankings', query, ['course', 'erp'] + (['user'] if 'country' in params else []),
+                          params)
+    
+    def get_user_distribution(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get user subscription type distribution"""
+        users = self._user_scan(filters)
+        if users is None or self._captured is not None:
+            return users
+        return users[['subscription_type', 'user_count', 'percentage']]
+    
+    def get_user_registration_trends(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """Get premium vs free users trend over time"""
-        query = """
+        filters = self._filters(filters)
+        if self.aggregates is not None and not filters and self.aggregates.refresh():
+            return self.aggregates.registration_trends()
+        
+        predicates, params = filter_predicates(filters, window='regi_date', country='country')
+        query = f"""
         SELECT 
             DATE_FORMAT(regi_date, '%Y-%m') AS month,
             subscription_type,
             COUNT(*) AS new_users
         FROM user
+        {where_clause(predicates)}
         GROUP BY 
             month,
             subscription_type
@@ -56,11 +267,26 @@ class AnalyticsEngine:
             month, 
             subscription_type
         """
-        return self.db.fetch_dataframe(query)
+        return self._fetch('user_registration_trends', query, ['user'], params)
     
-    def get_course_popularity(self) -> pd.DataFrame:
-        """Get course popularity analysis"""
-        query = """
+    def get_course_popularity(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Get course popularity analysis
+        
+        Taken from the global ranking when it holds at least POPULARITY_LIMIT
+        courses, so an export run aggregates enrollments per course once.
+        """
+        filters = self._filters(filters)
+        if self.rankings.get('global', 0) >= POPULARITY_LIMIT:
+            ranked = self._ranking_scan(filters)
+            if ranked is None or self._captured is not None:
+                return ranked
+            top = ranked[(ranked['ranking'] == 'global') & (ranked['course_rank'] <= POPULARITY_LIMIT)]
+            return top[['course_title', 'instructor_name', 'subject', 'total_enrollments',
+                        'avg_rating', 'price']].reset_index(drop=True)
+        
+        course_predicates, enrollment_predicates, params = self._course_filters(filters)
+        query = f"""
         SELECT
             c.course_title,
             c.instructor_name,
@@ -69,16 +295,37 @@ class AnalyticsEngine:
             AVG(e.rating_given) as avg_rating,
             c.price
         FROM course c
-        LEFT JOIN erp e ON c.course_id = e.course_id
-        GROUP BY c.course_id
-        ORDER BY total_enrollments DESC
-        LIMIT 20
+        LEFT JOIN erp e ON c.course_id = e.course_id {where_clause(enrollment_predicates, 'AND')}
+        {where_clause(course_predicates)}
+        GROUP BY c.course_id, c.course_title, c.instructor_name, c.subject, c.price
+        ORDER BY total_enrollments DESC, c.course_id
+        LIMIT {POPULARITY_LIMIT}
         """
-        return self.db.fetch_dataframe(query)
+        return self._fetch('course_popularity', query, ['course', 'erp'] + (['user'] if 'country' in params else []),
+                           params)
     
-    def get_completion_rates(self) -> pd.DataFrame:
-        """Get course completion rates by level"""
-        query = """
+    def get_course_rankings(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Get the most enrolled courses overall and per group
+        
+        Returns the top K courses of every ranking in self.rankings, by default
+        the global top 20 and the top 10 of each subject and instructor. Ties
+        are broken by course_id. Enrollments are counted within the window.
+        
+        Args:
+            filters: Time window and filters, see query_filters (default: the engine's)
+        
+        Returns:
+            pd.DataFrame: ranking, group_value (NULL for 'global'), course_rank,
+            course_title, instructor_name, subject, total_enrollments, avg_rating, price
+        """
+        return self._ranking_scan(filters)
+    
+    def get_completion_rates(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get course completion rates by level, of enrollments in the window"""
+        predicates, params = filter_predicates(self._filters(filters), window='e.erp_date', subject='c.subject',
+                                               user_id='e.user_id')
+        query = f"""
         SELECT
             c.level,
             COUNT(*) as total_enrollments,
@@ -89,133 +336,382 @@ class AnalyticsEngine:
             ) as completion_rate
         FROM course c
         JOIN erp e ON c.course_id = e.course_id
+        {where_clause(predicates)}
         GROUP BY c.level
         """
-        return self.db.fetch_dataframe(query)
+        return self._fetch('completion_rates', query, ['course', 'erp'] + (['user'] if 'country' in params else []),
+                           params)
     
-    def get_revenue_metrics(self) -> pd.DataFrame:
+    def get_revenue_metrics(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """Get revenue analysis by subscription plan"""
-        query = """
-        SELECT 
-            s.plan_type,
-            COUNT(*) as active_subscriptions,
-            SUM(s.monthely_fee) as monthly_revenue,
-            AVG(s.monthely_fee) as avg_monthly_fee
-        FROM subscriptions s
-        WHERE s.status = 'active'
-        GROUP BY s.plan_type
-        """
-        return self.db.fetch_dataframe(query)
+        subscriptions = self._subscription_scan(filters)
+        if subscriptions is None or self._captured is not None:
+            return subscriptions
+        active = subscriptions[subscriptions['active_subscriptions'] > 0]
+        return active[['plan_type', 'active_subscriptions', 'monthly_revenue',
+                       'avg_monthly_fee']].reset_index(drop=True)
     
-    def get_churn_analysis(self) -> pd.DataFrame:
+    def get_churn_analysis(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """Get churn analysis by plan type"""
-        query = """
+        subscriptions = self._subscription_scan(filters)
+        if subscriptions is None or self._captured is not None:
+            return subscriptions
+        return subscriptions[['plan_type', 'total_subscriptions', 'churned', 'churn_rate']]
+    
+    def get_engagement_metrics(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Get user engagement metrics by subscription type
+        
+        Enrollments and interactions are aggregated separately (interactions
+        per user first) and the compact summaries are joined afterwards.
+        Joining erp and course_interactions directly on user_id would build a
+        per-user cross product, quadratic in per-user activity, and weight each
+        enrollment's progress by the user's interaction count.
+        
+        The window applies to enrollments and interactions, the subject to
+        their courses and the country to the users. With activity sketches,
+        windowed or unfiltered calls are answered approximately from them.
+        """
+        filters = self._filters(filters)
+        if self.sketches is not None and self.sketches.supports(filters) and self.sketches.refresh(self.db):
+            return self.sketches.engagement_metrics(filters)
+        user_predicates, params = filter_predicates(filters, country='u.country')
+        enrollment_predicates, enrollment_params = filter_predicates(filters, window='e.erp_date',
+                                                                     course_id='e.course_id')
+        interaction_predicates, interaction_params = filter_predicates(filters, window='interaction_data',
+                                                                       course_id='course_id')
+        params.update(enrollment_params)
+        params.update(interaction_params)
+        query = f"""
         SELECT
-            s.plan_type,
-            COUNT(*) as total_subscriptions,
-            COUNT(CASE WHEN s.status = 'cancelled' THEN 1 END) as churned,
-            ROUND(COUNT(CASE WHEN s.status = 'cancelled' THEN 1 END)* 100.0/COUNT(*), 2) as churn_rate
-        FROM subscriptions s
-        GROUP BY s.plan_type
-        """
-        return self.db.fetch_dataframe(query)
-    
-    def get_engagement_metrics(self) -> pd.DataFrame:
-        """Get user engagement metrics by subscription type"""
-        query = """
-        SELECT 
-            u.subscription_type,
-            COUNT(DISTINCT e.course_id) as avg_courses_enrolled,
-            AVG(e.progress_per) as avg_completion_rate,
-            COUNT(DISTINCT ci.interaction_id) as total_interactions
-        FROM user u
-        LEFT JOIN erp e ON u.user_id = e.user_id
-        LEFT JOIN course_interactions ci ON u.user_id = ci.user_id
-        GROUP BY u.subscription_type
+            g.subscription_type,
+            g.avg_courses_enrolled,
+            g.avg_completion_rate,
+            CAST(COALESCE(i.total_interactions, 0) AS SIGNED) as total_interactions
+        FROM (
+            SELECT
+                u.subscription_type,
+                COUNT(DISTINCT e.course_id) as avg_courses_enrolled,
+                AVG(e.progress_per) as avg_completion_rate
+            FROM user u
+            LEFT JOIN erp e ON u.user_id = e.user_id {where_clause(enrollment_predicates, 'AND')}
+            {where_clause(user_predicates)}
+            GROUP BY u.subscription_type
+        ) g
+        LEFT JOIN (
+            SELECT
+                u.subscription_type,
+                SUM(ci.interactions) as total_interactions
+            FROM user u
+            JOIN (
+                SELECT user_id, COUNT(*) as interactions
+                FROM course_interactions
+                {where_clause(interaction_predicates)}
+                GROUP BY user_id
+            ) ci ON u.user_id = ci.user_id
+            {where_clause(user_predicates)}
+            GROUP BY u.subscription_type
+        ) i ON COALESCE(i.subscription_type, '') = COALESCE(g.subscription_type, '')
         """
-        return self.db.fetch_dataframe(query)
+        tables = ['user', 'erp', 'course_interactions'] + (['course'] if 'subject' in params else [])
+        return self._fetch('engagement_metrics', query, tables, params)
     
-    def get_cohort_analysis(self) -> pd.DataFrame:
-        """Get cohort analysis for user retention"""
-        query = """
+    def get_cohort_analysis(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Get cohort analysis for user retention
+        
+        Cohorts are the users registered in the window. A user is retained
+        when they logged in during the 30 days before the window end, or
+        before NOW() when the window is open-ended. user_id is the primary
+        key, so users are counted with COUNT(*) rather than COUNT(DISTINCT).
+        """
+        filters = self._filters(filters)
+        if self.aggregates is not None and not filters and self.aggregates.refresh():
+            return self.aggregates.cohort_analysis()
+        
+        predicates, params = filter_predicates(filters, window='u.regi_date', country='u.country')
+        active, active_params = retention_window(filters)
+        params.update(active_params)
+        query = f"""
         SELECT
             DATE_FORMAT(u.regi_date, '%Y-%m') as registration_month,
-            COUNT(DISTINCT u.user_id) as total_users,
-            COUNT(DISTINCT CASE WHEN u.last_login >= DATE_SUB(NOW(), INTERVAL 30 DAY) THEN u.user_id END) as active_last_30_days,
+            COUNT(*) as total_users,
+            COUNT(CASE WHEN {active} THEN 1 END) as active_last_30_days,
             ROUND(
-                COUNT(DISTINCT CASE WHEN u.last_login >= DATE_SUB(NOW(), INTERVAL 30 DAY) THEN u.user_id END) * 100.0/ COUNT(DISTINCT u.user_id),
+                COUNT(CASE WHEN {active} THEN 1 END) * 100.0/ COUNT(*),
                 2
             ) as retention_rate
         FROM user u
+        {where_clause(predicates)}
         GROUP BY DATE_FORMAT(u.regi_date, '%Y-%m')
         ORDER BY registration_month
         """
-        return self.db.fetch_dataframe(query)
+        return self._fetch('cohort_analysis', query, ['user'], params)
     
-    def get_platform_kpis(self) -> pd.DataFrame:
-        """Get overall platform KPIs"""
-        query = """
-        SELECT
-            (SELECT COUNT(*) FROM user WHERE is_active = TRUE) as total_active_users,
-            (SELECT COUNT(*) FROM user WHERE subscription_type != 'free') as paid_users,
-            (SELECT COUNT(*) FROM course) as total_courses,
-            (SELECT SUM(monthely_fee) FROM subscriptions WHERE status = 'active') as monthly_recurring_revenue,
-            (SELECT AVG(rating_given) FROM erp WHERE rating_given IS NOT NULL) as avg_course_rating
+    def get_platform_kpis(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """
-        return self.db.fetch_dataframe(query)
+        Get overall platform KPIs
+        
+        Derived from the user, subscription and catalog scans, so an export run
+        reads each base table once, and each KPI is filtered like its scan.
+        Recurring revenue is summed in SQL to keep the exact DECIMAL total.
+        """
+        filters = self._filters(filters)
+        users = self._user_scan(filters)
+        subscriptions = self._subscription_scan(filters)
+        catalog = self._catalog_scan(filters)
+        if self._captured is not None:
+            return pd.DataFrame()
+        if users is None or subscriptions is None or catalog is None:
+            return None
+        
+        paid = users['subscription_type'].notna() & (users['subscription_type'] != 'free')
+        return pd.DataFrame([{
+            'total_active_users': int(users['active_users'].sum()),
+            'paid_users': int(users.loc[paid, 'user_count'].sum()),
+            'total_courses': catalog['total_courses'].iloc[0],
+            'monthly_recurring_revenue': (subscriptions['monthly_recurring_revenue'].iloc[0]
+                                          if len(subscriptions) else None),
+            'avg_course_rating': catalog['avg_course_rating'].iloc[0]
+        }])
     
-    def export_to_csv(self, dataframe: pd.DataFrame, filename: str):
+    def export_to_csv(self, dataframe: Frames, filename: str):
         """
         Export DataFrame to CSV file
         
         Args:
-            dataframe: pandas DataFrame to export
+            dataframe: pandas DataFrame or pyarrow Table to export, or an iterable
+                       of chunks (e.g. from DatabaseConnection.fetch_iter) that is
+                       streamed to disk one chunk at a time
             filename: name of the CSV file
         """
-        if dataframe is not None and not dataframe.empty:
-            filepath = os.path.join(self.export_dir, filename)
-            dataframe.to_csv(filepath, index=False)
-            logger.info(f"Exported {len(dataframe)} rows to {filepath}")
+        CSVExporter(self.export_dir).export(dataframe, os.path.splitext(filename)[0])
+    
+    def export_query_to_csv(self, query: str, filename: str, chunksize: int = 50000, as_arrow: bool = False):
+        """
+        Stream an ad-hoc query straight to a CSV file with bounded memory
+        
+        Args:
+            query: SQL query string
+            filename: name of the CSV file
+            chunksize: Number of rows fetched and written per chunk
+            as_arrow: Stream Arrow record batches to pyarrow's CSV writer instead
+                      of DataFrames to to_csv (requires pyarrow)
+        """
+        self.export_to_csv(self.db.fetch_iter(query, chunksize, as_arrow=as_arrow), filename)
+    
+    def export_all_analytics(self, max_workers: int = 1,
+                             formats: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Export all analytics data to CSV files, or the other formats in exporters.EXPORTERS
+        
+        With max_workers > 1 the queries run concurrently on a thread pool,
+        each worker on its own database connection (or on connections checked
+        out of the pool when the DatabaseConnection is pooled), and CSV files are written
+        by a separate writer thread so the query threads never block on disk.
+        Analytics derived from the same base table scan share one scan result.
+        
+        Args:
+            max_workers: Number of queries run at the same time
+            formats: Export formats, e.g. ['csv', 'parquet', 'xlsx'] (default: ['csv']).
+                     'xlsx' writes one analytics_dashboard.xlsx with a sheet per analytic.
+        
+        Returns:
+            list: Per-query timings with name, rows, query_seconds, export_seconds
+            and <format>_seconds / <format>_bytes for every format
+        """
+        logger.info(f"Starting analytics data export ({describe_filters(self.filters)})...")
+        started = time.perf_counter()
+        self._exporters = make_exporters(formats or ['csv'], self.export_dir)
+        self._scans = {}
+        
+        try:
+            timings = self._run_exports(max_workers)
+            format_totals = self._close_exporters(timings)
+        finally:
+            self._scans = None
+            self._exporters = None
+        
+        self._log_timing_summary(timings, time.perf_counter() - started)
+        self._log_format_summary(format_totals)
+        logger.info("Analytics data export completed!")
+        return timings
+    
+    def _run_exports(self, max_workers: int) -> List[Dict]:
+        """Run every export task, sequentially or on a thread pool"""
+        if max_workers > 1:
+            timings = self._export_concurrently(max_workers)
         else:
-            logger.warning(f"No data to export for {filename}")
+            timings = []
+            for method_name, filename in EXPORT_TASKS:
+                timing = {'name': method_name}
+                query_started = time.perf_counter()
+                dataframe = getattr(self, method_name)()
+                timing['query_seconds'] = time.perf_counter() - query_started
+                self._timed_export(dataframe, filename, timing)
+                timings.append(timing)
+        return timings
+    
+    def export_analytic(self, method_name: str, formats: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """
+        Run one exported analytic and write its file in each format
+        
+        The exporters belong to the call, so analytics can be exported one at
+        a time from any thread. 'xlsx' is not accepted, since the workbook
+        holds every analytic; see pipeline.workbook_task.
+        
+        Args:
+            method_name: Method of EXPORT_TASKS
+            formats: File formats (default: ['csv'])
+        
+        Returns:
+            dict: Timing like those of export_all_analytics plus the 'paths'
+            written, None if the analytic failed
+        """
+        filename = dict(EXPORT_TASKS)[method_name]
+        exporters = make_exporters(formats or ['csv'], self.export_dir)
+        if any(isinstance(exporter, XLSXExporter) for exporter in exporters):
+            raise ValueError("export_analytic writes one file per analytic, xlsx needs all of them")
+        
+        timing = {'name': method_name}
+        query_started = time.perf_counter()
+        dataframe = getattr(self, method_name)()
+        timing['query_seconds'] = time.perf_counter() - query_started
+        if dataframe is None:
+            return None
+        self._timed_export(dataframe, filename, timing, exporters)
+        name = os.path.splitext(filename)[0]
+        timing['paths'] = [exporter.path(name) for exporter in exporters if os.path.exists(exporter.path(name))]
+        return timing
     
-    def export_all_analytics(self):
-        """Export all analytics data to CSV files"""
-        logger.info("Starting analytics data export...")
+    def _timed_export(self, dataframe: pd.DataFrame, filename: str, timing: Dict,
+                      exporters: Optional[List[Exporter]] = None):
+        """Export a DataFrame in every format and record rows, time and file size in timing"""
+        export_started = time.perf_counter()
+        name = os.path.splitext(filename)[0]
+        profiler = getattr(self.db, 'profiler', None)
         
-        # Export user analytics
-        user_dist = self.get_user_distribution()
-        self.export_to_csv(user_dist, "user_distribution.csv")
+        for exporter in exporters or self._exporters:
+            format_started = time.perf_counter()
+            if profiler is None:
+                self._export_one(exporter, dataframe, name, timing)
+            else:
+                # Named like the query so the report lines up fetch and export per analytic
+                with profiler.stage(f'export_{exporter.format}', timing['name'][len('get_'):]) as record:
+                    self._export_one(exporter, dataframe, name, timing)
+                    record['rows'] = 0 if dataframe is None else len(dataframe)
+                    record['bytes'] = timing.get(f'{exporter.format}_bytes')
+            timing[f'{exporter.format}_seconds'] = time.perf_counter() - format_started
         
-        user_trends = self.get_user_registration_trends()
-        self.export_to_csv(user_trends, "user_registration_trends.csv")
+        timing['rows'] = 0 if dataframe is None else len(dataframe)
+        timing['export_seconds'] = time.perf_counter() - export_started
+    
+    @staticmethod
+    def _export_one(exporter: Exporter, dataframe: pd.DataFrame, name: str, timing: Dict):
+        """Export with one exporter and record the size of the file it wrote"""
+        exporter.export(dataframe, name)
+        filepath = exporter.path(name)
+        # The workbook is only written on close, its size is reported per format
+        if not isinstance(exporter, XLSXExporter) and os.path.exists(filepath):
+            timing[f'{exporter.format}_bytes'] = os.path.getsize(filepath)
+    
+    def _close_exporters(self, timings: List[Dict]) -> Dict[str, Dict]:
+        """
+        Finalize the exporters and total export time and file size per format
         
-        # Export course analytics
-        course_pop = self.get_course_popularity()
-        self.export_to_csv(course_pop, "course_popularity.csv")
+        Returns:
+            dict: format -> {'seconds': total export time, 'bytes': total file size}
+        """
+        totals = {}
+        for exporter in self._exporters:
+            close_started = time.perf_counter()
+            path = exporter.close()
+            seconds = sum(timing.get(f'{exporter.format}_seconds', 0) for timing in timings)
+            size = sum(timing.get(f'{exporter.format}_bytes', 0) for timing in timings)
+            if path is not None and os.path.exists(path):
+                size += os.path.getsize(path)
+            totals[exporter.format] = {'seconds': seconds + time.perf_counter() - close_started, 'bytes': size}
+        return totals
+    
+    def worker_engine(self) -> 'AnalyticsEngine':
+        """
+        Return an engine for another worker thread
         
-        completion_rates = self.get_completion_rates()
-        self.export_to_csv(completion_rates, "course_completion_rates.csv")
+        Pooled connections are checked out per query and in-memory engines are
+        shared, so both get this engine. Otherwise the copy runs on a new
+        connection of its own, which the caller closes, and shares this
+        engine's cache, options and the scan results of the current export run.
         
-        # Export revenue analytics
-        revenue = self.get_revenue_metrics()
-        self.export_to_csv(revenue, "revenue_metrics.csv")
+        Returns:
+            AnalyticsEngine: This engine or a connected copy
+        """
+        if self.db.pool is not None or self.shares_engine_across_workers:
+            return self
+        worker_db = self.db.clone()
+        if not worker_db.connect():
+            raise ConnectionError("Worker could not connect to database")
+        engine = AnalyticsEngine(worker_db, cache=self.cache, incremental=self.aggregates is not None,
+                                 rankings=self.rankings, filters=self.filters, sketches=self.sketches)
+        engine.export_dir = self.export_dir
+        engine._scans, engine._scans_lock = self._scans, self._scans_lock
+        return engine
+    
+    def _export_concurrently(self, max_workers: int) -> List[Dict]:
+        """Run the export queries on a thread pool with one connection per worker"""
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
         
-        churn = self.get_churn_analysis()
-        self.export_to_csv(churn, "churn_analysis.csv")
+        def worker_engine() -> 'AnalyticsEngine':
+            if not hasattr(local, 'engine'):
+                local.engine = self.worker_engine()
+                if local.engine is not self:
+                    with connections_lock:
+                        connections.append(local.engine.db)
+            return local.engine
         
-        # Export engagement analytics
-        engagement = self.get_engagement_metrics()
-        self.export_to_csv(engagement, "user_engagement.csv")
+        def run_query(method_name: str, filename: str, timing: Dict):
+            query_started = time.perf_counter()
+            try:
+                dataframe = getattr(worker_engine(), method_name)()
+            except Exception as e:
+                logger.error(f"Error running {method_name}: {e}")
+                dataframe = None
+            timing['query_seconds'] = time.perf_counter() - query_started
+            return writer.submit(self._timed_export, dataframe, filename, timing)
         
-        cohort = self.get_cohort_analysis()
-        self.export_to_csv(cohort, "cohort_analysis.csv")
+        timings = [{'name': method_name} for method_name, _ in EXPORT_TASKS]
         
-        # Export KPIs
-        kpis = self.get_platform_kpis()
-        self.export_to_csv(kpis, "platform_kpis.csv")
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='csv-writer') as writer:
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export-query') as pool:
+                    query_futures = [
+                        pool.submit(run_query, method_name, filename, timing)
+                        for (method_name, filename), timing in zip(EXPORT_TASKS, timings)
+                    ]
+                    write_futures = [future.result() for future in query_futures]
+                for future in write_futures:
+                    future.result()
+        finally:
+            for worker_db in connections:
+                worker_db.close()
         
-        logger.info("Analytics data export completed!")
+        return timings
+    
+    def _log_timing_summary(self, timings: List[Dict], total_seconds: float):
+        """Log per-query timings, slowest first, so the critical path is visible"""
+        logger.info(f"{'query':<32} {'rows':>8} {'query s':>9} {'export s':>9}")
+        for timing in sorted(timings, key=lambda t: t.get('query_seconds', 0) + t.get('export_seconds', 0),
+                             reverse=True):
+            logger.info(f"{timing['name']:<32} {timing.get('rows', 0):>8} "
+                        f"{timing.get('query_seconds', 0):>9.3f} {timing.get('export_seconds', 0):>9.3f}")
+        logger.info(f"Total export wall time: {total_seconds:.3f}s")
+    
+    def _log_format_summary(self, format_totals: Dict[str, Dict]):
+        """Log the total export time and file size of each format"""
+        logger.info(f"{'format':<10} {'export s':>9} {'size KB':>10}")
+        for fmt, totals in format_totals.items():
+            logger.info(f"{fmt:<10} {totals['seconds']:>9.3f} {totals['bytes'] / 1024:>10.1f}")
 
 # Test function
 def test_analytics():
@@ -239,4 +735,5 @@ def test_analytics():
         print("[ERROR] Database connection failed")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     test_analytics()
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Async Analytics Engine for Course Platform Analytics
+Serves AnalyticsEngine results to many concurrent viewers from an asyncio event loop
+"""
+
+import asyncio
+import pandas as pd
+from analytics_engine import AnalyticsEngine, EXPORT_TASKS
+from async_database import AsyncDatabaseConnection, InFlight
+from database_connection import DatabaseConnection
+from query_cache import QueryCache
+from typing import Any, Dict, Optional
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Exported AnalyticsEngine methods served by AsyncAnalyticsEngine
+ANALYTICS_METHODS = [method_name for method_name, _ in EXPORT_TASKS]
+
+class AsyncAnalyticsEngine:
+    """
+    asyncio counterpart of AnalyticsEngine
+    
+    Every exported get_* method of AnalyticsEngine is available as a coroutine
+    with the same name. Each call runs the synchronous method on a pooled
+    connection's worker thread. Identical concurrent calls are coalesced: N
+    viewers asking for the same analytic at once share one execution and one
+    result, which callers should treat as read-only.
+    """
+    
+    def __init__(self, db: AsyncDatabaseConnection, engine: Optional[AnalyticsEngine] = None,
+                 cache: Optional[QueryCache] = None, rankings: Optional[Dict[str, int]] = None,
+                 filters: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the async engine
+        
+        Args:
+            db: Connected AsyncDatabaseConnection
+            engine: Engine whose results are served when it shares one engine across
+                    workers (PandasAnalyticsEngine, LiveMetricsService); by default an
+                    AnalyticsEngine per pooled connection runs the queries
+            cache: Optional QueryCache of the per-connection engines
+            rankings: Course rankings of get_course_rankings, see AnalyticsEngine
+            filters: Default time window and filters of the per-connection engines
+        """
+        if engine is not None and not engine.shares_engine_across_workers:
+            raise ValueError(f"{type(engine).__name__} cannot be shared across threads; "
+                             "omit engine to run an AnalyticsEngine per pooled connection")
+        self.db = db
+        self.engine = engine
+        self.cache = cache
+        self.rankings = rankings
+        self.filters = filters
+        self.in_flight = InFlight()
+        # AnalyticsEngine per pooled connection, created on first use
+        self._engines: Dict[int, AnalyticsEngine] = {}
+    
+    def _connection_engine(self, connection: DatabaseConnection) -> AnalyticsEngine:
+        """Return the engine bound to a pooled connection (called on its worker thread)"""
+        engine = self._engines.get(id(connection))
+        if engine is None:
+            engine = self._engines[id(connection)] = AnalyticsEngine(connection, cache=self.cache,
+                                                                     rankings=self.rankings,
+                                                                     filters=self.filters)
+        return engine
+    
+    async def call(self, method_name: str, **params) -> Optional[pd.DataFrame]:
+        """
+        Run an AnalyticsEngine method, sharing the execution with identical concurrent calls
+        
+        Args:
+            method_name: Name of an exported get_* method
+            **params: Keyword arguments of the method
+        
+        Returns:
+            pd.DataFrame: The method's result or None if error
+        """
+        if method_name not in ANALYTICS_METHODS:
+            raise AttributeError(f"Unknown analytics method: {method_name}")
+        
+        def start():
+            if self.engine is not None:
+                return self.db.run_blocking(getattr(self.engine, method_name), **params)
+            return self.db.run(lambda connection: getattr(self._connection_engine(connection), method_name)(**params))
+        
+        key = (method_name, tuple(sorted((name, repr(value)) for name, value in params.items())))
+        return await self.in_flight.run(key, start)
+    
+    async def get_all(self) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        Run every exported analytic concurrently
+        
+        Returns:
+            dict: method name -> result
+        """
+        results = await asyncio.gather(*(self.call(method_name) for method_name in ANALYTICS_METHODS))
+        return dict(zip(ANALYTICS_METHODS, results))
+
+def _async_method(method_name: str):
+    """Build the coroutine method serving one AnalyticsEngine method"""
+    async def method(self, **params) -> Optional[pd.DataFrame]:
+        return await self.call(method_name, **params)
+    method.__name__ = method_name
+    method.__doc__ = f"{getattr(AnalyticsEngine, method_name).__doc__.strip().splitlines()[0]} (coalesced)"
+    return method
+
+for _method_name in ANALYTICS_METHODS:
+    setattr(AsyncAnalyticsEngine, _method_name, _async_method(_method_name))
+
+async def simulate_viewers(engine: AsyncAnalyticsEngine, viewers: int = 100, seed: int = 42) -> Dict:
+    """
+    Serve a burst of dashboard viewers, each asking for a few random analytics at once
+    
+    Args:
+        engine: AsyncAnalyticsEngine to serve from
+        viewers: Number of concurrent viewers
+        seed: Random seed of the viewers' choices
+    
+    Returns:
+        dict: requests made, executions started, seconds taken and the last result per method
+    """
+    rng = random.Random(seed)
+    requests = [method_name for _ in range(viewers)
+                for method_name in rng.sample(ANALYTICS_METHODS, 3)]
+    started = engine.in_flight.stats['started']
+    began = time.perf_counter()
+    results = await asyncio.gather(*(engine.call(method_name) for method_name in requests))
+    return {
+        'requests': len(requests),
+        'executions': engine.in_flight.stats['started'] - started,
+        'seconds': time.perf_counter() - began,
+        'results': dict(zip(requests, results))
+    }
+
+async def test_async_analytics(scale_factor: float = 1, engine: str = 'duckdb',
+                               viewers: int = 100, pool_size: int = 4):
+    """
+    Serve concurrent viewers from synthetic data and check the results against AnalyticsEngine
+    
+    Args:
+        scale_factor: Synthetic data scale factor
+        engine: Embedded engine, 'duckdb' or 'sqlite'
+        viewers: Number of concurrent viewers
+        pool_size: Pooled connections
+    """
+    from embedded_backend import EmbeddedConnection
+    from pandas_engine import compare_frames
+    from synthetic_data import generate_tables, write_snapshot
+    
+    with tempfile.TemporaryDirectory(prefix='async_analytics_') as snapshot_dir:
+        write_snapshot(generate_tables(scale_factor), snapshot_dir)
+        db = AsyncDatabaseConnection(EmbeddedConnection(snapshot_dir, engine=engine), pool_size=pool_size)
+        if not await db.connect():
+            print("[ERROR] Database connection failed")
+            return
+        
+        try:
+            served = await simulate_viewers(AsyncAnalyticsEngine(db), viewers)
+            print(f"{served['requests']} requests from {viewers} viewers ran {served['executions']} "
+                  f"executions in {served['seconds']:.3f}s")
+            
+            expected = AnalyticsEngine(db.db)
+            for method_name, result in served['results'].items():
+                problems = compare_frames(method_name, getattr(expected, method_name)(), result)
+                if problems:
+                    print(f"[ERROR] {method_name}: {'; '.join(problems)}")
+                else:
+                    print(f"[SUCCESS] {method_name} matches the synchronous engine")
+            print(f"Pool statistics: {db.pool_stats()}")
+        finally:
+            await db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Serve concurrent viewers through the async analytics engine")
+    parser.add_argument('--scale-factor', type=float, default=1, help="1 = 10,000 users and 500 courses")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--viewers', type=int, default=100)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(test_async_analytics(args.scale_factor, args.engine, args.viewers, args.pool_size))
@@ -0,0 +1,287 @@
+"""
+Async Database Connection Module for Course Platform Analytics
+asyncio front end to DatabaseConnection with a connection pool and coalescing
+of identical in-flight queries
+"""
+
+import asyncio
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from database_connection import DatabaseConnection
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Mapping, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class InFlight:
+    """
+    Coalesces identical concurrent calls
+    
+    The first caller for a key starts the call; callers arriving while it runs
+    await the same task instead of starting another. Once it completes the key
+    is forgotten, so later callers start a fresh call. A cancelled caller does
+    not cancel the shared call.
+    """
+    
+    def __init__(self):
+        """Initialize an empty in-flight table"""
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'started': 0, 'coalesced': 0}
+    
+    async def run(self, key: Hashable, start: Callable[[], Awaitable]):
+        """
+        Await the call for key, starting it with start() if none is running
+        
+        Args:
+            key: Identity of the call, equal keys share one call
+            start: Returns the awaitable that performs the call
+        
+        Returns:
+            Result of the shared call
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self.stats['started'] += 1
+            task = asyncio.ensure_future(start())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+    
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+class AsyncDatabaseConnection:
+    """
+    asyncio counterpart of DatabaseConnection
+    
+    Holds a pool of connected clones of a DatabaseConnection (MySQL or
+    embedded). Each query checks a connection out of the pool and runs the
+    blocking driver call on a worker thread, so the event loop keeps serving
+    other requests and up to pool_size queries run at once. Identical
+    concurrent fetch_dataframe calls share one query and one result, which
+    callers should treat as read-only. Every query runs to completion once
+    started, even when its caller is cancelled.
+    """
+    
+    def __init__(self, db: Optional[DatabaseConnection] = None, pool_size: int = 4):
+        """
+        Initialize the async connection
+        
+        Args:
+            db: Unconnected or connected DatabaseConnection whose parameters the pool
+                connections copy (default: DatabaseConnection())
+            pool_size: Number of pooled connections, queries run concurrently
+        """
+        if pool_size < 1:
+            raise ValueError(f"pool_size must be at least 1, got {pool_size}")
+        self.db = db or DatabaseConnection()
+        self.pool_size = pool_size
+        self.connections: List[DatabaseConnection] = []
+        self.in_flight = InFlight()
+        self._idle: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Whether connect() opened self.db, which close() then closes again
+        self._opened_db = False
+        self._stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0}
+    
+    async def connect(self) -> bool:
+        """
+        Open the pool connections
+        
+        Returns:
+            bool: True if every connection was established, False otherwise
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='async_db')
+        loop = asyncio.get_running_loop()
+        
+        # Clones of an embedded database share it, so the original must be open first
+        if not self.db.is_connected():
+            if not await loop.run_in_executor(self._executor, self.db.connect):
+                await self.close()
+                return False
+            self._opened_db = True
+        
+        self._idle = asyncio.Queue()
+        for _ in range(self.pool_size):
+            connection = self.db.clone()
+            if not await loop.run_in_executor(self._executor, connection.connect):
+                logger.error("Error opening pooled connection")
+                await self.close()
+                return False
+            self.connections.append(connection)
+            self._idle.put_nowait(connection)
+        logger.info(f"Successfully created async connection pool of {self.pool_size}")
+        return True
+    
+    def is_connected(self) -> bool:
+        """Return True if the pool has been established"""
+        return bool(self.connections)
+    
+    async def _acquire(self) -> DatabaseConnection:
+        """Take an idle connection, waiting without blocking the event loop while every one is in use"""
+        if self._idle is None:
+            raise ConnectionError("No database connection established")
+        if self._idle.empty():
+            self._stats['waits'] += 1
+            wait_started = time.perf_counter()
+            connection = await self._idle.get()
+            self._stats['wait_seconds'] += time.perf_counter() - wait_started
+        else:
+            connection = self._idle.get_nowait()
+        self._stats['checkouts'] += 1
+        return connection
+    
+    def _release(self, connection: DatabaseConnection):
+        """Return a connection to the pool, unless the pool was closed meanwhile"""
+        if self._idle is not None and connection in self.connections:
+            self._idle.put_nowait(connection)
+    
+    @asynccontextmanager
+    async def checkout(self):
+        """
+        Check a connection out of the pool for the duration of an async with block
+        
+        The connection goes back to the pool when the block exits, so work the
+        block hands to other threads must finish inside it; use run() for that.
+        
+        Yields:
+            DatabaseConnection: Connection reserved for the caller
+        """
+        connection = await self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+    
+    async def run(self, operation: Callable[[DatabaseConnection], Any]):
+        """
+        Run a blocking operation(connection) on a worker thread with a pooled connection
+        
+        A worker thread cannot be interrupted, so cancelling the caller does not
+        cancel the operation: it runs to completion and its connection returns
+        to the pool only once it has finished.
+        
+        Args:
+            operation: Called with the checked out DatabaseConnection
+        
+        Returns:
+            The operation's result
+        """
+        connection = await self._acquire()
+        try:
+            job = asyncio.get_running_loop().run_in_executor(self._executor, operation, connection)
+        except BaseException:
+            self._release(connection)
+            raise
+        job.add_done_callback(lambda _: self._release(connection))
+        return await asyncio.shield(job)
+    
+    async def execute_query(self, query: str, params: Optional[Mapping[str, Any]] = None) -> Optional[list]:
+        """
+        Execute SQL query and return results
+        
+        Statements may change data, so they are never coalesced.
+        
+        Args:
+            query: SQL query string
+            params: Values of the query's %(name)s parameters
+        
+        Returns:
+            list: Query results or None if error
+        """
+        if not self.is_connected():
+            logger.error("No database connection established")
+            return None
+        return await self.run(lambda connection: connection.execute_query(query, params))
+    
+    async def fetch_dataframe(self, query: str, label: Optional[str] = None,
+                              params: Optional[Mapping[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """
+        Execute query and return results as pandas DataFrame
+        
+        Concurrent calls with the same query text and parameters share one execution.
+        
+        Args:
+            query: SQL query string
+            label: Name recorded for the query by the profiler
+            params: Values of the query's %(name)s parameters
+        
+        Returns:
+            pd.DataFrame: Query results as DataFrame or None if error
+        """
+        if not self.is_connected():
+            logger.error("No database connection established")
+            return None
+        return await self.in_flight.run(
+            ('fetch_dataframe', query, tuple(sorted((params or {}).items()))),
+            lambda: self.run(lambda connection: connection.fetch_dataframe(query, label=label, params=params)))
+    
+    async def run_blocking(self, function: Callable, *args, **kwargs):
+        """Run a blocking callable on the pool's worker threads without a connection"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args, **kwargs))
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Return pool usage statistics
+        
+        Returns:
+            dict: checkouts, waits, wait_seconds, in_use, pool_size and the
+                  fetches started and coalesced by fetch_dataframe
+        """
+        stats = dict(self._stats)
+        stats['in_use'] = len(self.connections) - (self._idle.qsize() if self._idle is not None else 0)
+        stats['pool_size'] = self.pool_size
+        stats['fetches_started'] = self.in_flight.stats['started']
+        stats['fetches_coalesced'] = self.in_flight.stats['coalesced']
+        return stats
+    
+    async def close(self):
+        """Close the pool connections and stop the worker threads"""
+        for connection in self.connections:
+            connection.close()
+        self.connections = []
+        if self._opened_db:
+            self.db.close()
+            self._opened_db = False
+        self._idle = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info(f"Async connection pool closed ({self.pool_stats()})")
+    
+    async def __aenter__(self) -> 'AsyncDatabaseConnection':
+        if not await self.connect():
+            raise ConnectionError("Database connection failed")
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+# Test connection function
+async def test_async_connection():
+    """Test the async connection with concurrent copies of a sample query"""
+    db = AsyncDatabaseConnection()
+    
+    if await db.connect():
+        test_query = "SELECT COUNT(*) as total_users FROM user"
+        results = await asyncio.gather(*(db.fetch_dataframe(test_query) for _ in range(10)))
+        
+        if results[0] is not None:
+            print("[SUCCESS] Async database connection test successful!")
+            print(f"Total users in database: {results[0]['total_users'].iloc[0]}")
+            print(f"Pool statistics: {db.pool_stats()}")
+        else:
+            print("[ERROR] Query execution failed")
+        
+        await db.close()
+    else:
+        print("[ERROR] Database connection failed")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(test_async_connection())
@@ -0,0 +1,174 @@
+"""
+Benchmark for the Arrow result path
+Compares pulling a multi-million-row erp result through pd.read_sql, fetch_dataframe
+and fetch_arrow, and exporting it from a DataFrame and from the Arrow table
+"""
+
+import numpy as np
+import pandas as pd
+from benchmark_suite import best_time
+from database_connection import DatabaseConnection
+from embedded_backend import EmbeddedConnection
+from exporters import CSVExporter, ParquetExporter
+from typing import Callable, Dict, List
+import argparse
+import logging
+import pyarrow as pa
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+# The pull being measured, every column of every enrollment
+ERP_QUERY = "SELECT * FROM erp"
+
+def synthetic_erp(rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Build an erp table of the given size, with NULL ratings like the real data
+    
+    Args:
+        rows: Number of enrollments
+        seed: Random seed
+    
+    Returns:
+        pd.DataFrame: erp rows
+    """
+    rng = np.random.default_rng(seed)
+    ratings = pd.array(rng.integers(1, 6, size=rows), dtype='Int64')
+    ratings[rng.random(rows) < 0.4] = pd.NA
+    return pd.DataFrame({
+        'erp_id': np.arange(1, rows + 1),
+        'user_id': rng.integers(1, max(rows // 5, 2), size=rows),
+        'course_id': rng.integers(1, 3700, size=rows),
+        'erp_date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 86400, size=rows), unit='s'),
+        'completion_status': rng.choice(['enrolled', 'in_progress', 'completed', 'dropped'], size=rows),
+        'progress_per': rng.integers(0, 101, size=rows),
+        'rating_given': ratings
+    })
+
+def measure(run: Callable, repeat: int = 3) -> Dict:
+    """
+    Time a callable and trace the allocations of one more run
+    
+    Python allocations are traced with tracemalloc; Arrow buffers live in
+    pyarrow's memory pool, so the pool's growth is reported alongside.
+    
+    Returns:
+        dict: seconds (fastest run), python_peak_mb, arrow_mb and the result
+    """
+    seconds, result = best_time(run, repeat)
+    del result
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    try:
+        result = run()
+        python_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'python_peak_mb': python_peak / 1024 / 1024,
+            'arrow_mb': (pa.total_allocated_bytes() - arrow_before) / 1024 / 1024, 'result': result}
+
+def result_mb(result) -> float:
+    """Memory held by a fetched DataFrame or Arrow table"""
+    if isinstance(result, pa.Table):
+        return result.nbytes / 1024 / 1024
+    return result.memory_usage(deep=True).sum() / 1024 / 1024
+
+def benchmark_fetch(db: DatabaseConnection, query: str = ERP_QUERY, repeat: int = 3) -> List[Dict]:
+    """
+    Pull one result through every fetch path
+    
+    Args:
+        db: Connected DatabaseConnection
+        query: Query pulled (MySQL dialect)
+        repeat: Runs per path, the fastest is reported
+    
+    Returns:
+        list: One record per path with rows, seconds, rows_per_sec and memory
+    """
+    def read_sql():
+        # pandas warns about DBAPI connections other than sqlite3, which it still supports
+        with warnings.catch_warnings(), db.checkout() as connection:
+            warnings.simplefilter('ignore', UserWarning)
+            return pd.read_sql(db.translate(query), connection)
+    
+    paths = {
+        'pd.read_sql': read_sql,
+        'fetch_dataframe': lambda: db.fetch_dataframe(query),
+        'fetch_arrow': lambda: db.fetch_arrow(query),
+        'fetch_dataframe(dtype_backend=pyarrow)': lambda: db.fetch_dataframe(query, dtype_backend='pyarrow')
+    }
+    
+    results = []
+    for name, run in paths.items():
+        measured = measure(run, repeat)
+        rows = len(measured['result'])
+        results.append({'path': name, 'rows': rows, 'seconds': measured['seconds'],
+                        'rows_per_sec': rows / measured['seconds'], 'python_peak_mb': measured['python_peak_mb'],
+                        'arrow_mb': measured['arrow_mb'], 'result_mb': result_mb(measured['result'])})
+    return results
+
+def benchmark_export(db: DatabaseConnection, query: str = ERP_QUERY, repeat: int = 3) -> List[Dict]:
+    """
+    Write one result as CSV and Parquet from a DataFrame and from its Arrow table
+    
+    Args:
+        db: Connected DatabaseConnection
+        query: Query exported (MySQL dialect)
+        repeat: Runs per writer, the fastest is reported
+    
+    Returns:
+        list: One record per format and source with rows, seconds and rows_per_sec
+    """
+    sources = {'DataFrame': db.fetch_dataframe(query), 'Arrow': db.fetch_arrow(query)}
+    results = []
+    with tempfile.TemporaryDirectory(prefix='benchmark_arrow_') as export_dir:
+        for exporter in (CSVExporter(export_dir), ParquetExporter(export_dir)):
+            for source, result in sources.items():
+                measured = measure(lambda: exporter.export(result, 'erp'), repeat)
+                results.append({'format': exporter.format, 'source': source, 'rows': measured['result'],
+                                'seconds': measured['seconds'],
+                                'rows_per_sec': measured['result'] / measured['seconds'],
+                                'python_peak_mb': measured['python_peak_mb']})
+    return results
+
+def embedded_erp(rows: int, engine: str) -> EmbeddedConnection:
+    """Open an in-memory embedded database holding a synthetic erp table"""
+    db = EmbeddedConnection(engine=engine)
+    if not db.connect():
+        raise ConnectionError(f"Could not open an embedded {engine} database")
+    started = time.perf_counter()
+    db._create_table('erp')
+    db._insert_frame('erp', synthetic_erp(rows))
+    print(f"Loaded {rows:,} erp rows into {engine} in {time.perf_counter() - started:.1f}s")
+    return db
+
+def main():
+    """Run the fetch and export benchmarks on MySQL or a synthetic embedded erp table"""
+    parser = argparse.ArgumentParser(description="Benchmark the Arrow result path against pd.read_sql")
+    parser.add_argument('--rows', type=int, default=2000000, help="Synthetic erp rows (default: 2,000,000)")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--mysql', action='store_true', help="Pull the erp table of the MySQL database instead")
+    parser.add_argument('--query', default=ERP_QUERY)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    if args.mysql:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+    else:
+        db = embedded_erp(args.rows, args.engine)
+    
+    try:
+        pd.set_option('display.width', 200)
+        print(pd.DataFrame(benchmark_fetch(db, args.query, args.repeat)).round(3).to_string(index=False))
+        print()
+        print(pd.DataFrame(benchmark_export(db, args.query, args.repeat)).round(3).to_string(index=False))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark for the engagement metrics query
+Compares the direct erp x course_interactions join with the pre-aggregated rewrite
+as interactions per user grow
+"""
+
+import numpy as np
+import pandas as pd
+from database_connection import DatabaseConnection
+from analytics_engine import AnalyticsEngine
+import argparse
+import sqlite3
+import tempfile
+import time
+
+# The engagement query before the rewrite, joining both activity tables on user_id
+FAN_OUT_QUERY = """
+SELECT
+    u.subscription_type,
+    COUNT(DISTINCT e.course_id) as avg_courses_enrolled,
+    AVG(e.progress_per) as avg_completion_rate,
+    COUNT(DISTINCT ci.interaction_id) as total_interactions
+FROM user u
+LEFT JOIN erp e ON u.user_id = e.user_id
+LEFT JOIN course_interactions ci ON u.user_id = ci.user_id
+GROUP BY u.subscription_type
+"""
+
+class SQLiteBenchmarkConnection(DatabaseConnection):
+    """DatabaseConnection over an in-memory SQLite database holding synthetic data"""
+    
+    def __init__(self):
+        super().__init__()
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+    
+    def fetch_dataframe(self, query: str, chunksize=None, label=None, params=None):
+        return pd.read_sql(query, self.connection, params=params or None)
+    
+    def close(self):
+        self.connection.close()
+
+def load_synthetic_tables(connection, users: int, enrollments_per_user: int,
+                          interactions_per_user: int, seed: int = 42):
+    """
+    Fill user, erp and course_interactions with synthetic rows
+    
+    Args:
+        connection: sqlite3 connection
+        users: Number of users
+        enrollments_per_user: Enrollments per user
+        interactions_per_user: Course interactions per user
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = np.arange(1, users + 1)
+    
+    pd.DataFrame({
+        'user_id': user_ids,
+        'subscription_type': rng.choice(['free', 'premium', 'pro'], size=users, p=[0.6, 0.3, 0.1])
+    }).to_sql('user', connection, index=False)
+    
+    pd.DataFrame({
+        'erp_id': np.arange(1, users * enrollments_per_user + 1),
+        'user_id': np.repeat(user_ids, enrollments_per_user),
+        'course_id': rng.integers(1, 500, size=users * enrollments_per_user),
+        'progress_per': rng.integers(0, 101, size=users * enrollments_per_user)
+    }).to_sql('erp', connection, index=False)
+    
+    pd.DataFrame({
+        'interaction_id': np.arange(1, users * interactions_per_user + 1),
+        'user_id': np.repeat(user_ids, interactions_per_user),
+        'course_id': rng.integers(1, 500, size=users * interactions_per_user)
+    }).to_sql('course_interactions', connection, index=False)
+    
+    # Mirror the MySQL schema's primary key and foreign key indexes
+    for statement in ("CREATE UNIQUE INDEX pk_user ON user (user_id)",
+                      "CREATE INDEX idx_erp_user ON erp (user_id)",
+                      "CREATE INDEX idx_ci_user ON course_interactions (user_id)"):
+        connection.execute(statement)
+
+def run_benchmark(users: int = 2000, enrollments_per_user: int = 5,
+                  interactions: tuple = (1, 4, 16, 64), repeat: int = 3) -> pd.DataFrame:
+    """
+    Time both engagement queries at growing interactions per user
+    
+    Args:
+        users: Number of synthetic users
+        enrollments_per_user: Enrollments per user
+        interactions: Interactions per user to benchmark
+        repeat: Runs per query, the best time is reported
+    
+    Returns:
+        pd.DataFrame: One row per interactions-per-user setting
+    """
+    results = []
+    
+    for interactions_per_user in interactions:
+        db = SQLiteBenchmarkConnection()
+        load_synthetic_tables(db.connection, users, enrollments_per_user, interactions_per_user)
+        engine = AnalyticsEngine(db)
+        engine.export_dir = tempfile.gettempdir()
+        
+        def best_of(run):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+        
+        joined_rows = db.connection.execute(
+            "SELECT COUNT(*) FROM user u LEFT JOIN erp e ON u.user_id = e.user_id "
+            "LEFT JOIN course_interactions ci ON u.user_id = ci.user_id"
+        ).fetchone()[0]
+        
+        results.append({
+            'interactions_per_user': interactions_per_user,
+            'fan_out_rows': joined_rows,
+            'fan_out_seconds': best_of(lambda: db.fetch_dataframe(FAN_OUT_QUERY)),
+            'pre_aggregated_seconds': best_of(engine.get_engagement_metrics)
+        })
+        db.close()
+    
+    df = pd.DataFrame(results)
+    df['speedup'] = df['fan_out_seconds'] / df['pre_aggregated_seconds']
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the engagement metrics query")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--enrollments', type=int, default=5, help="Enrollments per user")
+    parser.add_argument('--interactions', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help="Interactions per user to benchmark")
+    args = parser.parse_args()
+    
+    print(run_benchmark(args.users, args.enrollments, tuple(args.interactions)).to_string(index=False))
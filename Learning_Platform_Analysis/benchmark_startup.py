@@ -0,0 +1,124 @@
+"""
+Benchmark for command line startup
+Measures the import time of the entry points and the latency of a first get request
+run in a fresh process, through a cold daemon and through a warm one
+"""
+
+from daemon_client import request
+from typing import Dict, List, Optional, Sequence
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Modules timed with "python -c 'import <module>'", the bare interpreter first
+IMPORT_TARGETS = ['', 'cli', 'daemon_client', 'database_connection', 'analytics_engine', 'main',
+                  'check_table_structure', 'import_csv_data']
+
+# Directory of this file, the modules are imported from here
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run_seconds(command: Sequence[str], env: Optional[Dict[str, str]] = None) -> float:
+    """Wall-clock seconds of one subprocess run, raising if it fails"""
+    started = time.perf_counter()
+    subprocess.run(command, cwd=HERE, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def benchmark_imports(repeat: int = 5) -> List[Dict]:
+    """
+    Time importing each entry point in a fresh interpreter
+    
+    Args:
+        repeat: Runs per module, the fastest is reported
+    
+    Returns:
+        list: One record per module with its best and the import's share above a bare interpreter
+    """
+    results = []
+    for module in IMPORT_TARGETS:
+        code = f"import {module}" if module else "pass"
+        seconds = min(run_seconds([sys.executable, '-c', code]) for _ in range(repeat))
+        results.append({'import': module or '(interpreter)', 'ms': seconds * 1000})
+    baseline = results[0]['ms']
+    for result in results:
+        result['import_ms'] = result['ms'] - baseline
+    return results
+
+def benchmark_first_query(snapshot_dir: str, analytic: str = 'churn_analysis', engine: str = 'duckdb',
+                          repeat: int = 5) -> List[Dict]:
+    """
+    Time one get request answered in process, by a cold daemon and by a warm daemon
+    
+    Args:
+        snapshot_dir: Snapshot the embedded database is loaded from
+        analytic: Analytic requested
+        engine: Embedded engine, 'duckdb' or 'sqlite'
+        repeat: Warm runs per path, the fastest is reported
+    
+    Returns:
+        list: One record per path with its latency in milliseconds
+    """
+    cli = [sys.executable, 'cli.py']
+    snapshot = ['--snapshot', os.path.abspath(snapshot_dir), '--engine', engine]
+    results = [{'path': 'cli.py get --no-daemon (fresh process)',
+                'ms': min(run_seconds(cli + ['get', analytic, '--no-daemon'] + snapshot) for _ in range(repeat)) * 1000}]
+    
+    with tempfile.TemporaryDirectory(prefix='benchmark_startup_') as socket_dir:
+        socket_path = os.path.join(socket_dir, 'daemon.sock')
+        env = {**os.environ, 'ANALYTICS_DAEMON_SOCKET': socket_path}
+        daemon = subprocess.Popen(cli + ['daemon'] + snapshot, cwd=HERE, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            started = time.perf_counter()
+            while not os.path.exists(socket_path):
+                if daemon.poll() is not None:
+                    raise RuntimeError("The daemon exited before listening")
+                time.sleep(0.01)
+            results.append({'path': 'daemon start (import, connect, load)', 'ms': (time.perf_counter() - started) * 1000})
+            
+            cold = run_seconds(cli + ['get', analytic], env)
+            results.append({'path': 'cli.py get, cold daemon', 'ms': cold * 1000})
+            warm = min(run_seconds(cli + ['get', analytic], env) for _ in range(repeat))
+            results.append({'path': 'cli.py get, warm daemon', 'ms': warm * 1000})
+            
+            message = {'op': 'get', 'name': analytic}
+            round_trips = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                request(message, socket_path)
+                round_trips.append(time.perf_counter() - started)
+            results.append({'path': 'daemon_client.request, warm daemon', 'ms': min(round_trips) * 1000})
+        finally:
+            # SIGTERM stops the daemon like a stop request
+            daemon.terminate()
+            daemon.wait()
+    return results
+
+def main():
+    """Run the import time and first query latency benchmarks on a synthetic snapshot"""
+    parser = argparse.ArgumentParser(description="Benchmark command line startup and first query latency")
+    parser.add_argument('--snapshot', metavar='DIR',
+                        help="Snapshot to query (default: a synthetic one generated at --scale-factor)")
+    parser.add_argument('--scale-factor', type=float, default=1, help="1 = 10,000 users and 500 courses")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--analytic', default='churn_analysis')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    import pandas as pd
+    print(pd.DataFrame(benchmark_imports(args.repeat)).round(1).to_string(index=False))
+    print()
+    
+    with tempfile.TemporaryDirectory(prefix='benchmark_snapshot_') as workdir:
+        snapshot_dir = args.snapshot
+        if snapshot_dir is None:
+            from synthetic_data import generate_tables, write_snapshot
+            snapshot_dir = os.path.join(workdir, 'snapshot')
+            write_snapshot(generate_tables(args.scale_factor), snapshot_dir)
+        results = benchmark_first_query(snapshot_dir, args.analytic, args.engine, args.repeat)
+    print(pd.DataFrame(results).round(1).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
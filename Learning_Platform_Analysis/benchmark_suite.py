@@ -0,0 +1,305 @@
+"""
+Scale Benchmark Suite for Course Platform Analytics
+Times every analytics query and the course importer on synthetic data at growing
+scale factors and compares runs for regressions
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from embedded_backend import EmbeddedConnection
+from analytics_engine import AnalyticsEngine, EXPORT_TASKS
+from import_csv_data import coerce_course_frame, import_udemy_courses, iter_course_chunks
+from query_filters import filter_predicates, last_months, where_clause
+from sketches import DEFAULT_QUANTILES, ENROLLMENT_ACTIVITY, SketchStore
+from synthetic_data import generate_tables, load_into_database, write_snapshot, write_udemy_csv
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+import argparse
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+def best_time(run: Callable, repeat: int = 3):
+    """
+    Run a callable repeat times
+    
+    Returns:
+        tuple: (fastest wall time in seconds, result of the last run)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def benchmark_queries(db: DatabaseConnection, repeat: int = 3) -> List[Dict]:
+    """
+    Time every exported AnalyticsEngine method
+    
+    Args:
+        db: Connected DatabaseConnection holding the benchmark data
+        repeat: Runs per method, the fastest is reported
+    
+    Returns:
+        list: One {'name', 'seconds', 'rows'} record per method
+    """
+    engine = AnalyticsEngine(db)
+    results = []
+    for method_name, _ in EXPORT_TASKS:
+        seconds, df = best_time(getattr(engine, method_name), repeat)
+        results.append({'name': method_name, 'seconds': seconds, 'rows': 0 if df is None else len(df)})
+    return results
+
+def benchmark_importer(db: DatabaseConnection, csv_path: str, repeat: int = 3) -> List[Dict]:
+    """
+    Time the course importer on a udemy-format CSV
+    
+    The CSV parsing and coercion stage runs everywhere. The load stage is
+    import_udemy_courses on MySQL and the snapshot course loader on the
+    embedded engines, whose drivers do not take MySQL's %s parameters.
+    
+    Args:
+        db: Connected DatabaseConnection holding the benchmark data
+        csv_path: CSV written by synthetic_data.write_udemy_csv
+        repeat: Runs per stage, the fastest is reported
+    
+    Returns:
+        list: {'name', 'seconds', 'rows'} records for the parse and load stages
+    """
+    def parse():
+        return sum(len(coerce_course_frame(chunk)[0]) for chunk in iter_course_chunks(csv_path))
+    
+    parse_seconds, rows = best_time(parse, repeat)
+    results = [{'name': 'import_parse', 'seconds': parse_seconds, 'rows': rows}]
+    
+    if isinstance(db, EmbeddedConnection):
+        load_seconds, loaded = best_time(lambda: db.load_table('course', csv_path), repeat)
+    else:
+        # A second import would collide with the ids of the first, so the load runs once
+        load_seconds, loaded = best_time(lambda: import_udemy_courses(csv_path, db=db), 1)
+    results.append({'name': 'import_load', 'seconds': load_seconds, 'rows': loaded or 0})
+    return results
+
+def _rank_error(values: np.ndarray, estimate: float, q: float) -> float:
+    """Distance from q to the range of ranks estimate has among the sorted exact values"""
+    low = np.searchsorted(values, estimate, side='left') / len(values)
+    high = np.searchsorted(values, estimate, side='right') / len(values)
+    return max(low - q, q - high, 0.0)
+
+def benchmark_sketches(db: DatabaseConnection, sketch_dir: str, repeat: int = 3) -> List[Dict]:
+    """
+    Time and check the activity sketches against the exact queries
+    
+    Builds the sketches, then answers engagement metrics and progress /
+    content duration quantiles for several windows both ways. Distinct count
+    records carry the largest relative error of any count, quantile records
+    the largest rank error of any quantile.
+    
+    Args:
+        db: Connected DatabaseConnection holding the benchmark data
+        sketch_dir: Empty directory for the sketch files
+        repeat: Runs per measurement, the fastest is reported
+    
+    Returns:
+        list: {'name', 'seconds', 'rows', 'max_error'} records
+    """
+    store = SketchStore(sketch_dir)
+    build_seconds, _ = best_time(lambda: store.refresh(db, rebuild=True), 1)
+    results = [{'name': 'sketch_build', 'seconds': build_seconds, 'rows': len(store.periods('day'))}]
+    
+    engine = AnalyticsEngine(db)
+    windows = {'all': {}, 'last_3_months': last_months(3), 'last_12_months': last_months(12)}
+    for label, window in windows.items():
+        exact_seconds, exact = best_time(lambda: engine.get_engagement_metrics(window), repeat)
+        sketch_seconds, approximate = best_time(lambda: store.engagement_metrics(window), repeat)
+        merged = exact.merge(approximate, on='subscription_type', suffixes=('', '_approximate'))
+        errors = [abs(merged[f"{column}_approximate"] / merged[column].where(merged[column] > 0) - 1).max()
+                  for column in ('avg_courses_enrolled', 'total_interactions')]
+        results.append({'name': f"engagement_exact_{label}", 'seconds': exact_seconds, 'rows': len(exact)})
+        results.append({'name': f"engagement_sketch_{label}", 'seconds': sketch_seconds, 'rows': len(approximate),
+                        'max_error': float(np.nanmax(errors)) if len(merged) else None})
+        
+        def exact_quantiles():
+            predicates, params = filter_predicates(window, window='e.erp_date')
+            rows = db.fetch_dataframe(f"{ENROLLMENT_ACTIVITY} {where_clause(predicates)}", params=params)
+            return {segment: {name: np.sort(group[name].dropna().to_numpy(dtype='float64'))
+                              for name in ('progress_per', 'content_duration')}
+                    for segment, group in rows.groupby(rows['subscription_type'].fillna(''))}
+        
+        exact_seconds, exact = best_time(exact_quantiles, repeat)
+        sketch_seconds, approximate = best_time(lambda: store.activity_quantiles(window), repeat)
+        errors = [_rank_error(exact[row['subscription_type'] or ''][column], row[f"{name}_p{q * 100:g}"], q)
+                  for _, row in approximate.iterrows()
+                  for name, column in (('progress', 'progress_per'), ('content_duration', 'content_duration'))
+                  for q in DEFAULT_QUANTILES if len(exact[row['subscription_type'] or ''][column])]
+        results.append({'name': f"quantiles_exact_{label}", 'seconds': exact_seconds, 'rows': len(exact)})
+        results.append({'name': f"quantiles_sketch_{label}", 'seconds': sketch_seconds, 'rows': len(approximate),
+                        'max_error': max(errors) if errors else None})
+    return results
+
+def benchmark_scale(scale_factor: float, workdir: str, engine: str = 'duckdb', seed: int = 42,
+                    repeat: int = 3, mysql_db: Optional[DatabaseConnection] = None,
+                    sketches: bool = False) -> List[Dict]:
+    """
+    Generate data at one scale factor and time the queries and the importer
+    
+    Args:
+        scale_factor: Synthetic data scale factor
+        workdir: Directory for the snapshot and importer CSV
+        engine: Embedded engine, 'duckdb' or 'sqlite'
+        seed: Random seed of the generator
+        repeat: Runs per measurement, the fastest is reported
+        mysql_db: Connected stand-in MySQL database to load and benchmark
+                  instead of the embedded engine (its tables are replaced)
+        sketches: Also benchmark the activity sketches against the exact queries
+    
+    Returns:
+        list: Result records tagged with the scale factor
+    """
+    results = []
+    seconds, tables = best_time(lambda: generate_tables(scale_factor, seed), 1)
+    results.append({'name': 'generate', 'seconds': seconds, 'rows': sum(len(df) for df in tables.values())})
+    
+    snapshot_dir = os.path.join(workdir, f"sf{scale_factor:g}")
+    write_snapshot(tables, snapshot_dir)
+    csv_path = os.path.join(snapshot_dir, 'udemy_courses_synthetic.csv')
+    courses = tables['course']
+    if mysql_db is not None:
+        # New ids, so the importer inserts rather than colliding with the loaded courses
+        courses = courses.assign(course_id=courses['course_id'] + courses['course_id'].max())
+    write_udemy_csv(courses, csv_path)
+    
+    if mysql_db is not None:
+        db = mysql_db
+        seconds, _ = best_time(lambda: load_into_database(db, tables), 1)
+    else:
+        db = EmbeddedConnection(snapshot_dir, engine=engine)
+        seconds, _ = best_time(db.connect, 1)
+    results.append({'name': 'load', 'seconds': seconds, 'rows': results[0]['rows']})
+    del tables, courses
+    
+    try:
+        results += benchmark_queries(db, repeat)
+        results += benchmark_importer(db, csv_path, repeat)
+        if sketches:
+            results += benchmark_sketches(db, os.path.join(snapshot_dir, 'sketches'), repeat)
+    finally:
+        if mysql_db is None:
+            db.close()
+    
+    for result in results:
+        result['scale_factor'] = scale_factor
+    return results
+
+def run_suite(scale_factors: Sequence[float] = (1, 10, 100), engine: str = 'duckdb', seed: int = 42,
+              repeat: int = 3, mysql_db: Optional[DatabaseConnection] = None, sketches: bool = False) -> Dict:
+    """
+    Run the benchmark at every scale factor
+    
+    Returns:
+        dict: Run metadata and a 'results' list of
+              {'scale_factor', 'name', 'seconds', 'rows'} records
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix='analytics_bench_') as workdir:
+        for scale_factor in scale_factors:
+            logger.info(f"Benchmarking scale factor {scale_factor}")
+            results += benchmark_scale(scale_factor, workdir, engine, seed, repeat, mysql_db, sketches)
+    
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'backend': 'mysql' if mysql_db is not None else engine,
+        'seed': seed,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': results
+    }
+
+def save_results(run: Dict, path: str):
+    """Write a suite run as JSON"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    logger.info(f"Wrote benchmark results to {path}")
+
+def compare_results(baseline: Dict, current: Dict, tolerance: float = 1.25) -> pd.DataFrame:
+    """
+    Compare two suite runs measurement by measurement
+    
+    Args:
+        baseline: Earlier run, e.g. loaded from a stored JSON file
+        current: New run
+        tolerance: Slowdown ratio above which a measurement is a regression
+    
+    Returns:
+        pd.DataFrame: scale_factor, name, baseline/current seconds, ratio and a regression flag
+    """
+    columns = ['scale_factor', 'name', 'seconds']
+    merged = pd.DataFrame(baseline['results'])[columns].merge(
+        pd.DataFrame(current['results'])[columns], on=['scale_factor', 'name'],
+        suffixes=('_baseline', '_current'))
+    merged['ratio'] = merged['seconds_current'] / merged['seconds_baseline']
+    merged['regression'] = merged['ratio'] > tolerance
+    return merged
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark the analytics queries and importer at scale")
+    parser.add_argument('--scale-factors', type=float, nargs='+', default=[1, 10, 100],
+                        help="Scale factors to run, 1 = 10,000 users (default: 1 10 100)")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--mysql-database', metavar='NAME',
+                        help="Benchmark this scratch MySQL database instead (its tables are replaced)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join('benchmark_results', f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="Slowdown ratio reported as a regression (default: 1.25)")
+    parser.add_argument('--sketches', action='store_true',
+                        help="Also compare the approximate activity sketches with the exact queries")
+    args = parser.parse_args()
+    
+    mysql_db = None
+    if args.mysql_database:
+        mysql_db = DatabaseConnection(database=args.mysql_database)
+        if not mysql_db.connect():
+            print("[ERROR] Database connection failed")
+            return
+    
+    try:
+        run = run_suite(args.scale_factors, args.engine, args.seed, args.repeat, mysql_db, args.sketches)
+    finally:
+        if mysql_db is not None:
+            mysql_db.close()
+    
+    save_results(run, args.output)
+    print(pd.DataFrame(run['results']).pivot_table(index='name', columns='scale_factor', values='seconds',
+                                                   sort=False).to_string(float_format='%.4f'))
+    if args.sketches:
+        errors = pd.DataFrame(run['results']).dropna(subset=['max_error'])
+        print(errors.pivot_table(index='name', columns='scale_factor', values='max_error',
+                                 sort=False).to_string(float_format='%.4f'))
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_results(json.load(f), run, args.tolerance)
+        print(comparison.to_string(index=False, float_format='%.4f'))
+        regressions = comparison[comparison['regression']]
+        if not regressions.empty:
+            print(f"[WARNING] {len(regressions)} measurements slower than {args.tolerance}x the baseline")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
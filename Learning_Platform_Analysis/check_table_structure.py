@@ -1,37 +1,135 @@
 """
-Check the actual structure of the course table
+Check the actual structure of the course table and the analytics indexes
 """
 
+from course_catalog import CourseCatalog
 from database_connection import DatabaseConnection
+from index_advisor import RECOMMENDED_INDEXES, existing_indexes
+from typing import Optional
+import logging
+import sys
 
-def check_course_table():
-    """Check the actual column names in the course table"""
+def check_course_table(db: Optional[DatabaseConnection] = None) -> bool:
+    """
+    Check the actual column names in the course table
     
-    db = DatabaseConnection()
-    if not db.connect():
-        print("Failed to connect to database")
-        return
+    Args:
+        db: Connected (optionally pooled) DatabaseConnection to reuse
+    
+    Returns:
+        bool: True if the check ran, False if it failed
+    """
+    
+    owns_connection = db is None
+    if owns_connection:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("Failed to connect to database")
+            return False
     
     try:
-        cursor = db.connection.cursor()
-        
         # Check table structure
-        cursor.execute("DESCRIBE course")
-        columns = cursor.fetchall()
+        columns = db.execute_query("DESCRIBE course")
+        if columns is None:
+            return False
         
         print("Actual course table columns:")
         print("-" * 40)
         for col in columns:
             print(f"{col[0]:<25} | {col[1]}")
         print("-" * 40)
+        return True
+    
+    except Exception as e:
+        print(f"Error checking table: {e}")
+        return False
+    
+    finally:
+        if owns_connection:
+            db.close()
+
+def check_indexes(db: Optional[DatabaseConnection] = None) -> bool:
+    """
+    List the indexes of the analytics tables and flag recommended ones that are missing
+    
+    Args:
+        db: Connected (optionally pooled) DatabaseConnection to reuse
+    
+    Returns:
+        bool: True if the check ran, False if it failed
+    """
+    
+    owns_connection = db is None
+    if owns_connection:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("Failed to connect to database")
+            return False
+    
+    try:
+        present = existing_indexes(db)
         
-        cursor.close()
+        print("Analytics indexes:")
+        print("-" * 40)
+        for table, index, columns, _ in RECOMMENDED_INDEXES:
+            status = "ok" if index in present.get(table, []) else "MISSING"
+            print(f"{table:<20} | {index:<36} | {status}")
+        print("-" * 40)
+        print("Run 'python index_advisor.py --apply' to create missing indexes")
+        return True
+    
+    except Exception as e:
+        print(f"Error checking indexes: {e}")
+        return False
+    
+    finally:
+        if owns_connection:
+            db.close()
+
+def check_catalog(path: str, db: Optional[DatabaseConnection] = None) -> bool:
+    """
+    Show the column layout of the course catalog snapshot, rebuilding it if the course table changed
+    
+    Args:
+        path: Catalog snapshot file
+        db: Connected (optionally pooled) DatabaseConnection to reuse
+    
+    Returns:
+        bool: True if the check ran, False if it failed
+    """
+    
+    owns_connection = db is None
+    if owns_connection:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("Failed to connect to database")
+            return False
+    
+    try:
+        catalog = CourseCatalog.load_cached(path, db=db)
+        if catalog is None:
+            return False
         
+        print(f"Course catalog {path}: {len(catalog)} courses, "
+              f"{catalog.memory_usage().sum() / len(catalog):.0f} bytes per course")
+        print("-" * 40)
+        for row in catalog.describe().itertuples(index=False):
+            print(f"{row.column:<25} | {row.storage:<14} | {row.bytes:>9} bytes")
+        print("-" * 40)
+        return True
+    
     except Exception as e:
-        print(f"Error checking table: {e}")
+        print(f"Error checking catalog: {e}")
+        return False
     
     finally:
-        db.close()
+        if owns_connection:
+            db.close()
 
 if __name__ == "__main__":
-    check_course_table()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    ok = check_course_table()
+    ok = check_indexes() and ok
+    if len(sys.argv) > 1:
+        ok = check_catalog(sys.argv[1]) and ok
+    sys.exit(0 if ok else 1)
\ No newline at end of file
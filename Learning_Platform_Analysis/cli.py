@@ -0,0 +1,228 @@
+"""
+Command line entry point for Course Platform Analytics
+One command for the pipeline, single analytics, checks, imports and the analytics daemon.
+Only the standard library is imported up front, each subcommand imports what it runs.
+"""
+
+from typing import Optional, Sequence
+import argparse
+import json
+import logging
+import os
+import sys
+
+import daemon_client
+
+logger = logging.getLogger(__name__)
+
+# Log format of the command line entry points, as in main.py
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Subcommands that print results rather than progress only log warnings
+QUIET_COMMANDS = ('get', 'status', 'stop')
+
+# Errors of a request that reached no daemon: no socket file, or a stale one
+NO_DAEMON_ERRORS = (FileNotFoundError, ConnectionRefusedError)
+
+def write_result(response: dict, fmt: str, out: Optional[str]):
+    """Print a daemon or in-process result, unless it was written to out"""
+    if response.get('path'):
+        print(f"Wrote {response['rows']} rows to {response['path']}", file=sys.stderr)
+    elif fmt == 'csv':
+        sys.stdout.write(response['csv'])
+    else:
+        print(json.dumps({'columns': response['columns'], 'data': response['data']}))
+
+def get_in_process(name: str, fmt: str = 'csv', out: Optional[str] = None, snapshot: Optional[str] = None,
+                   engine: str = 'duckdb') -> dict:
+    """
+    Run one analytic in this process, as a daemon would answer it
+    
+    Args:
+        name: Analytic, e.g. churn_analysis or get_churn_analysis
+        fmt: 'csv' or 'json'
+        out: Write the result as CSV to this path instead of returning it
+        snapshot: Run on an embedded database loaded from this snapshot instead of MySQL
+        engine: Embedded engine used with snapshot
+    
+    Returns:
+        dict: A response shaped like the daemon's, with 'ok' and the result or an 'error'
+    """
+    from analytics_engine import AnalyticsEngine
+    if snapshot:
+        from embedded_backend import EmbeddedConnection
+        db = EmbeddedConnection(snapshot, engine=engine)
+    else:
+        from database_connection import DatabaseConnection
+        from main import DB_CONFIG
+        db = DatabaseConnection(**DB_CONFIG)
+    if not db.connect():
+        return {'ok': False, 'error': "Failed to connect to database"}
+    
+    try:
+        method = getattr(AnalyticsEngine(db), daemon_client.method_name(name), None)
+        if method is None:
+            return {'ok': False, 'error': f"Unknown analytic: {name}"}
+        dataframe = method()
+        if dataframe is None:
+            return {'ok': False, 'error': f"{daemon_client.method_name(name)} failed"}
+        if out:
+            dataframe.to_csv(out, index=False)
+            return {'ok': True, 'rows': len(dataframe), 'path': out}
+        if fmt == 'csv':
+            return {'ok': True, 'rows': len(dataframe), 'csv': dataframe.to_csv(index=False)}
+        return {'ok': True, 'rows': len(dataframe),
+                **json.loads(dataframe.to_json(orient='split', index=False, date_format='iso'))}
+    finally:
+        db.close()
+
+def command_get(args) -> int:
+    """Answer from the daemon when one is running, otherwise in this process"""
+    message = {'op': 'get', 'name': args.name, 'format': args.format}
+    if args.out:
+        message['path'] = os.path.abspath(args.out)
+    
+    response = None
+    if not args.no_daemon:
+        try:
+            response = daemon_client.request(message, args.socket)
+        except NO_DAEMON_ERRORS:
+            logger.info(f"No daemon on {args.socket}, running {args.name} in process")
+        except OSError as e:
+            # The daemon may still be running the request, so it is not repeated here
+            print(f"[ERROR] Daemon request on {args.socket} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            return 1
+    if response is None:
+        response = get_in_process(args.name, args.format, message.get('path'), args.snapshot, args.engine)
+    
+    if not response.get('ok'):
+        print(f"[ERROR] {response.get('error')}", file=sys.stderr)
+        return 1
+    write_result(response, args.format, args.out)
+    return 0
+
+def command_run(args) -> int:
+    """Run the analytics pipeline with main.py's options"""
+    import main
+    return 0 if main.main(args.options) else 1
+
+def command_check(args) -> int:
+    """Check the course table, the analytics indexes and optionally the catalog snapshot"""
+    from check_table_structure import check_catalog, check_course_table, check_indexes
+    ok = check_course_table()
+    ok = check_indexes() and ok
+    if args.catalog:
+        ok = check_catalog(args.catalog) and ok
+    return 0 if ok else 1
+
+def command_import(args) -> int:
+    """Import the udemy courses CSV and optionally the sample users and enrollments"""
+    from import_csv_data import add_sample_users_and_enrollments, import_udemy_courses
+    if import_udemy_courses(args.csv) is None:
+        return 1
+    if args.sample_data and not add_sample_users_and_enrollments():
+        return 1
+    return 0
+
+def command_daemon(args) -> int:
+    """Serve analytics on the socket in the foreground until stopped"""
+    import asyncio
+    from analytics_daemon import run_daemon
+    served = asyncio.run(run_daemon(args.socket, args.snapshot, args.engine, args.pool_size,
+                                    args.in_memory, args.catalog, args.probe_interval))
+    return 0 if served else 1
+
+def command_status(args) -> int:
+    """Print the daemon's statistics"""
+    try:
+        response = daemon_client.request({'op': 'ping'}, args.socket, timeout=5.0)
+    except NO_DAEMON_ERRORS:
+        print(f"No daemon is listening on {args.socket}")
+        return 1
+    except OSError as e:
+        print(f"[ERROR] Daemon on {args.socket} did not answer: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(response, indent=2))
+    return 0
+
+def command_stop(args) -> int:
+    """Ask the daemon to shut down"""
+    try:
+        daemon_client.request({'op': 'stop'}, args.socket, timeout=5.0)
+    except NO_DAEMON_ERRORS:
+        print(f"No daemon is listening on {args.socket}")
+        return 1
+    except OSError as e:
+        print(f"[ERROR] Daemon on {args.socket} did not answer: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    print("Daemon stopped")
+    return 0
+
+def add_database_options(parser: argparse.ArgumentParser):
+    """Options choosing MySQL or an embedded snapshot"""
+    parser.add_argument('--snapshot', metavar='DIR',
+                        help="Use an embedded database loaded from the CSV/Parquet snapshot in DIR instead of MySQL")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb',
+                        help="Embedded engine used with --snapshot (default: duckdb)")
+
+def parse_args(argv: Optional[Sequence[str]] = None):
+    """Parse the subcommand and its options (default: sys.argv)"""
+    parser = argparse.ArgumentParser(description="Course platform analytics")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    # The options of run are main.py's, they are passed through unparsed
+    run = commands.add_parser('run', add_help=False, usage="%(prog)s [main.py options]",
+                              help="Run the analytics pipeline (options as for main.py)")
+    run.set_defaults(handler=command_run)
+    
+    get = commands.add_parser('get', help="Print one analytic, e.g. churn_analysis")
+    get.add_argument('name', help="Analytic, with or without the get_ prefix")
+    get.add_argument('--format', choices=list(daemon_client.RESULT_FORMATS), default='csv')
+    get.add_argument('--out', metavar='PATH', help="Write the result as CSV to PATH instead of printing it")
+    get.add_argument('--no-daemon', action='store_true', help="Run in this process even when a daemon is running")
+    get.add_argument('--socket', default=daemon_client.DEFAULT_SOCKET)
+    add_database_options(get)
+    get.set_defaults(handler=command_get)
+    
+    check = commands.add_parser('check', help="Check the course table and the analytics indexes")
+    check.add_argument('catalog', nargs='?', help="Also show the course catalog snapshot at this path")
+    check.set_defaults(handler=command_check)
+    
+    load = commands.add_parser('import', help="Import the udemy courses CSV into MySQL")
+    load.add_argument('--csv', default='udemy_courses.csv')
+    load.add_argument('--sample-data', action='store_true', help="Also add sample users and enrollments")
+    load.set_defaults(handler=command_import)
+    
+    daemon = commands.add_parser('daemon', help="Serve analytics from warm connections and caches")
+    daemon.add_argument('--socket', default=daemon_client.DEFAULT_SOCKET)
+    daemon.add_argument('--pool-size', type=int, default=4, help="Pooled connections (default: 4)")
+    daemon.add_argument('--in-memory', action='store_true',
+                        help="Serve from base tables pulled once into pandas instead of SQL")
+    daemon.add_argument('--catalog', metavar='PATH', help="With --in-memory, course catalog snapshot kept mapped")
+    daemon.add_argument('--probe-interval', type=float, default=5.0,
+                        help="Seconds a cached result is served before its tables are checked again (default: 5)")
+    add_database_options(daemon)
+    daemon.set_defaults(handler=command_daemon)
+    
+    for name, handler, help_text in (('status', command_status, "Show the daemon's statistics"),
+                                     ('stop', command_stop, "Stop the daemon")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--socket', default=daemon_client.DEFAULT_SOCKET)
+        command.set_defaults(handler=handler)
+    
+    args, options = parser.parse_known_args(argv)
+    if args.command == 'run':
+        args.options = options
+    elif options:
+        parser.error(f"unrecognized arguments: {' '.join(options)}")
+    return args
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run a subcommand and return its exit status"""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.command in QUIET_COMMANDS else logging.INFO,
+                        format=LOG_FORMAT)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
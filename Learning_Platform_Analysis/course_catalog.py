@@ -0,0 +1,558 @@
+"""
+Course Catalog for Course Platform Analytics
+Compact array-backed course metadata with prebuilt lookups, cached as a memory-mappable snapshot
+"""
+
+import numpy as np
+import pandas as pd
+from database_connection import DatabaseConnection
+from import_csv_data import COURSE_CSV_DTYPES, coerce_course_frame
+from query_cache import QueryCache
+from typing import Dict, List, Optional, Sequence
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Course column -> storage. Numbers are stored narrow: ids and counts fit
+# int32 and prices/durations are DECIMAL(10, 2) values well within float32's
+# 7 significant digits. NULL floats are NaN and NULL integers get a '<column>.null'
+# mask, stored only when the column has NULLs. 'category' columns hold codes
+# into a sorted list of categories, in the narrowest integer type that fits
+# their number, and 'string' columns int32 codes into a pool of unique strings,
+# -1 for NULL in both.
+CATALOG_COLUMNS = {
+    'course_id': 'int32',
+    'course_title': 'string',
+    'instructor_name': 'string',
+    'subject': 'category',
+    'level': 'category',
+    'price': 'float32',
+    'content_duration': 'float32',
+    'num_subscription': 'int32',
+    'num_review': 'int32',
+    'num_lec': 'int32',
+    'is_paid': 'bool',
+    'publised_timestamp': 'datetime64[s]'
+}
+
+# First bytes of a catalog snapshot file and its format version
+SNAPSHOT_MAGIC = b'CCATALOG'
+SNAPSHOT_VERSION = 2
+# Arrays start on 64-byte boundaries so the mapped views are aligned
+SNAPSHOT_ALIGNMENT = 64
+
+def code_dtype(count: int) -> np.dtype:
+    """Narrowest signed integer type holding the codes 0 to count - 1 and -1 for NULL"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+class StringPool:
+    """
+    Unique strings stored once as one UTF-8 buffer and their byte offsets
+    
+    Strings are decoded on first access and interned, so equal titles share
+    one Python object however many courses use them.
+    """
+    
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        """
+        Args:
+            data: uint8 array of the concatenated UTF-8 strings
+            offsets: int64 array of len(pool) + 1 byte offsets into data
+        """
+        self.data = data
+        self.offsets = offsets
+        self._strings: Optional[List[str]] = None
+    
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> 'StringPool':
+        """Build a pool from unique strings, in the order given"""
+        encoded = [value.encode('utf-8') for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def strings(self) -> List[str]:
+        """All strings of the pool, decoded once"""
+        if self._strings is None:
+            raw = self.data.tobytes()
+            bounds = self.offsets.tolist()
+            self._strings = [sys.intern(raw[start:end].decode('utf-8'))
+                             for start, end in zip(bounds, bounds[1:])]
+        return self._strings
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Object array of the strings of the codes, None for -1"""
+        lookup = np.array(self.strings() + [None], dtype=object)
+        return lookup[np.where(codes < 0, len(self), codes)]
+
+class CourseCatalog:
+    """
+    Course metadata as typed NumPy columns with prebuilt lookups
+    
+    Loaded once from the course table, udemy_courses.csv or a snapshot file
+    written by save(). Snapshots are memory-mapped, so opening one costs a few
+    page faults instead of parsing the CSV or querying the database, and
+    processes mapping the same snapshot share its pages.
+    
+    Prebuilt indexes, all arrays of row positions:
+    - id lookup: course ids sorted, with the row of each (binary search)
+    - subject lookup: rows grouped by subject code, with each group's offsets
+    - rows by price ascending, for price range queries
+    - rows by num_subscription descending, for top-N queries
+    
+    The arrays are read-only views when mapped; treat them as read-only always.
+    """
+    
+    def __init__(self, arrays: Dict[str, np.ndarray], categories: Dict[str, List[str]],
+                 source: Optional[Dict[str, str]] = None):
+        """
+        Build a catalog from its arrays, use the from_* and load constructors instead
+        
+        Args:
+            arrays: Column and index arrays, as written by save()
+            categories: Sorted categories of each 'category' column
+            source: Change marker of the data the catalog was built from
+        """
+        self.arrays = arrays
+        self.categories = categories
+        self.source = source or {}
+        self.pools = {column: StringPool(arrays[f'{column}.data'], arrays[f'{column}.offsets'])
+                      for column, storage in CATALOG_COLUMNS.items() if storage == 'string'}
+        # Keeps the snapshot mapping open while the catalog uses it
+        self._mapping = None
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, source: Optional[Dict[str, str]] = None) -> 'CourseCatalog':
+        """
+        Build a catalog from course rows
+        
+        Args:
+            df: Rows with the course table's columns; missing columns are NULL
+            source: Change marker of the data, compared by load_cached()
+        
+        Returns:
+            CourseCatalog: The catalog, rows in the order of df
+        """
+        rows = len(df)
+        arrays, categories = {}, {}
+        
+        for column, storage in CATALOG_COLUMNS.items():
+            values = df[column] if column in df.columns else pd.Series([None] * rows, index=df.index)
+            if storage in ('string', 'category'):
+                # Sorted uniques keep category codes in the order the analytics group by
+                codes, uniques = pd.factorize(values.astype(object), sort=storage == 'category')
+                uniques = [str(value) for value in uniques]
+                if storage == 'category':
+                    arrays[column] = codes.astype(code_dtype(len(uniques)))
+                    categories[column] = uniques
+                else:
+                    pool = StringPool.from_strings(uniques)
+                    arrays[column] = codes.astype(np.int32)
+                    arrays[f'{column}.data'], arrays[f'{column}.offsets'] = pool.data, pool.offsets
+            elif storage == 'bool':
+                arrays[column] = values.fillna(False).astype(bool).to_numpy()
+            elif storage.startswith('datetime64'):
+                arrays[column] = pd.to_datetime(values, errors='coerce').to_numpy().astype(storage)
+            else:
+                numbers = pd.to_numeric(values, errors='coerce')
+                nulls = numbers.isna().to_numpy()
+                if storage.startswith('int'):
+                    if nulls.any():
+                        arrays[f'{column}.null'] = nulls
+                    numbers = numbers.fillna(0)
+                arrays[column] = numbers.to_numpy(dtype=np.float64).astype(storage)
+        
+        course_ids = arrays['course_id']
+        arrays['id_rows'] = np.argsort(course_ids, kind='stable').astype(np.int32)
+        arrays['id_sorted'] = course_ids[arrays['id_rows']]
+        
+        subject_codes = arrays['subject']
+        order = np.argsort(subject_codes, kind='stable').astype(np.int32)
+        arrays['subject_rows'] = order
+        arrays['subject_offsets'] = np.searchsorted(subject_codes[order],
+                                                    np.arange(len(categories['subject']) + 1)).astype(np.int64)
+        
+        arrays['price_rows'] = np.argsort(arrays['price'], kind='stable').astype(np.int32)
+        # Most subscribers first, ties by course id like the ranking queries and NULL counts last
+        subscribers = arrays['num_subscription'].astype(np.int64)
+        if 'num_subscription.null' in arrays:
+            subscribers[arrays['num_subscription.null']] = -1
+        arrays['subscriber_rows'] = np.lexsort((course_ids, -subscribers)).astype(np.int32)
+        return cls(arrays, categories, source)
+    
+    @classmethod
+    def from_database(cls, db: DatabaseConnection, cache: Optional[QueryCache] = None) -> Optional['CourseCatalog']:
+        """
+        Build a catalog from the course table
+        
+        Args:
+            db: Connected DatabaseConnection
+            cache: QueryCache whose table fingerprint is recorded as the source
+                   (default: a checksum of the course table)
+        
+        Returns:
+            CourseCatalog: The catalog or None if the table could not be read
+        """
+        fingerprint = course_fingerprint(db, cache)
+        df = db.fetch_dataframe(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM course", label='course_catalog')
+        if df is None:
+            return None
+        return cls.from_frame(df, {'database': db.database, **fingerprint})
+    
+    @classmethod
+    def from_csv(cls, csv_path: str) -> 'CourseCatalog':
+        """
+        Build a catalog from udemy_courses.csv, coerced like the importer does
+        
+        Rows that cannot be converted are skipped and duplicate course ids keep
+        their first row, as the course table's primary key would.
+        """
+        df = pd.read_csv(csv_path, dtype=COURSE_CSV_DTYPES)
+        clean, rejected = coerce_course_frame(df)
+        if not rejected.empty:
+            logger.warning(f"Skipped {len(rejected)} course rows that could not be converted")
+        return cls.from_frame(clean.drop_duplicates('course_id').reset_index(drop=True), csv_marker(csv_path))
+    
+    def save(self, path: str):
+        """
+        Write the catalog as a snapshot file that load() memory-maps
+        
+        Layout: magic, header length, JSON header (categories, source and the
+        dtype, shape and offset of every array), then the raw arrays, each on
+        a SNAPSHOT_ALIGNMENT boundary. Written to a temporary file and renamed,
+        so readers never see a partial snapshot.
+        """
+        layout, offset = {}, 0
+        for name, array in self.arrays.items():
+            offset = -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+            layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+        header = json.dumps({'version': SNAPSHOT_VERSION, 'rows': len(self), 'categories': self.categories,
+                             'source': self.source, 'arrays': layout}).encode('utf-8')
+        # Array offsets are relative to the aligned end of the header
+        data_start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(header)) // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+        
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, array in self.arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temp_path, path)
+        logger.info(f"Wrote course catalog of {len(self)} courses to {path}")
+    
+    @classmethod
+    def load(cls, path: str) -> Optional['CourseCatalog']:
+        """
+        Memory-map a snapshot written by save()
+        
+        Returns:
+            CourseCatalog: Catalog whose arrays are read-only views of the file,
+            None if the file is missing or not a catalog snapshot
+        """
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot open course catalog {path}: {e}")
+            return None
+        
+        prefix = len(SNAPSHOT_MAGIC) + 8
+        if mapping[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            logger.error(f"{path} is not a course catalog snapshot")
+            mapping.close()
+            return None
+        header_length = struct.unpack('<Q', mapping[len(SNAPSHOT_MAGIC):prefix])[0]
+        header = json.loads(mapping[prefix:prefix + header_length].decode('utf-8'))
+        if header['version'] != SNAPSHOT_VERSION:
+            logger.error(f"{path} has catalog format {header['version']}, expected {SNAPSHOT_VERSION}")
+            mapping.close()
+            return None
+        
+        data_start = -(-(prefix + header_length) // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(mapping, dtype=dtype, count=count,
+                                         offset=data_start + spec['offset']).reshape(spec['shape'])
+        catalog = cls(arrays, header['categories'], header['source'])
+        catalog._mapping = mapping
+        return catalog
+    
+    @classmethod
+    def load_cached(cls, path: str, db: Optional[DatabaseConnection] = None, csv_path: Optional[str] = None,
+                    cache: Optional[QueryCache] = None) -> Optional['CourseCatalog']:
+        """
+        Map the snapshot at path if it is current, otherwise rebuild and save it
+        
+        The snapshot is current when its source marker matches the course table
+        fingerprint (with db) or the CSV's size and modification time (with csv_path).
+        
+        Args:
+            path: Snapshot file
+            db: Connected DatabaseConnection to build from
+            csv_path: udemy courses CSV to build from when there is no db
+            cache: QueryCache whose table fingerprint marks the course table version
+        
+        Returns:
+            CourseCatalog: The catalog or None if it could not be built
+        """
+        if db is None and csv_path is None:
+            raise ValueError("load_cached needs a database or a CSV to check the snapshot against")
+        if db is not None:
+            marker = {'database': db.database, **course_fingerprint(db, cache)}
+        else:
+            marker = csv_marker(csv_path)
+        
+        if os.path.exists(path):
+            catalog = cls.load(path)
+            if catalog is not None and catalog.source == marker:
+                return catalog
+            logger.info(f"Course catalog {path} is out of date, rebuilding it")
+        
+        catalog = cls.from_database(db, cache) if db is not None else cls.from_csv(csv_path)
+        if catalog is not None:
+            catalog.save(path)
+        return catalog
+    
+    def __len__(self) -> int:
+        return len(self.arrays['course_id'])
+    
+    @property
+    def course_ids(self) -> np.ndarray:
+        return self.arrays['course_id']
+    
+    def rows(self, course_ids) -> np.ndarray:
+        """
+        Row positions of course ids, -1 for ids that are not in the catalog
+        
+        Args:
+            course_ids: Course id or array of course ids
+        
+        Returns:
+            np.ndarray: int32 rows, same shape as course_ids
+        """
+        ids = np.asarray(course_ids)
+        sorted_ids = self.arrays['id_sorted']
+        if not len(sorted_ids):
+            return np.full(ids.shape, -1, dtype=np.int32)
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == ids, self.arrays['id_rows'][positions], -1).astype(np.int32)
+    
+    def row(self, course_id: int) -> int:
+        """Row position of one course id, -1 if it is not in the catalog"""
+        return int(self.rows(course_id))
+    
+    def subject_rows(self, subject: str) -> np.ndarray:
+        """Rows of the courses of a subject, in row order (empty for an unknown subject)"""
+        subjects = self.categories['subject']
+        if subject not in subjects:
+            return np.array([], dtype=np.int32)
+        code = subjects.index(subject)
+        offsets = self.arrays['subject_offsets']
+        return self.arrays['subject_rows'][offsets[code]:offsets[code + 1]]
+    
+    def ids_for_subject(self, subject: str) -> np.ndarray:
+        """Course ids of a subject"""
+        return self.course_ids[self.subject_rows(subject)]
+    
+    def price_range(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """
+        Course ids priced from low to high, both inclusive, cheapest first
+        
+        Courses without a price are never included, NaN prices sort last.
+        
+        Args:
+            low: Lowest price (default: no lower bound)
+            high: Highest price (default: no upper bound)
+        """
+        price_rows = self.arrays['price_rows']
+        prices = self.arrays['price'][price_rows]
+        start = 0 if low is None else np.searchsorted(prices, np.float32(low), side='left')
+        end = np.searchsorted(prices, np.float32(np.inf if high is None else high), side='right')
+        return self.course_ids[price_rows[start:end]]
+    
+    def top_by_subscribers(self, n: int, subject: Optional[str] = None) -> np.ndarray:
+        """
+        Course ids of the n courses with the most subscribers, most first
+        
+        Args:
+            n: Number of courses
+            subject: Only courses of this subject
+        """
+        order = self.arrays['subscriber_rows']
+        if subject is not None:
+            if subject not in self.categories['subject']:
+                return np.array([], dtype=np.int32)
+            order = order[self.arrays['subject'][order] == self.categories['subject'].index(subject)]
+        return self.course_ids[order[:n]]
+    
+    def column(self, column: str) -> np.ndarray:
+        """
+        Values of one column as a pandas-ready array
+        
+        Categories and strings are decoded (None for NULL), float32 prices
+        and durations are widened to float64 rounded to cents, the DECIMAL(10, 2)
+        values the database returns, and integer columns with NULLs become
+        nullable Int32 arrays.
+        """
+        storage = CATALOG_COLUMNS[column]
+        values = self.arrays[column]
+        if storage == 'string':
+            return self.pools[column].decode(values)
+        if storage == 'category':
+            return pd.Categorical.from_codes(values.astype(np.int64), self.categories[column])
+        if storage == 'float32':
+            return np.round(values.astype(np.float64), 2)
+        if f'{column}.null' in self.arrays:
+            return pd.arrays.IntegerArray(np.array(values), np.array(self.arrays[f'{column}.null']))
+        return np.array(values)
+    
+    def frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Course rows as a DataFrame, in catalog row order
+        
+        Args:
+            columns: Columns to include (default: all of CATALOG_COLUMNS)
+        """
+        return pd.DataFrame({column: self.column(column) for column in (columns or CATALOG_COLUMNS)})
+    
+    def courses(self, course_ids) -> pd.DataFrame:
+        """Rows of the given course ids as a DataFrame, unknown ids skipped"""
+        rows = self.rows(course_ids)
+        return self.frame().iloc[rows[rows >= 0]].reset_index(drop=True)
+    
+    def memory_usage(self) -> pd.Series:
+        """
+        Bytes held by each array, mapped arrays included
+        
+        Returns:
+            pd.Series: array name -> bytes
+        """
+        return pd.Series({name: array.nbytes for name, array in self.arrays.items()}, dtype='int64')
+    
+    def describe(self) -> pd.DataFrame:
+        """One row per column with its storage, bytes and distinct values"""
+        usage = self.memory_usage()
+        rows = []
+        for column, storage in CATALOG_COLUMNS.items():
+            related = [name for name in usage.index if name == column or name.startswith(f'{column}.')]
+            distinct = (len(self.categories[column]) if storage == 'category' else
+                        len(self.pools[column]) if storage == 'string' else None)
+            rows.append({'column': column, 'storage': storage, 'bytes': int(usage[related].sum()),
+                         'distinct': distinct})
+        return pd.DataFrame(rows)
+
+def course_fingerprint(db: DatabaseConnection, cache: Optional[QueryCache] = None) -> Dict[str, str]:
+    """Change marker of the course table, from the cache's fingerprint or a checksum of its contents"""
+    cache = cache or QueryCache(cache_dir=None, fingerprint='checksum')
+    return cache.table_fingerprint(db, ['course'])
+
+def csv_marker(csv_path: str) -> Dict[str, str]:
+    """Change marker of a CSV file: its path, size and modification time"""
+    stat = os.stat(csv_path)
+    return {'csv': os.path.abspath(csv_path), 'version': f"{stat.st_size}|{stat.st_mtime_ns}"}
+
+def benchmark_catalog(csv_path: str, snapshot_path: str, repeat: int = 5) -> pd.DataFrame:
+    """
+    Compare the catalog with the pandas frame of the same CSV
+    
+    Memory is measured per course: the pandas frame as read_csv returns it and
+    with object strings (deep size), and the catalog's arrays. Startup is the time to
+    get a usable catalog, by parsing the CSV or mapping the snapshot.
+    
+    Args:
+        csv_path: udemy courses CSV
+        snapshot_path: Snapshot file, written if missing
+        repeat: Runs per timing
+    
+    Returns:
+        pd.DataFrame: name, seconds, bytes_per_course
+    """
+    # The benchmark suite imports the embedded engines, which the catalog itself never needs
+    from benchmark_suite import best_time
+    
+    read_seconds, df = best_time(lambda: pd.read_csv(csv_path), repeat)
+    # Text columns as object strings, how pandas before 3.0 reads them
+    untyped = df.astype({column: object for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])})
+    build_seconds, catalog = best_time(lambda: CourseCatalog.from_csv(csv_path), repeat)
+    catalog.save(snapshot_path)
+    load_seconds, mapped = best_time(lambda: CourseCatalog.load(snapshot_path), repeat)
+    
+    courses = len(catalog)
+    ids = catalog.course_ids[::max(courses // 1000, 1)]
+    frame_lookup, _ = best_time(lambda: [df.index[df['course_id'] == course_id] for course_id in ids[:100]], repeat)
+    catalog_lookup, _ = best_time(lambda: [mapped.row(course_id) for course_id in ids[:100]], repeat)
+    
+    return pd.DataFrame([
+        {'name': 'pandas read_csv', 'seconds': read_seconds,
+         'bytes_per_course': df.memory_usage(deep=True).sum() / len(df)},
+        {'name': 'pandas, object strings', 'seconds': None,
+         'bytes_per_course': untyped.memory_usage(deep=True).sum() / len(df)},
+        {'name': 'catalog from CSV', 'seconds': build_seconds,
+         'bytes_per_course': catalog.memory_usage().sum() / courses},
+        {'name': 'catalog from snapshot (mmap)', 'seconds': load_seconds,
+         'bytes_per_course': mapped.memory_usage().sum() / courses},
+        {'name': '100 id lookups, pandas mask', 'seconds': frame_lookup, 'bytes_per_course': None},
+        {'name': '100 id lookups, catalog', 'seconds': catalog_lookup, 'bytes_per_course': None}
+    ])
+
+def main():
+    """Build, inspect or benchmark the course catalog from the command line"""
+    parser = argparse.ArgumentParser(description="Build a memory-mappable course catalog snapshot")
+    parser.add_argument('snapshot', help="Catalog snapshot file (e.g. course_catalog.bin)")
+    parser.add_argument('--csv', metavar='PATH', help="Build from a udemy courses CSV instead of the database")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if the snapshot is current")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare memory per course and startup with pandas (needs --csv)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        if not args.csv:
+            parser.error("--benchmark needs --csv")
+        print(benchmark_catalog(args.csv, args.snapshot, args.repeat).to_string(index=False, float_format='%.6f'))
+        return
+    
+    if args.rebuild and os.path.exists(args.snapshot):
+        os.remove(args.snapshot)
+    
+    db = None
+    if not args.csv:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+    
+    try:
+        started = time.perf_counter()
+        catalog = CourseCatalog.load_cached(args.snapshot, db=db, csv_path=args.csv)
+    finally:
+        if db is not None:
+            db.close()
+    if catalog is None:
+        print("[ERROR] Could not build the course catalog")
+        return
+    
+    print(f"[SUCCESS] {len(catalog)} courses ready in {time.perf_counter() - started:.3f}s")
+    print(catalog.describe().to_string(index=False))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
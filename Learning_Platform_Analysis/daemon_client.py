@@ -0,0 +1,58 @@
+"""
+Client of the Analytics Daemon
+Sends requests over the daemon's Unix socket; only the standard library is imported,
+so a client answered by a running daemon starts without pandas, asyncio or the database drivers
+"""
+
+from typing import Any, Dict
+import json
+import os
+import socket
+import tempfile
+
+# Socket of the daemon, one per user unless ANALYTICS_DAEMON_SOCKET says otherwise
+DEFAULT_SOCKET = os.environ.get('ANALYTICS_DAEMON_SOCKET',
+                                os.path.join(tempfile.gettempdir(), f"course_analytics_{os.getuid()}.sock"))
+
+# Longest request or response line, a whole result travels as one line
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+# Result formats of a get request
+RESULT_FORMATS = ('csv', 'json')
+
+def method_name(name: str) -> str:
+    """AnalyticsEngine method of an analytic, given as churn_analysis or get_churn_analysis"""
+    return name if name.startswith('get_') else f"get_{name}"
+
+def request(message: Dict[str, Any], socket_path: str = DEFAULT_SOCKET, timeout: float = 300.0) -> Dict[str, Any]:
+    """
+    Send one request to the daemon and wait for its response
+    
+    Args:
+        message: Request, e.g. {'op': 'get', 'name': 'churn_analysis'}
+        socket_path: Socket the daemon listens on
+        timeout: Seconds to wait for the response
+    
+    Returns:
+        dict: The response, with 'ok' and either the result or an 'error'
+    
+    Raises:
+        FileNotFoundError, ConnectionRefusedError: When no daemon is listening on socket_path
+        OSError: When the request fails or times out after it was sent
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with client.makefile('rb') as reader:
+            line = reader.readline(MAX_MESSAGE_BYTES)
+    if not line:
+        raise ConnectionError("The daemon closed the connection without a response")
+    return json.loads(line)
+
+def is_running(socket_path: str = DEFAULT_SOCKET) -> bool:
+    """Whether a daemon answers on socket_path"""
+    try:
+        return request({'op': 'ping'}, socket_path, timeout=2.0).get('ok', False)
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,409 @@
+"""
+Embedded Analytics Backend for Course Platform Analytics
+Runs the analytics queries on DuckDB (or SQLite) loaded from CSV/Parquet snapshots
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from import_csv_data import COURSE_COLUMN_MAP, coerce_course_frame
+from exporters import ParquetExporter
+from sql_dialect import translate
+from analytics_engine import AnalyticsEngine
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+import argparse
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+try:
+    import duckdb
+except ImportError:  # SQLite is used when DuckDB is not installed
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Errors raised by the embedded engines
+EMBEDDED_ERRORS = (sqlite3.Error,) + ((duckdb.Error,) if duckdb is not None else ())
+
+# Columns of the snapshot tables, with types mirroring sql project(final).sql.
+# ENUMs become VARCHAR; keys are not enforced, snapshots are taken consistent.
+EMBEDDED_SCHEMA = {
+    'cat': [('cat_id', 'INTEGER'), ('cat_name', 'VARCHAR'), ('description', 'VARCHAR'),
+            ('created_at', 'TIMESTAMP')],
+    'course': [('course_id', 'INTEGER'), ('course_title', 'VARCHAR'), ('course_url', 'VARCHAR'),
+               ('price', 'DECIMAL(10, 2)'), ('num_subscription', 'INTEGER'), ('num_review', 'INTEGER'),
+               ('num_lec', 'INTEGER'), ('level', 'VARCHAR'), ('content_duration', 'DECIMAL(10, 2)'),
+               ('publised_timestamp', 'TIMESTAMP'), ('subject', 'VARCHAR'), ('instructor_name', 'VARCHAR'),
+               ('is_paid', 'BOOLEAN'), ('cat_id', 'INTEGER'), ('created_at', 'TIMESTAMP')],
+    'user': [('user_id', 'INTEGER'), ('userName', 'VARCHAR'), ('email', 'VARCHAR'),
+             ('first_name', 'VARCHAR'), ('last_name', 'VARCHAR'), ('subscription_type', 'VARCHAR'),
+             ('regi_date', 'TIMESTAMP'), ('last_login', 'TIMESTAMP'), ('country', 'VARCHAR'),
+             ('is_active', 'BOOLEAN')],
+    'erp': [('erp_id', 'INTEGER'), ('user_id', 'INTEGER'), ('course_id', 'INTEGER'),
+            ('erp_date', 'TIMESTAMP'), ('completion_status', 'VARCHAR'), ('progress_per', 'INTEGER'),
+            ('rating_given', 'INTEGER')],
+    'subscriptions': [('subscription_id', 'INTEGER'), ('user_id', 'INTEGER'), ('plan_type', 'VARCHAR'),
+                      ('start_date', 'DATE'), ('end_date', 'DATE'), ('monthely_fee', 'DECIMAL(10, 2)'),
+                      ('status', 'VARCHAR')],
+    'course_interactions': [('interaction_id', 'INTEGER'), ('user_id', 'INTEGER'), ('course_id', 'INTEGER'),
+                            ('interaction_type', 'VARCHAR'), ('interaction_data', 'TIMESTAMP'),
+                            ('session_duration', 'INTEGER')]
+}
+
+def row_checksum(*values) -> int:
+    """CRC32 of a row's values, SQLite's stand-in for DuckDB's hash() in table checksums"""
+    return zlib.crc32(repr(values).encode('utf-8'))
+
+# Key columns indexed on SQLite, which joins by nested loops (DuckDB hash joins need none)
+SQLITE_INDEXES = [('course', 'course_id'), ('user', 'user_id'), ('erp', 'course_id'),
+                  ('erp', 'user_id'), ('course_interactions', 'user_id')]
+
+# Tables in load order, referenced tables first
+SNAPSHOT_TABLES = ['cat', 'course', 'user', 'erp', 'subscriptions', 'course_interactions']
+
+class EmbeddedConnection(DatabaseConnection):
+    """
+    DatabaseConnection over an embedded DuckDB or SQLite database
+    
+    A drop-in for the MySQL connection: queries are written in MySQL and
+    translated by sql_dialect, so AnalyticsEngine runs unchanged on a snapshot.
+    """
+    
+    QUERY_ERRORS = EMBEDDED_ERRORS + (ConnectionError,)
+    
+    def __init__(self, snapshot_dir: Optional[str] = None, engine: str = 'duckdb',
+                 database: str = ':memory:', threads: Optional[int] = None):
+        """
+        Initialize the embedded database parameters
+        
+        Args:
+            snapshot_dir: Directory of <table>.parquet / <table>.csv files loaded on connect
+                          (udemy_courses.csv is accepted for the course table)
+            engine: 'duckdb', or 'sqlite' (also used when DuckDB is not installed)
+            database: Database file, ':memory:' for an in-memory database
+            threads: DuckDB worker threads, None for one per core
+        """
+        super().__init__()
+        if engine == 'duckdb' and duckdb is None:
+            logger.warning("duckdb is not installed, falling back to SQLite")
+            engine = 'sqlite'
+        if engine not in ('duckdb', 'sqlite'):
+            raise ValueError(f"Unknown embedded engine: {engine}")
+        
+        self.engine = engine
+        self.dialect = engine
+        self.snapshot_dir = snapshot_dir
+        self.database = database
+        self.threads = threads
+        # Connection of the original when this is a clone, see clone()
+        self._shared = None
+        # Clones of an in-memory SQLite database reach it through a shared cache URI
+        self._sqlite_uri = (f"file:embedded_{id(self)}?mode=memory&cache=shared"
+                            if database == ':memory:' else f"file:{database}")
+    
+    def clone(self) -> 'EmbeddedConnection':
+        """Return an unconnected copy whose connect() opens the same database"""
+        clone = EmbeddedConnection(engine=self.engine, database=self.database, threads=self.threads)
+        clone._shared = self.connection
+        clone._sqlite_uri = self._sqlite_uri
+        clone.profiler = self.profiler
+        return clone
+    
+    def connect(self) -> bool:
+        """
+        Open the embedded database and load the snapshot, if one is configured
+        
+        Returns:
+            bool: True if the database is ready, False otherwise
+        """
+        try:
+            if self.engine == 'duckdb':
+                self.connection = (self._shared.cursor() if self._shared is not None
+                                   else duckdb.connect(self.database))
+                if self.threads:
+                    self.connection.execute(f"SET threads = {int(self.threads)}")
+            else:
+                self.connection = sqlite3.connect(self._sqlite_uri, uri=True, check_same_thread=False)
+                self.connection.create_function('row_checksum', -1, row_checksum, deterministic=True)
+            
+            if self._shared is None:
+                logger.info(f"Opened embedded {self.engine} database {self.database}")
+                if self.snapshot_dir:
+                    self.load_snapshot(self.snapshot_dir)
+            return True
+        except (OSError, ValueError) + EMBEDDED_ERRORS as e:
+            logger.error(f"Error opening embedded database: {e}")
+            self.connection = None
+            return False
+    
+    def _ensure_alive(self, connection) -> bool:
+        """Embedded connections cannot go stale"""
+        return True
+    
+    def translate(self, query: str) -> str:
+        """Translate a MySQL query to the embedded engine's dialect"""
+        return translate(query, self.dialect)
+    
+    def table_checksum(self, table: str) -> Optional[str]:
+        """Sum the hashes of a table's rows, with its row count"""
+        if self.engine == 'duckdb':
+            rows = self.execute_query(f'SELECT COUNT(*), SUM(hash(t)) FROM "{table}" AS t')
+        else:
+            columns = [column[1] for column in self.execute_query(f'PRAGMA table_info("{table}")') or []]
+            if not columns:
+                return None
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            rows = self.execute_query(f'SELECT COUNT(*), SUM(row_checksum({column_list})) FROM "{table}"')
+        return '|'.join(str(value) for value in rows[0]) if rows else None
+    
+    def _create_table(self, table: str):
+        """Create (or replace) an empty snapshot table"""
+        columns = ', '.join(f'"{name}" {column_type}' for name, column_type in EMBEDDED_SCHEMA[table])
+        self.connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        self.connection.execute(f'CREATE TABLE "{table}" ({columns})')
+    
+    def _insert_frame(self, table: str, frame: pd.DataFrame):
+        """Append a DataFrame to a table, matching columns by name"""
+        columns = [name for name, _ in EMBEDDED_SCHEMA[table] if name in frame.columns]
+        if self.engine == 'sqlite':
+            frame[columns].to_sql(table, self.connection, if_exists='append', index=False)
+            self.connection.commit()
+            return
+        
+        column_list = ', '.join(f'"{name}"' for name in columns)
+        self.connection.register('snapshot_frame', frame)
+        try:
+            self.connection.execute(f'INSERT INTO "{table}" ({column_list}) SELECT {column_list} FROM snapshot_frame')
+        finally:
+            self.connection.unregister('snapshot_frame')
+    
+    @staticmethod
+    def snapshot_file(snapshot_dir: str, table: str) -> Optional[str]:
+        """
+        Find the snapshot file of a table
+        
+        Returns:
+            str: Path of <table>.parquet or <table>.csv (or udemy_courses.csv for
+            course), None if the snapshot has no file for the table
+        """
+        candidates = [f"{table}.parquet", f"{table}.csv"]
+        if table == 'course':
+            candidates.append('udemy_courses.csv')
+        for candidate in candidates:
+            path = os.path.join(snapshot_dir, candidate)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def load_table(self, table: str, path: str) -> int:
+        """
+        Load one table from a Parquet or CSV file, replacing its contents
+        
+        A course CSV with the udemy_courses.csv header is mapped onto the course
+        table the same way import_csv_data does.
+        
+        Args:
+            table: Table name from EMBEDDED_SCHEMA
+            path: Parquet or CSV file
+        
+        Returns:
+            int: Rows loaded
+        """
+        self._create_table(table)
+        is_parquet = path.endswith('.parquet')
+        header = set() if is_parquet else set(pd.read_csv(path, nrows=0).columns)
+        
+        if table == 'course' and set(COURSE_COLUMN_MAP) <= header and 'course_url' not in header:
+            clean, rejected = coerce_course_frame(pd.read_csv(path))
+            if not rejected.empty:
+                logger.warning(f"Skipped {len(rejected)} course rows that could not be converted")
+            self._insert_frame(table, clean.drop_duplicates('course_id'))
+        elif self.engine == 'duckdb':
+            reader = f"read_parquet('{path}')" if is_parquet else f"read_csv_auto('{path}', header = true)"
+            source_columns = [row[0] for row in self.connection.execute(f"DESCRIBE SELECT * FROM {reader}").fetchall()]
+            columns = ', '.join(f'"{name}"' for name, _ in EMBEDDED_SCHEMA[table] if name in source_columns)
+            self.connection.execute(f'INSERT INTO "{table}" ({columns}) SELECT {columns} FROM {reader}')
+        else:
+            self._insert_frame(table, pd.read_parquet(path) if is_parquet else pd.read_csv(path))
+        
+        return self.connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    
+    def load_snapshot(self, snapshot_dir: str, tables: Sequence[str] = SNAPSHOT_TABLES) -> Dict[str, int]:
+        """
+        Load the snapshot tables, parents before children
+        
+        Tables without a snapshot file are created empty.
+        
+        Args:
+            snapshot_dir: Directory of the snapshot files
+            tables: Tables to load
+        
+        Returns:
+            dict: table name -> rows loaded
+        """
+        started = time.perf_counter()
+        loaded = {}
+        for table in tables:
+            path = self.snapshot_file(snapshot_dir, table)
+            if path is None:
+                logger.warning(f"No snapshot file for {table} in {snapshot_dir}, creating it empty")
+                self._create_table(table)
+                loaded[table] = 0
+                continue
+            loaded[table] = self.load_table(table, path)
+            logger.info(f"Loaded {loaded[table]} rows into {table} from {path}")
+        
+        if self.engine == 'sqlite':
+            for table, column in SQLITE_INDEXES:
+                if table in tables:
+                    self.connection.execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}" ("{column}")')
+        
+        logger.info(f"Loaded snapshot {snapshot_dir} in {time.perf_counter() - started:.2f}s")
+        return loaded
+    
+    def fetch_iter(self, query: str, chunksize: int = 50000, as_arrow: bool = False,
+                   label: Optional[str] = None,
+                   params: Optional[Mapping[str, Any]] = None) -> Iterator[Union[pd.DataFrame, 'pa.RecordBatch']]:
+        """
+        Stream a query result in chunks
+        
+        DuckDB hands out Arrow record batches directly; SQLite rows are fetched
+        with fetchmany. An empty result yields one empty chunk.
+        
+        Args:
+            query: SQL query string (MySQL dialect)
+            chunksize: Number of rows per chunk
+            as_arrow: Yield pyarrow RecordBatches instead of DataFrames
+            label: Name recorded for the query by the profiler
+            params: Values of the query's named %(name)s parameters
+        
+        Yields:
+            pd.DataFrame or pa.RecordBatch: Next chunk of the result
+        """
+        if as_arrow and pa is None:
+            raise ImportError("pyarrow is required for Arrow record batches")
+        if not self.is_connected():
+            logger.error("No database connection established")
+            return
+        
+        with self.checkout() as connection:
+            cursor = connection.cursor()
+            total_rows = 0
+            stream_started = time.perf_counter()
+            try:
+                self._execute(cursor, self.translate(query), params)
+                columns = [column[0] for column in cursor.description]
+                
+                if self.engine == 'duckdb' and pa is not None:
+                    batches = cursor.fetch_record_batch(chunksize)
+                else:
+                    batches = iter(lambda: cursor.fetchmany(chunksize), [])
+                
+                for batch in batches:
+                    if isinstance(batch, list):
+                        batch = pd.DataFrame.from_records(batch, columns=columns, coerce_float=True)
+                        if as_arrow:
+                            batch = pa.RecordBatch.from_pandas(batch, preserve_index=False)
+                    elif not as_arrow:
+                        batch = batch.to_pandas()
+                    total_rows += batch.num_rows if as_arrow else len(batch)
+                    yield batch
+                
+                if not total_rows:
+                    empty = pd.DataFrame(columns=columns)
+                    yield pa.RecordBatch.from_pandas(empty, preserve_index=False) if as_arrow else empty
+                
+                logger.info(f"Successfully streamed {total_rows} rows")
+                if self.profiler is not None:
+                    with self.profiler.stage('stream', label or 'query') as record:
+                        record['rows'] = total_rows
+                        record['wall_seconds'] = time.perf_counter() - stream_started
+            finally:
+                cursor.close()
+
+    def _read_arrow(self, connection, query: str, params: Optional[Mapping[str, Any]],
+                    batch_size: int) -> 'pa.Table':
+        """
+        Run a query into an Arrow table
+        
+        DuckDB produces Arrow natively, so its result buffers are handed over
+        without conversion; SQLite rows go through a DataFrame like fetch_iter.
+        """
+        cursor = connection.cursor()
+        try:
+            self._execute(cursor, query, params)
+            if self.engine == 'duckdb':
+                return cursor.fetch_record_batch(batch_size).read_all()
+            columns = [column[0] for column in cursor.description]
+            frame = pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+            return pa.Table.from_pandas(frame, preserve_index=False).replace_schema_metadata()
+        finally:
+            cursor.close()
+
+def export_snapshot(db: DatabaseConnection, snapshot_dir: str,
+                    tables: Sequence[str] = SNAPSHOT_TABLES, chunksize: int = 100000) -> List[str]:
+    """
+    Dump tables from MySQL into a Parquet snapshot for EmbeddedConnection
+    
+    Args:
+        db: Connected MySQL DatabaseConnection
+        snapshot_dir: Directory the <table>.parquet files are written to
+        tables: Tables to dump
+        chunksize: Rows streamed per Parquet row group
+    
+    Returns:
+        list: Tables written
+    """
+    if not os.path.exists(snapshot_dir):
+        os.makedirs(snapshot_dir)
+    
+    exporter = ParquetExporter(snapshot_dir)
+    written = []
+    for table in tables:
+        if exporter.export(db.fetch_iter(f"SELECT * FROM `{table}`", chunksize, label=table), table):
+            written.append(table)
+    return written
+
+def main():
+    """Dump a MySQL snapshot, or run the analytics export on an embedded snapshot"""
+    parser = argparse.ArgumentParser(description="Run the analytics on an embedded DuckDB/SQLite snapshot")
+    parser.add_argument('snapshot_dir', help="Directory of the <table>.parquet / <table>.csv snapshot")
+    parser.add_argument('--export-snapshot', action='store_true',
+                        help="Dump the MySQL tables into snapshot_dir instead of running the analytics")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--threads', type=int, help="DuckDB worker threads (default: one per core)")
+    args = parser.parse_args()
+    
+    if args.export_snapshot:
+        db = DatabaseConnection()
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+        try:
+            written = export_snapshot(db, args.snapshot_dir)
+            print(f"[SUCCESS] Wrote {', '.join(written)} to {args.snapshot_dir}")
+        finally:
+            db.close()
+        return
+    
+    db = EmbeddedConnection(args.snapshot_dir, engine=args.engine, threads=args.threads)
+    if not db.connect():
+        print("[ERROR] Could not open the snapshot")
+        return
+    try:
+        started = time.perf_counter()
+        AnalyticsEngine(db).export_all_analytics()
+        print(f"[SUCCESS] Exported all analytics on {db.engine} in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
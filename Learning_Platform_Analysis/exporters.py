@@ -0,0 +1,302 @@
+"""
+Exporters for Course Platform Analytics
+Write analytics results as CSV, Parquet, Feather or one XLSX dashboard workbook
+"""
+
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Union
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Feather exports need pyarrow
+    pa = None
+    pacsv = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# A result, or its chunks: DataFrames or pyarrow Tables/RecordBatches (e.g. from fetch_arrow)
+Frames = Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch', Iterable[Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch']]]
+
+def is_arrow(chunk) -> bool:
+    """Whether a chunk is a pyarrow Table or RecordBatch rather than a DataFrame"""
+    return pa is not None and isinstance(chunk, (pa.Table, pa.RecordBatch))
+
+def _chunks(dataframe: Frames) -> Iterable:
+    """Iterate a DataFrame, an Arrow table or an iterable of chunks as chunks"""
+    if isinstance(dataframe, pd.DataFrame) or is_arrow(dataframe):
+        return [dataframe]
+    return dataframe
+
+def _whole_second_timestamps(chunk: Union['pa.Table', 'pa.RecordBatch']) -> 'pa.Table':
+    """Cast timestamp columns without fractional seconds to seconds, written without a .000000 suffix"""
+    if isinstance(chunk, pa.RecordBatch):
+        chunk = pa.Table.from_batches([chunk])
+    for i, field in enumerate(chunk.schema):
+        if pa.types.is_timestamp(field.type) and field.type.unit != 's':
+            try:
+                chunk = chunk.set_column(i, field.name, chunk.column(i).cast(pa.timestamp('s', field.type.tz)))
+            except pa.ArrowInvalid:
+                pass
+    return chunk
+
+def _csv_writable(chunk: Union['pa.Table', 'pa.RecordBatch']) -> bool:
+    """Whether pyarrow's CSV writer formats every column like to_csv, which excludes bytes and durations"""
+    return not any(pa.types.is_binary(field.type) or pa.types.is_duration(field.type) for field in chunk.schema)
+
+class Exporter:
+    """Writes each analytic to its own file in export_dir"""
+    
+    format = ''
+    extension = ''
+    
+    def __init__(self, export_dir: str = 'data_exports'):
+        """
+        Initialize the exporter
+        
+        Args:
+            export_dir: Directory the files are written to
+        """
+        self.export_dir = export_dir
+    
+    def path(self, name: str) -> str:
+        """Return the file path of an analytic"""
+        return os.path.join(self.export_dir, f"{name}{self.extension}")
+    
+    def export(self, dataframe: Optional[Frames], name: str) -> int:
+        """
+        Export a DataFrame or Arrow table, or an iterable of chunks streamed one at a time
+        
+        Args:
+            dataframe: Result to export, None when the query failed
+            name: Analytic name, the file name without extension
+        
+        Returns:
+            int: Number of rows written, no file is written for an empty result
+        """
+        total_rows = 0
+        if dataframe is not None:
+            for chunk in _chunks(dataframe):
+                if not len(chunk):
+                    continue
+                self.write_chunk(chunk, name, first=total_rows == 0)
+                total_rows += len(chunk)
+        
+        if total_rows:
+            self.finish(name)
+            logger.info(f"Exported {total_rows} rows to {self.path(name)}")
+        elif self.discard(name):
+            logger.warning(f"No data to export for {name}, removed the previous {self.path(name)}")
+        else:
+            logger.warning(f"No data to export for {name}, no file written")
+        return total_rows
+    
+    def write_chunk(self, chunk: Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch'], name: str, first: bool):
+        """Write one non-empty chunk, first is True for the first chunk of a file"""
+        raise NotImplementedError
+    
+    def finish(self, name: str):
+        """Finalize the file of an analytic after its last chunk"""
+    
+    def discard(self, name: str) -> bool:
+        """
+        Remove the file a previous run wrote for an analytic that is now empty
+        
+        Returns:
+            bool: True if a file was removed
+        """
+        path = self.path(name)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+    
+    def close(self) -> Optional[str]:
+        """
+        Finalize exports that span analytics
+        
+        Returns:
+            str: Path of a file written on close, None if there is none
+        """
+        return None
+
+class CSVExporter(Exporter):
+    """
+    One CSV file per analytic, the format the dashboard has always used
+    
+    Arrow chunks are formatted by pyarrow's C++ CSV writer, without building
+    a DataFrame. It quotes every string and writes booleans as true/false;
+    timestamps are written like to_csv does, without zero fractions.
+    Chunks with bytes or TIME columns go through to_csv instead.
+    """
+    
+    format = 'csv'
+    extension = '.csv'
+    
+    def write_chunk(self, chunk: Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch'], name: str, first: bool):
+        if is_arrow(chunk) and not _csv_writable(chunk):
+            chunk = chunk.to_pandas()
+        if is_arrow(chunk):
+            with open(self.path(name), 'wb' if first else 'ab') as f:
+                pacsv.write_csv(_whole_second_timestamps(chunk), f, pacsv.WriteOptions(include_header=first))
+            return
+        chunk.to_csv(self.path(name), index=False, mode='w' if first else 'a', header=first)
+
+class ArrowExporter(Exporter):
+    """Base class of the pyarrow backed columnar exporters"""
+    
+    def __init__(self, export_dir: str = 'data_exports', compression: str = 'zstd'):
+        """
+        Initialize the exporter
+        
+        Args:
+            export_dir: Directory the files are written to
+            compression: Codec applied to every column (zstd, lz4, snappy, ...)
+        """
+        if pa is None:
+            raise ImportError(f"pyarrow is required for {self.format} exports")
+        super().__init__(export_dir)
+        self.compression = compression
+        self._writers = {}
+    
+    @staticmethod
+    def _schema(chunk: Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch']) -> 'pa.Schema':
+        """Infer the file schema from the first chunk, all-NULL columns become strings"""
+        schema = chunk.schema if is_arrow(chunk) else pa.Schema.from_pandas(chunk, preserve_index=False)
+        for i, field in enumerate(schema):
+            if pa.types.is_null(field.type):
+                schema = schema.set(i, field.with_type(pa.string()))
+        return schema.remove_metadata()
+    
+    def write_chunk(self, chunk: Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch'], name: str, first: bool):
+        if first:
+            schema = self._schema(chunk)
+            self._writers[name] = (schema, self.open_writer(self.path(name), schema))
+        schema, writer = self._writers[name]
+        if is_arrow(chunk):
+            # Arrow chunks are written as they are, cast only when their types differ
+            table = pa.Table.from_batches([chunk]) if isinstance(chunk, pa.RecordBatch) else chunk
+            writer.write_table(table if table.schema.equals(schema) else table.cast(schema))
+            return
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    
+    def open_writer(self, path: str, schema: 'pa.Schema'):
+        """Open a writer with write_table() and close() for one file"""
+        raise NotImplementedError
+    
+    def finish(self, name: str):
+        self._writers.pop(name)[1].close()
+
+class ParquetExporter(ArrowExporter):
+    """Compressed Parquet, one file per analytic, one row group per chunk"""
+    
+    format = 'parquet'
+    extension = '.parquet'
+    
+    def open_writer(self, path: str, schema: 'pa.Schema'):
+        return pq.ParquetWriter(path, schema, compression=self.compression)
+
+class FeatherExporter(ArrowExporter):
+    """Compressed Feather (Arrow IPC file) readable with pd.read_feather"""
+    
+    format = 'feather'
+    extension = '.feather'
+    
+    def __init__(self, export_dir: str = 'data_exports', compression: str = 'zstd'):
+        # Feather only supports the zstd and lz4 codecs
+        super().__init__(export_dir, compression if compression in ('zstd', 'lz4') else 'zstd')
+    
+    def open_writer(self, path: str, schema: 'pa.Schema'):
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        return pa.ipc.new_file(path, schema, options=options)
+
+class XLSXExporter(Exporter):
+    """
+    One workbook with a sheet per analytic, for the Excel dashboard
+    
+    The workbook is opened in openpyxl's write-only mode, which streams rows to
+    disk as they are appended, so memory stays flat however large the sheets
+    are. Sheets appear in the order analytics are exported and the workbook is
+    saved by close().
+    """
+    
+    format = 'xlsx'
+    extension = '.xlsx'
+    
+    def __init__(self, export_dir: str = 'data_exports', filename: str = 'analytics_dashboard'):
+        """
+        Initialize the exporter
+        
+        Args:
+            export_dir: Directory the workbook is written to
+            filename: Workbook file name without extension
+        """
+        # Imported here, so runs without a workbook do not pay for openpyxl
+        from openpyxl import Workbook
+        
+        super().__init__(export_dir)
+        self.filename = filename
+        self.workbook = Workbook(write_only=True)
+        self._sheets = {}
+    
+    def path(self, name: str) -> str:
+        return os.path.join(self.export_dir, f"{self.filename}{self.extension}")
+    
+    def discard(self, name: str) -> bool:
+        # The workbook is shared by all analytics, an empty one just gets no sheet
+        return False
+    
+    def write_chunk(self, chunk: Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch'], name: str, first: bool):
+        if is_arrow(chunk):
+            chunk = chunk.to_pandas()
+        if first:
+            # Excel limits sheet names to 31 characters
+            self._sheets[name] = self.workbook.create_sheet(title=name[:31])
+            self._sheets[name].append([str(column) for column in chunk.columns])
+        sheet = self._sheets[name]
+        
+        # Cells must be plain Python values, with None for missing ones and bytes as hex text
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for column in values.columns:
+            first = values[column].first_valid_index()
+            if first is not None and isinstance(values[column][first], bytes):
+                values[column] = values[column].map(lambda value: None if value is None else value.hex())
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+    
+    def close(self) -> Optional[str]:
+        path = self.path('')
+        if not self._sheets:
+            logger.warning(f"No sheets to save, skipping {path}")
+            return None
+        self.workbook.save(path)
+        logger.info(f"Saved {len(self._sheets)} sheets to {path}")
+        return path
+
+# Format name -> exporter class, for AnalyticsEngine.export_all_analytics(formats=...)
+EXPORTERS: Dict[str, type] = {
+    'csv': CSVExporter,
+    'parquet': ParquetExporter,
+    'feather': FeatherExporter,
+    'xlsx': XLSXExporter
+}
+
+def make_exporters(formats: Iterable[str], export_dir: str = 'data_exports') -> List[Exporter]:
+    """
+    Create one exporter per format name
+    
+    Args:
+        formats: Names from EXPORTERS
+        export_dir: Directory the files are written to
+    
+    Returns:
+        list: Exporters in the given order
+    """
+    unknown = [fmt for fmt in formats if fmt not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export formats: {', '.join(unknown)} (choose from {', '.join(EXPORTERS)})")
+    return [EXPORTERS[fmt](export_dir) for fmt in formats]
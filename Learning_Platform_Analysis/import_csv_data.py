@@ -3,111 +3,630 @@ Import CSV data into MySQL course table
 Maps udemy_courses.csv columns to your course table structure
 """
 
+import numpy as np
 import pandas as pd
 import mysql.connector
 from database_connection import DatabaseConnection
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import contextlib
+import io
 import logging
+import os
+import queue
+import tempfile
+import threading
+import time
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def import_udemy_courses():
-    """Import udemy_courses.csv into the course table"""
+# CSV column -> course table column
+COURSE_COLUMN_MAP = {
+    'course_id': 'course_id',
+    'course_title': 'course_title',
+    'url': 'course_url',
+    'price': 'price',
+    'num_subscribers': 'num_subscription',
+    'num_reviews': 'num_review',
+    'num_lectures': 'num_lec',
+    'level': 'level',
+    'content_duration': 'content_duration',
+    'published_timestamp': 'publised_timestamp',
+    'subject': 'subject',
+    'is_paid': 'is_paid'
+}
+
+COURSE_COLUMNS = list(COURSE_COLUMN_MAP.values())
+
+# Columns of the rejects file: the source row, why it was rejected and its values
+# in the udemy CSV layout, so fixed rows can be imported again
+REJECT_COLUMNS = ['source_row', 'error'] + list(COURSE_COLUMN_MAP)
+
+# Maximum lengths of the course table's string columns
+COURSE_TEXT_LIMITS = {
+    'course_title': 500,
+    'course_url': 500,
+    'level': 50,
+    'publised_timestamp': 19,
+    'subject': 100
+}
+
+# Streaming reads take every column as text, so no value can fail the read and
+# coerce_course_frame rejects the rows it cannot convert
+COURSE_CSV_DTYPES = {column: str for column in COURSE_COLUMN_MAP}
+
+# Spellings of is_paid, compared lower-cased
+PAID_VALUES = ('true', '1', '1.0', 'yes')
+FREE_VALUES = ('false', '0', '0.0', 'no')
+
+COURSE_INSERT_QUERY = f"""
+INSERT INTO course ({', '.join(COURSE_COLUMNS)})
+VALUES ({', '.join(['%s'] * len(COURSE_COLUMNS))})
+"""
+
+def coerce_course_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Map udemy CSV columns onto the course table and coerce whole columns at once
+    
+    Missing numeric values default to 0 and text is truncated to the column
+    sizes of the course table. Rows whose values cannot be converted are
+    returned separately instead of being dropped.
+    
+    Args:
+        df: DataFrame read from udemy_courses.csv
+    
+    Returns:
+        tuple: (rows ready for insert, rejected source rows with an 'error' column)
+    """
+    errors = pd.Series('', index=df.index, dtype=object)
+    out = pd.DataFrame(index=df.index)
+    
+    course_id = pd.to_numeric(df['course_id'], errors='coerce')
+    errors[course_id.isna()] += 'invalid course_id; '
+    out['course_id'] = course_id
+    
+    for source, column in (('course_title', 'course_title'), ('url', 'course_url'),
+                           ('level', 'level'), ('subject', 'subject')):
+        out[column] = df[source].astype(str).str.slice(0, COURSE_TEXT_LIMITS[column])
+    
+    # Parsed once for the whole column, formatted for MySQL in UTC
+    published = pd.to_datetime(df['published_timestamp'], errors='coerce', utc=True, format='ISO8601')
+    errors[published.isna() & df['published_timestamp'].notna()] += 'invalid published_timestamp; '
+    formatted = published.dt.tz_convert(None).dt.strftime('%Y-%m-%d %H:%M:%S')
+    out['publised_timestamp'] = formatted.astype(object).where(published.notna(), None)
+    
+    for source, column, dtype in (('price', 'price', 'float64'),
+                                  ('num_subscribers', 'num_subscription', 'int64'),
+                                  ('num_reviews', 'num_review', 'int64'),
+                                  ('num_lectures', 'num_lec', 'int64'),
+                                  ('content_duration', 'content_duration', 'float64')):
+        values = pd.to_numeric(df[source], errors='coerce')
+        invalid = values.isna() & df[source].notna()
+        errors[invalid] += f'invalid {source}; '
+        out[column] = values.fillna(0).astype(dtype)
+    
+    if df['is_paid'].dtype == bool:
+        out['is_paid'] = df['is_paid']
+    else:
+        # Missing values mean free, like the course table's default
+        flags = df['is_paid'].astype(str).str.strip().str.lower()
+        out['is_paid'] = flags.isin(PAID_VALUES)
+        errors[~flags.isin(PAID_VALUES + FREE_VALUES) & df['is_paid'].notna()] += 'invalid is_paid; '
+    
+    rejected_mask = errors != ''
+    clean = out.loc[~rejected_mask, COURSE_COLUMNS].copy()
+    clean['course_id'] = clean['course_id'].astype('int64')
+    
+    rejected = df.loc[rejected_mask].copy()
+    rejected['error'] = errors[rejected_mask].str.rstrip('; ')
+    return clean, rejected
+
+def reject_frame(rejected: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring rejected rows into the REJECT_COLUMNS layout
+    
+    Rows rejected by coerce_course_frame carry the CSV's columns, rows
+    rejected by the insert the course table's; both are mapped back to the
+    CSV's names, and columns missing from either are left empty.
+    
+    Args:
+        rejected: Rejected rows indexed by source row, with an 'error' column
+    
+    Returns:
+        pd.DataFrame: The rows with exactly REJECT_COLUMNS
+    """
+    csv_names = {column: source for source, column in COURSE_COLUMN_MAP.items()}
+    frame = rejected.rename(columns=csv_names)
+    frame.insert(0, 'source_row', rejected.index)
+    return frame.reindex(columns=REJECT_COLUMNS)
+
+def write_rejected_rows(rejected: pd.DataFrame, path: str):
+    """
+    Append rejected rows to a side file so they can be fixed and re-imported
+    
+    Every row is written in the REJECT_COLUMNS layout, whatever rejected it.
+    A file with another header, from an earlier version, is moved aside to
+    <path>.old instead of being appended to.
+    
+    Args:
+        rejected: Rejected rows with an 'error' column
+        path: CSV file the rows are appended to
+    """
+    if rejected.empty:
+        return
+    
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, newline='') as f:
+            header = f.readline().rstrip('\r\n')
+        if header != ','.join(REJECT_COLUMNS):
+            os.replace(path, f"{path}.old")
+            logger.warning(f"Moved {path} with an older layout to {path}.old")
+    
+    write_header = not os.path.exists(path) or not os.path.getsize(path)
+    reject_frame(rejected).to_csv(path, mode='a', header=write_header, index=False)
+    logger.warning(f"Wrote {len(rejected)} rejected rows to {path}")
+
+def insert_course_batches(db: DatabaseConnection, clean: pd.DataFrame,
+                          batch_size: int = 1000,
+                          on_commit: Optional[Callable[[int, pd.DataFrame], None]] = None) -> Tuple[int, pd.DataFrame]:
+    """
+    Insert coerced course rows with one executemany and one commit per batch
+    
+    If a batch fails it is rolled back and retried row by row, so a single bad
+    row only rejects itself.
+    
+    Args:
+        db: Connected DatabaseConnection
+        clean: Rows returned by coerce_course_frame
+        batch_size: Number of rows per INSERT batch
+        on_commit: Called after each committed batch with the source row index
+                   after its last row and the batch's rejected rows
+    
+    Returns:
+        tuple: (number of inserted rows, rejected rows with an 'error' column)
+    """
+    inserted_count = 0
+    rejected_rows = []
+    
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(clean), batch_size):
+                batch = clean.iloc[start:start + batch_size]
+                rows = list(batch.itertuples(index=False, name=None))
+                
+                batch_rejects = []
+                try:
+                    cursor.executemany(COURSE_INSERT_QUERY, rows)
+                    connection.commit()
+                    inserted_count += len(rows)
+                except mysql.connector.Error as e:
+                    connection.rollback()
+                    logger.warning(f"Batch starting at row {batch.index[0]} failed ({e}), retrying row by row")
+                    
+                    for index, values in zip(batch.index, rows):
+                        try:
+                            cursor.execute(COURSE_INSERT_QUERY, values)
+                            inserted_count += 1
+                        except mysql.connector.Error as row_error:
+                            batch_rejects.append((index, str(row_error)))
+                    connection.commit()
+                
+                rejected_rows.extend(batch_rejects)
+                if on_commit:
+                    on_commit(int(batch.index[-1]) + 1, failed_rows(clean, batch_rejects))
+                logger.info(f"Inserted {inserted_count} rows...")
+        finally:
+            cursor.close()
+    
+    return inserted_count, failed_rows(clean, rejected_rows)
+
+def failed_rows(clean: pd.DataFrame, failures: List[Tuple[Any, str]]) -> pd.DataFrame:
+    """Rows of clean that failed to insert, with their 'error'"""
+    rejected = clean.loc[[index for index, _ in failures]].copy()
+    rejected['error'] = [error for _, error in failures]
+    return rejected
+
+def load_courses_infile(db: DatabaseConnection, clean: pd.DataFrame) -> int:
+    """
+    Load coerced course rows with LOAD DATA LOCAL INFILE
+    
+    The connection must be opened with allow_local_infile=True and the server
+    must have local_infile enabled.
+    
+    Args:
+        db: Connected DatabaseConnection
+        clean: Rows returned by coerce_course_frame
+    
+    Returns:
+        int: Number of rows loaded
+    """
+    frame = clean.copy()
+    frame['is_paid'] = frame['is_paid'].astype(int)
+    
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        
+        try:
+            frame.to_csv(path, index=False, header=False, lineterminator='\n')
+            cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}'
+            INTO TABLE course
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({', '.join(COURSE_COLUMNS)})
+            """)
+            loaded = cursor.rowcount
+            
+            cursor.execute("SHOW WARNINGS")
+            for level, code, message in cursor.fetchall():
+                logger.warning(f"LOAD DATA {level} {code}: {message}")
+            
+            connection.commit()
+            return loaded
+        finally:
+            cursor.close()
+            os.remove(path)
+
+def read_checkpoint(path: str) -> Tuple[int, Optional[int], Optional[int]]:
+    """
+    Read the source offsets recorded by the last committed batch
+    
+    Args:
+        path: Checkpoint file path
+    
+    Returns:
+        tuple: (number of source rows already imported, 0 if there is no checkpoint,
+        size of the rejects file at that point or None if not recorded,
+        byte offset of the next source record or None if not recorded)
+    """
+    if not os.path.exists(path):
+        return 0, None, None
+    
+    with open(path) as f:
+        fields = [int(field) for field in f.read().split()]
+    if not fields:
+        return 0, None, None
+    fields += [None] * (3 - len(fields))
+    return fields[0], fields[1], fields[2]
+
+def write_checkpoint(path: str, offset: int, rejects_bytes: int, source_byte: int):
+    """
+    Atomically record the source offsets of the last committed batch
+    
+    Args:
+        path: Checkpoint file path
+        offset: Number of source rows imported so far
+        rejects_bytes: Size of the rejects file once the rejects up to offset are written
+        source_byte: Byte offset in the source file of the record after offset's last row
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(f"{offset} {rejects_bytes} {source_byte}")
+    os.replace(temp_path, path)
+
+def file_size(path: str) -> int:
+    """Size of a file in bytes, 0 if it does not exist"""
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def read_course_chunks(csv_path: str, chunksize: int = 50000, start_offset: int = 0,
+                       start_byte: Optional[int] = None,
+                       block_size: int = 1 << 20) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+    """
+    Read the udemy courses CSV in chunks of text columns, with the byte offset after each row
+    
+    The file is read in blocks and split on record boundaries (newlines outside
+    quotes, as in sharded_loader.record_boundaries), and each chunk's records are
+    parsed with the header's columns, so memory holds one chunk and one block
+    whatever the file size or start offset. Blank lines are not rows.
+    
+    Args:
+        csv_path: Path of the udemy courses CSV file
+        chunksize: Number of rows per chunk
+        start_offset: Number of data rows to skip from the start of the file
+        start_byte: Byte offset of row start_offset, read from there instead of
+                    scanning past the skipped rows
+        block_size: Bytes read from the file at a time
+    
+    Yields:
+        tuple: (chunk of source rows indexed by their row position in the file,
+        int64 array of the byte offset after each of its rows)
+    """
+    with open(csv_path, 'rb') as f:
+        columns = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns
+        if start_byte is not None:
+            f.seek(start_byte)
+        # Rows before row are skipped by scanning their records, without parsing them
+        row = start_offset if start_byte is not None else 0
+        buffer_start, buffer = f.tell(), b''
+        ends, scanned, in_quotes = [], 0, False
+        at_end = False
+        
+        while True:
+            block = b'' if at_end else f.read(block_size)
+            at_end = not block
+            buffer += block
+            data = np.frombuffer(buffer, dtype=np.uint8)[scanned:]
+            parity = np.bitwise_xor.accumulate(data == ord('"')) ^ in_quotes
+            ends.extend((np.flatnonzero((data == ord('\n')) & ~parity) + scanned + 1).tolist())
+            if len(data):
+                in_quotes = bool(parity[-1])
+            scanned = len(buffer)
+            if at_end and (not ends or ends[-1] < len(buffer)) and buffer[ends[-1] if ends else 0:].strip():
+                # The last record has no newline
+                ends.append(len(buffer))
+            
+            record_ends = np.array(ends, dtype=np.int64)
+            record_starts = np.concatenate(([0], record_ends[:-1]))
+            blank = [i for i in np.flatnonzero(record_ends - record_starts <= 2)
+                     if not buffer[record_starts[i]:record_ends[i]].strip()]
+            row_ends = np.delete(record_ends, blank)
+            
+            taken = 0
+            while len(row_ends) - taken >= (chunksize if not at_end else 1):
+                count = min(chunksize, len(row_ends) - taken)
+                if row < start_offset:
+                    count = min(count, start_offset - row)
+                chunk_ends = row_ends[taken:taken + count]
+                first = int(row_ends[taken - 1]) if taken else 0
+                if row >= start_offset:
+                    records = io.BytesIO(memoryview(buffer)[first:int(chunk_ends[-1])])
+                    chunk = pd.read_csv(records, names=columns, header=None, dtype=COURSE_CSV_DTYPES)
+                    if len(chunk) != count:
+                        raise ValueError(f"Parsed {len(chunk)} rows from {count} records at byte {buffer_start + first}")
+                    chunk.index = pd.RangeIndex(row, row + count)
+                    yield chunk, chunk_ends + buffer_start
+                row += count
+                taken += count
+            
+            if taken:
+                cut = int(row_ends[taken - 1])
+                buffer, buffer_start = buffer[cut:], buffer_start + cut
+                ends = [end - cut for end in ends if end > cut]
+                scanned -= cut
+            if at_end:
+                return
+
+def iter_course_chunks(csv_path: str, chunksize: int = 50000,
+                       start_offset: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Read the udemy courses CSV in chunks of text columns
+    
+    The returned chunks are indexed by their row position in the source file,
+    so offsets stay valid when the read resumes part way through.
+    
+    Args:
+        csv_path: Path of the udemy courses CSV file
+        chunksize: Number of rows per chunk
+        start_offset: Number of data rows to skip from the start of the file
+    
+    Yields:
+        pd.DataFrame: Next chunk of source rows
+    """
+    for chunk, _ in read_course_chunks(csv_path, chunksize, start_offset):
+        yield chunk
+
+def prefetch(items: Iterable, depth: int = 1) -> Iterator:
+    """
+    Produce items from a background thread while the caller consumes them
+    
+    At most depth items are buffered, which keeps memory bounded while the
+    next item is prepared during the caller's work on the current one.
+    
+    Args:
+        items: Iterable to consume in the background
+        depth: Number of items buffered ahead of the caller
+    
+    Yields:
+        Items of the iterable in order
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+    
+    def produce():
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        buffer.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            buffer.put((done, None))
+        except Exception as e:
+            buffer.put((done, e))
+    
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+def stream_import_udemy_courses(csv_path: str = 'udemy_courses.csv', chunksize: int = 50000,
+                                batch_size: int = 1000,
+                                rejects_path: str = 'rejected_courses.csv',
+                                checkpoint_path: Optional[str] = None,
+                                db: Optional[DatabaseConnection] = None) -> Optional[int]:
+    """
+    Import the udemy courses CSV chunk by chunk with bounded memory
+    
+    Chunk N+1 is parsed and coerced on a background thread while chunk N is
+    inserted. After every committed batch the source row and byte offsets are
+    checkpointed, so a crashed import resumes from the last committed row on
+    the next run, seeking straight to it.
+    
+    Args:
+        csv_path: Path of the udemy courses CSV file
+        chunksize: Number of source rows read per chunk
+        batch_size: Number of rows per INSERT batch and commit
+        rejects_path: CSV file that receives rows which could not be imported
+        checkpoint_path: Offset file, defaults to '<csv_path>.checkpoint'
+        db: Connected (optionally pooled) DatabaseConnection to reuse
+    
+    Returns:
+        int: Number of courses imported by this run or None if the import failed
+    """
+    checkpoint_path = checkpoint_path or f"{csv_path}.checkpoint"
+    start_offset, rejects_bytes, start_byte = read_checkpoint(checkpoint_path)
+    if start_offset:
+        logger.info(f"Resuming import of {csv_path} from row {start_offset}")
+        # Rejects written after the checkpoint belong to rows that are read again
+        if rejects_bytes is not None and file_size(rejects_path) > rejects_bytes:
+            with open(rejects_path, 'r+b') as f:
+                f.truncate(rejects_bytes)
+    
+    owns_connection = db is None
+    if owns_connection:
+        db = DatabaseConnection()
+        if not db.connect():
+            logger.error("Failed to connect to database")
+            return None
+    
+    def coerced_chunks():
+        for chunk, row_ends in read_course_chunks(csv_path, chunksize, start_offset, start_byte):
+            clean, rejected = coerce_course_frame(chunk)
+            yield chunk.index[0], row_ends, clean, rejected
+    
+    started = time.perf_counter()
+    inserted_count = 0
+    
+    try:
+        for chunk_start, row_ends, clean, rejected in prefetch(coerced_chunks()):
+            chunk_end = chunk_start + len(row_ends)
+            
+            # Rejects are written with the batch that commits past them, and the
+            # checkpoint records the rejects file's size, so a resumed import
+            # writes every reject exactly once
+            def committed(offset: int, failed: pd.DataFrame):
+                nonlocal rejected
+                write_rejected_rows(rejected.loc[rejected.index < offset], rejects_path)
+                write_rejected_rows(failed, rejects_path)
+                rejected = rejected.loc[rejected.index >= offset]
+                write_checkpoint(checkpoint_path, offset, file_size(rejects_path),
+                                 int(row_ends[offset - chunk_start - 1]))
+            
+            inserted, _ = insert_course_batches(db, clean, batch_size, on_commit=committed)
+            committed(chunk_end, rejected.iloc[0:0])
+            
+            inserted_count += inserted
+            elapsed = time.perf_counter() - started
+            rate = inserted_count / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Committed source rows up to {chunk_end} ({rate:.0f} rows/sec)")
+        
+        elapsed = time.perf_counter() - started
+        rate = inserted_count / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Successfully imported {inserted_count} courses in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+        
+        # The file is fully imported, the next run starts from the beginning
+        # (an empty file never wrote a checkpoint)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(checkpoint_path)
+        return inserted_count
+    
+    except Exception as e:
+        logger.error(f"Error during streaming import: {e}")
+        return None
+    
+    finally:
+        if owns_connection:
+            db.close()
+
+def import_udemy_courses(csv_path: str = 'udemy_courses.csv', batch_size: int = 1000,
+                         use_load_data: bool = False,
+                         rejects_path: str = 'rejected_courses.csv',
+                         chunksize: Optional[int] = None,
+                         db: Optional[DatabaseConnection] = None) -> Optional[int]:
+    """
+    Import udemy_courses.csv into the course table
+    
+    Args:
+        csv_path: Path of the udemy courses CSV file
+        batch_size: Number of rows per INSERT batch and commit
+        use_load_data: Use LOAD DATA LOCAL INFILE instead of batched INSERTs
+        rejects_path: CSV file that receives rows which could not be imported
+        chunksize: Stream the file in chunks of this many rows (resumable)
+        db: Connected (optionally pooled) DatabaseConnection to reuse
+    
+    Returns:
+        int: Number of imported courses or None if the import failed
+    """
+    if chunksize:
+        return stream_import_udemy_courses(csv_path, chunksize, batch_size, rejects_path, db=db)
     
     # Read the CSV file
     try:
-        df = pd.read_csv('udemy_courses.csv')
+        df = pd.read_csv(csv_path)
         logger.info(f"Successfully loaded CSV with {len(df)} rows")
-        print(f"CSV columns: {list(df.columns)}")
-        print(f"First few rows:")
-        print(df.head())
     except Exception as e:
         logger.error(f"Error reading CSV file: {e}")
-        return
+        return None
+    
+    started = time.perf_counter()
+    clean, rejected = coerce_course_frame(df)
+    write_rejected_rows(rejected, rejects_path)
     
     # Connect to database
-    db = DatabaseConnection()
-    if not db.connect():
-        logger.error("Failed to connect to database")
-        return
+    owns_connection = db is None
+    if owns_connection:
+        db = DatabaseConnection(allow_local_infile=use_load_data)
+        if not db.connect():
+            logger.error("Failed to connect to database")
+            return None
     
     try:
-        cursor = db.connection.cursor()
-        
         # Clear existing data (optional - remove this if you want to keep existing data)
-        # cursor.execute("DELETE FROM course")
-        # logger.info("Cleared existing course data")
-        
-        # First, let's check the actual table structure
-        cursor.execute("DESCRIBE course")
-        columns = cursor.fetchall()
-        print("Actual course table columns:")
-        for col in columns:
-            print(f"  {col[0]} - {col[1]}")
-        
-        # Prepare the insert query with correct column names from your schema
-        insert_query = """
-        INSERT INTO course (
-            course_id, course_title, course_url, price, num_subscription, 
-            num_review, num_lec, level, content_duration, publised_timestamp, 
-            subject, is_paid
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+        # db.execute_query("DELETE FROM course")
         
-        # Process each row
-        inserted_count = 0
-        for index, row in df.iterrows():
-            try:
-                # Map CSV columns to database columns
-                values = (
-                    int(row['course_id']),                    # course_id
-                    str(row['course_title'])[:500],           # course_title (truncate to fit)
-                    str(row['url'])[:500],                    # course_url
-                    float(row['price']) if pd.notna(row['price']) else 0.0,  # price
-                    int(row['num_subscribers']) if pd.notna(row['num_subscribers']) else 0,  # num_subscription
-                    int(row['num_reviews']) if pd.notna(row['num_reviews']) else 0,  # num_review
-                    int(row['num_lectures']) if pd.notna(row['num_lectures']) else 0,  # num_lec
-                    str(row['level'])[:50],                   # level
-                    float(row['content_duration']) if pd.notna(row['content_duration']) else 0.0,  # content_duration
-                    str(row['published_timestamp'])[:19],     # publised_timestamp (truncate to fit datetime)
-                    str(row['subject'])[:100],                # subject
-                    bool(row['is_paid'])                      # is_paid
-                )
-                
-                cursor.execute(insert_query, values)
-                inserted_count += 1
-                
-                if inserted_count % 100 == 0:
-                    logger.info(f"Inserted {inserted_count} rows...")
-                    
-            except Exception as e:
-                logger.warning(f"Error inserting row {index}: {e}")
-                continue
+        if use_load_data:
+            inserted_count = load_courses_infile(db, clean)
+        else:
+            inserted_count, failed = insert_course_batches(db, clean, batch_size)
+            write_rejected_rows(failed, rejects_path)
         
-        # Commit the changes
-        db.connection.commit()
-        logger.info(f"Successfully imported {inserted_count} courses into database")
+        elapsed = time.perf_counter() - started
+        rate = inserted_count / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Successfully imported {inserted_count} courses in {elapsed:.2f}s ({rate:.0f} rows/sec)")
         
         # Verify the import
-        cursor.execute("SELECT COUNT(*) FROM course")
-        total_courses = cursor.fetchone()[0]
-        logger.info(f"Total courses in database: {total_courses}")
-        
-        cursor.close()
+        total_courses = db.execute_query("SELECT COUNT(*) FROM course")
+        if total_courses:
+            logger.info(f"Total courses in database: {total_courses[0][0]}")
         
+        return inserted_count
+    
     except Exception as e:
         logger.error(f"Error during import: {e}")
-        db.connection.rollback()
+        return None
     
     finally:
-        db.close()
+        if owns_connection:
+            db.close()
 
-def add_sample_users_and_enrollments():
-    """Add sample users and enrollments to test the analytics"""
+def add_sample_users_and_enrollments() -> bool:
+    """
+    Add sample users and enrollments to test the analytics
+    
+    Returns:
+        bool: True if the sample data was committed, False otherwise
+    """
     
     db = DatabaseConnection()
     if not db.connect():
-        return
+        return False
     
     try:
         cursor = db.connection.cursor()
@@ -170,16 +689,19 @@ def add_sample_users_and_enrollments():
         
         db.connection.commit()
         logger.info("Sample data added successfully!")
-        
+        return True
+    
     except Exception as e:
         logger.error(f"Error adding sample data: {e}")
         db.connection.rollback()
+        return False
     
     finally:
         cursor.close()
         db.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     print("=== Importing Udemy Courses CSV ===")
     import_udemy_courses()
     
@@ -0,0 +1,339 @@
+"""
+Incremental Aggregates for Course Platform Analytics
+Maintains per-month summary tables for registration trends and cohort retention
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from datetime import timedelta
+from typing import Optional
+import argparse
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Summary tables. NULL months/subscription types are stored as '' so they can
+# be part of the primary key, and users that never logged in get login_date
+# 1000-01-01 so they never count as active.
+SUMMARY_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_user_state (
+        user_id INT PRIMARY KEY,
+        registration_month CHAR(7) NOT NULL,
+        subscription_type VARCHAR(20) NOT NULL,
+        login_date DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_monthly_registrations (
+        month CHAR(7) NOT NULL,
+        subscription_type VARCHAR(20) NOT NULL,
+        new_users INT NOT NULL,
+        PRIMARY KEY (month, subscription_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_cohort_logins (
+        registration_month CHAR(7) NOT NULL,
+        login_date DATE NOT NULL,
+        users INT NOT NULL,
+        PRIMARY KEY (registration_month, login_date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_watermarks (
+        name VARCHAR(50) PRIMARY KEY,
+        value DATETIME NOT NULL
+    )
+    """
+]
+
+# Projection of a user row onto its contribution to the summary tables
+USER_STATE_SELECT = """
+SELECT
+    user_id,
+    COALESCE(DATE_FORMAT(regi_date, '%Y-%m'), '') AS registration_month,
+    COALESCE(subscription_type, '') AS subscription_type,
+    COALESCE(DATE(last_login), '1000-01-01') AS login_date
+FROM user
+"""
+
+class IncrementalAggregates:
+    """
+    Keeps registration and cohort summaries current by folding in changed users only
+    
+    A refresh reads users whose regi_date or last_login is at or after the
+    previous refresh's NOW() minus update_lag seconds. A row written with an
+    earlier timestamp but committed after that refresh read the table is
+    picked up by the next refresh as long as it commits within the lag. Rows
+    committed later than that, and deleted users, need a rebuild().
+    """
+    
+    WATERMARK = 'user_activity'
+    LOCK_NAME = 'agg_user_refresh'
+    
+    def __init__(self, db_connection: DatabaseConnection, lock_timeout: int = 60, update_lag: float = 60):
+        """
+        Initialize the aggregates on a database connection
+        
+        Args:
+            db_connection: Connected DatabaseConnection
+            lock_timeout: Seconds to wait for a concurrent refresh to finish
+            update_lag: Seconds before the stored watermark that each refresh re-reads,
+                        for transactions that commit after their timestamps
+        """
+        self.db = db_connection
+        self.lock_timeout = lock_timeout
+        self.update_lag = update_lag
+    
+    def _run(self, statements, full_rebuild: bool):
+        """Run refresh statements in one transaction under a named lock"""
+        with self.db.checkout() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, %s)", (self.LOCK_NAME, self.lock_timeout))
+                if cursor.fetchone()[0] != 1:
+                    raise TimeoutError("Another aggregate refresh is still running")
+                
+                try:
+                    for statement in SUMMARY_TABLES_DDL:
+                        cursor.execute(statement)
+                    
+                    cursor.execute("SELECT NOW()")
+                    new_watermark = cursor.fetchone()[0]
+                    cursor.execute("SELECT value FROM agg_watermarks WHERE name = %s", (self.WATERMARK,))
+                    row = cursor.fetchone()
+                    
+                    if row is None and not full_rebuild:
+                        logger.info("No watermark stored yet, running a full rebuild")
+                        statements, full_rebuild = self._rebuild_statements(), True
+                    
+                    started = time.perf_counter()
+                    changed_users = None
+                    for statement, params in statements:
+                        cursor.execute(statement, params(row[0] if row else None) if params else ())
+                        if statement.lstrip().startswith('INSERT INTO agg_user_delta'):
+                            changed_users = cursor.rowcount
+                    
+                    cursor.execute("""
+                    INSERT INTO agg_watermarks (name, value) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE value = VALUES(value)
+                    """, (self.WATERMARK, new_watermark))
+                    connection.commit()
+                    
+                    elapsed = time.perf_counter() - started
+                    if full_rebuild:
+                        logger.info(f"Rebuilt registration and cohort aggregates in {elapsed:.2f}s")
+                    else:
+                        logger.info(f"Folded {changed_users} changed users into aggregates in {elapsed:.2f}s")
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.execute("DROP TEMPORARY TABLE IF EXISTS agg_user_delta")
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                    cursor.fetchall()
+            finally:
+                cursor.close()
+    
+    def _rebuild_statements(self):
+        """Statements that recompute every summary table from the user table"""
+        return [
+            ("DELETE FROM agg_user_state", None),
+            ("DELETE FROM agg_monthly_registrations", None),
+            ("DELETE FROM agg_cohort_logins", None),
+            (f"INSERT INTO agg_user_state (user_id, registration_month, subscription_type, login_date) {USER_STATE_SELECT}", None),
+            ("""
+            INSERT INTO agg_monthly_registrations (month, subscription_type, new_users)
+            SELECT registration_month, subscription_type, COUNT(*)
+            FROM agg_user_state
+            GROUP BY registration_month, subscription_type
+            """, None),
+            ("""
+            INSERT INTO agg_cohort_logins (registration_month, login_date, users)
+            SELECT registration_month, login_date, COUNT(*)
+            FROM agg_user_state
+            GROUP BY registration_month, login_date
+            """, None)
+        ]
+    
+    def _refresh_statements(self):
+        """
+        Statements that fold users registered or logged in since the watermark
+        
+        The previous contribution of every changed user is subtracted before
+        the new one is added, so re-reading a user is harmless and the
+        watermark only bounds how much of the user table is read. That lets
+        every refresh re-read update_lag seconds before the watermark.
+        """
+        lag = timedelta(seconds=self.update_lag)
+        return [
+            ("""
+            CREATE TEMPORARY TABLE agg_user_delta (
+                user_id INT PRIMARY KEY,
+                registration_month CHAR(7) NOT NULL,
+                subscription_type VARCHAR(20) NOT NULL,
+                login_date DATE NOT NULL
+            )
+            """, None),
+            (f"""
+            INSERT INTO agg_user_delta (user_id, registration_month, subscription_type, login_date)
+            {USER_STATE_SELECT.replace('%', '%%')}
+            WHERE regi_date >= %s OR last_login >= %s
+            """, lambda watermark: (watermark - lag, watermark - lag)),
+            ("""
+            UPDATE agg_monthly_registrations r
+            JOIN (
+                SELECT s.registration_month, s.subscription_type, COUNT(*) AS users
+                FROM agg_user_state s
+                JOIN agg_user_delta d ON d.user_id = s.user_id
+                GROUP BY s.registration_month, s.subscription_type
+            ) old ON old.registration_month = r.month AND old.subscription_type = r.subscription_type
+            SET r.new_users = r.new_users - old.users
+            """, None),
+            ("""
+            UPDATE agg_cohort_logins c
+            JOIN (
+                SELECT s.registration_month, s.login_date, COUNT(*) AS users
+                FROM agg_user_state s
+                JOIN agg_user_delta d ON d.user_id = s.user_id
+                GROUP BY s.registration_month, s.login_date
+            ) old ON old.registration_month = c.registration_month AND old.login_date = c.login_date
+            SET c.users = c.users - old.users
+            """, None),
+            ("""
+            INSERT INTO agg_monthly_registrations (month, subscription_type, new_users)
+            SELECT registration_month, subscription_type, COUNT(*)
+            FROM agg_user_delta
+            GROUP BY registration_month, subscription_type
+            ON DUPLICATE KEY UPDATE new_users = new_users + VALUES(new_users)
+            """, None),
+            ("""
+            INSERT INTO agg_cohort_logins (registration_month, login_date, users)
+            SELECT registration_month, login_date, COUNT(*)
+            FROM agg_user_delta
+            GROUP BY registration_month, login_date
+            ON DUPLICATE KEY UPDATE users = users + VALUES(users)
+            """, None),
+            ("""
+            INSERT INTO agg_user_state (user_id, registration_month, subscription_type, login_date)
+            SELECT user_id, registration_month, subscription_type, login_date
+            FROM agg_user_delta
+            ON DUPLICATE KEY UPDATE
+                registration_month = VALUES(registration_month),
+                subscription_type = VALUES(subscription_type),
+                login_date = VALUES(login_date)
+            """, None),
+            ("DELETE FROM agg_monthly_registrations WHERE new_users = 0", None),
+            ("DELETE FROM agg_cohort_logins WHERE users = 0", None)
+        ]
+    
+    def refresh(self) -> bool:
+        """
+        Fold users registered or logged in since the last refresh into the summaries
+        
+        The first refresh, with no stored watermark, runs a full rebuild.
+        
+        Returns:
+            bool: True if the refresh succeeded
+        """
+        try:
+            self._run(self._refresh_statements(), full_rebuild=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing aggregates: {e}")
+            return False
+    
+    def rebuild(self) -> bool:
+        """
+        Recompute every summary table from scratch, e.g. after a backfill or deletes
+        
+        Returns:
+            bool: True if the rebuild succeeded
+        """
+        try:
+            self._run(self._rebuild_statements(), full_rebuild=True)
+            return True
+        except Exception as e:
+            logger.error(f"Error rebuilding aggregates: {e}")
+            return False
+    
+    def registration_trends(self) -> Optional[pd.DataFrame]:
+        """Get new users per month and subscription type from the summary table"""
+        query = """
+        SELECT
+            NULLIF(month, '') AS month,
+            NULLIF(subscription_type, '') AS subscription_type,
+            new_users
+        FROM agg_monthly_registrations
+        WHERE new_users > 0
+        ORDER BY
+            month,
+            subscription_type
+        """
+        return self.db.fetch_dataframe(query)
+    
+    def cohort_analysis(self) -> Optional[pd.DataFrame]:
+        """
+        Get cohort retention from the summary table
+        
+        Whole days after the 30 day cutoff come from the summary table; logins
+        on the cutoff day itself are counted exactly from the user table, which
+        only reads one day of last_login values.
+        """
+        query = """
+        SELECT
+            NULLIF(c.registration_month, '') AS registration_month,
+            c.total_users,
+            CAST(c.active_users + COALESCE(b.users, 0) AS SIGNED) AS active_last_30_days,
+            ROUND(
+                (c.active_users + COALESCE(b.users, 0)) * 100.0 / c.total_users,
+                2
+            ) AS retention_rate
+        FROM (
+            SELECT
+                registration_month,
+                CAST(SUM(users) AS SIGNED) AS total_users,
+                CAST(SUM(CASE WHEN login_date > DATE(DATE_SUB(NOW(), INTERVAL 30 DAY)) THEN users ELSE 0 END) AS SIGNED) AS active_users
+            FROM agg_cohort_logins
+            GROUP BY registration_month
+            HAVING total_users > 0
+        ) c
+        LEFT JOIN (
+            SELECT
+                COALESCE(DATE_FORMAT(regi_date, '%Y-%m'), '') AS registration_month,
+                COUNT(*) AS users
+            FROM user
+            WHERE last_login >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+              AND last_login < DATE(DATE_SUB(NOW(), INTERVAL 30 DAY)) + INTERVAL 1 DAY
+            GROUP BY registration_month
+        ) b ON b.registration_month = c.registration_month
+        ORDER BY registration_month
+        """
+        return self.db.fetch_dataframe(query)
+
+def main():
+    """Refresh or rebuild the incremental aggregates from the command line"""
+    parser = argparse.ArgumentParser(description="Maintain registration and cohort summary tables")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Recompute the summary tables from scratch (for backfills and deletes)")
+    parser.add_argument('--update-lag', type=float, default=60,
+                        help="Seconds before the last refresh that are read again (default: 60)")
+    args = parser.parse_args()
+    
+    db = DatabaseConnection()
+    if not db.connect():
+        print("[ERROR] Database connection failed")
+        return
+    
+    try:
+        aggregates = IncrementalAggregates(db, update_lag=args.update_lag)
+        ok = aggregates.rebuild() if args.rebuild else aggregates.refresh()
+        print("[SUCCESS] Aggregates updated" if ok else "[ERROR] Aggregate update failed")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,236 @@
+"""
+Index Advisor for Course Platform Analytics
+Explains every analytics query, flags full scans and filesorts, and manages the
+indexes the analytics workload needs
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from analytics_engine import AnalyticsEngine
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (table, index name, columns, queries served) for the analytics workload.
+# Each index is covering for the columns the listed queries read from its table.
+RECOMMENDED_INDEXES = [
+    ('erp', 'idx_erp_course_status_rating', ('course_id', 'completion_status', 'rating_given'),
+     'course_rankings, completion_rates'),
+    ('erp', 'idx_erp_user_course_progress', ('user_id', 'course_id', 'progress_per'),
+     'engagement_metrics'),
+    ('erp', 'idx_erp_rating', ('rating_given',),
+     'catalog_scan'),
+    ('subscriptions', 'idx_subscriptions_plan_status_fee', ('plan_type', 'status', 'monthely_fee'),
+     'subscription_scan'),
+    ('user', 'idx_user_subscription_active', ('subscription_type', 'is_active'),
+     'user_scan, engagement_metrics'),
+    ('user', 'idx_user_regi_date_subscription', ('regi_date', 'subscription_type'),
+     'user_registration_trends, cohort_analysis, incremental aggregates'),
+    ('user', 'idx_user_last_login', ('last_login',),
+     'cohort_analysis, incremental aggregates'),
+    ('course_interactions', 'idx_interactions_user', ('user_id',),
+     'engagement_metrics'),
+    # Range scans of date-windowed analytics, see query_filters
+    ('erp', 'idx_erp_date_course', ('erp_date', 'course_id', 'user_id'),
+     'windowed course_rankings, completion_rates, engagement_metrics'),
+    ('course_interactions', 'idx_interactions_date_user', ('interaction_data', 'user_id', 'course_id'),
+     'windowed engagement_metrics'),
+    ('subscriptions', 'idx_subscriptions_start_plan', ('start_date', 'plan_type', 'status', 'monthely_fee'),
+     'windowed subscription_scan'),
+    ('user', 'idx_user_country_regi_date', ('country', 'regi_date', 'subscription_type'),
+     'country-filtered user_scan, user_registration_trends, cohort_analysis')
+]
+
+def explain_query(db: DatabaseConnection, query: str, analyze: bool = False,
+                  params: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+    """
+    Explain a query and summarize its plan
+    
+    Args:
+        db: Connected DatabaseConnection
+        query: SQL query string
+        analyze: Also run EXPLAIN ANALYZE, which executes the query (MySQL 8.0.18+)
+        params: Values of the query's named %(name)s parameters
+    
+    Returns:
+        dict: cost, full_scans, filesort, temporary (and analyze output), or None if error
+    """
+    plan_json = db.execute_query(f"EXPLAIN FORMAT=JSON {query}", params)
+    plan_rows = db.execute_query(f"EXPLAIN {query}", params)
+    if plan_json is None or plan_rows is None:
+        return None
+    
+    cost_info = json.loads(plan_json[0][0])['query_block'].get('cost_info', {})
+    # Traditional EXPLAIN columns: id, select_type, table, partitions, type,
+    # possible_keys, key, key_len, ref, rows, filtered, Extra
+    full_scans = sorted({row[2] for row in plan_rows if row[4] == 'ALL' and not str(row[2]).startswith('<')})
+    extras = ' '.join(str(row[11] or '') for row in plan_rows)
+    
+    result = {
+        'cost': float(cost_info.get('query_cost', 0)),
+        'examined_rows': sum(int(row[9] or 0) for row in plan_rows),
+        'full_scans': full_scans,
+        'filesort': 'Using filesort' in extras,
+        'temporary': 'Using temporary' in extras
+    }
+    
+    if analyze:
+        analyzed = db.execute_query(f"EXPLAIN ANALYZE {query}", params)
+        result['analyze'] = analyzed[0][0] if analyzed else None
+    
+    return result
+
+def analyze_workload(db: DatabaseConnection, analyze: bool = False,
+                     filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Explain every registered AnalyticsEngine query
+    
+    Args:
+        db: Connected DatabaseConnection
+        analyze: Also run EXPLAIN ANALYZE for actual timings
+        filters: Explain the queries as filtered by these filters, see query_filters
+    
+    Returns:
+        pd.DataFrame: One row per query with its cost and plan flags
+    """
+    report = []
+    for name, (query, tables, params) in AnalyticsEngine(db, filters=filters).registered_queries().items():
+        plan = explain_query(db, query, analyze, params)
+        if plan is None:
+            logger.error(f"Could not explain {name}")
+            continue
+        
+        plan['query'] = name
+        plan['full_scans'] = ', '.join(plan['full_scans'])
+        report.append(plan)
+        
+        flags = [flag for flag in ('filesort', 'temporary') if plan[flag]]
+        if plan['full_scans']:
+            flags.append(f"full scan of {plan['full_scans']}")
+        if flags:
+            logger.warning(f"{name}: {', '.join(flags)}")
+    
+    columns = ['query', 'cost', 'examined_rows', 'full_scans', 'filesort', 'temporary']
+    return pd.DataFrame(report, columns=columns + (['analyze'] if analyze else []))
+
+def existing_indexes(db: DatabaseConnection) -> Dict[str, List[str]]:
+    """
+    List the index names of every table in the current database
+    
+    Returns:
+        dict: table name -> index names
+    """
+    rows = db.execute_query("""
+    SELECT DISTINCT table_name, index_name
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE()
+    """) or []
+    
+    indexes = {}
+    for table, index in rows:
+        indexes.setdefault(table, []).append(index)
+    return indexes
+
+def generate_ddl() -> str:
+    """
+    Build an idempotent DDL script for the recommended indexes
+    
+    MySQL has no CREATE INDEX IF NOT EXISTS, so each statement is prepared
+    conditionally on information_schema.statistics.
+    
+    Returns:
+        str: SQL script that can be run any number of times
+    """
+    lines = ["-- Indexes for the course platform analytics workload (safe to re-run)", ""]
+    for table, index, columns, served in RECOMMENDED_INDEXES:
+        create = f"CREATE INDEX {index} ON `{table}` ({', '.join(columns)})"
+        lines += [
+            f"-- {served}",
+            "SET @ddl = IF(",
+            "    (SELECT COUNT(*) FROM information_schema.statistics",
+            f"     WHERE table_schema = DATABASE() AND table_name = '{table}' AND index_name = '{index}') = 0,",
+            f"    '{create}',",
+            "    'DO 0');",
+            "PREPARE stmt FROM @ddl;",
+            "EXECUTE stmt;",
+            "DEALLOCATE PREPARE stmt;",
+            ""
+        ]
+    return '\n'.join(lines)
+
+def apply_indexes(db: DatabaseConnection) -> List[str]:
+    """
+    Create the recommended indexes that do not exist yet
+    
+    Args:
+        db: Connected DatabaseConnection
+    
+    Returns:
+        list: Names of the indexes created
+    """
+    present = existing_indexes(db)
+    created = []
+    
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        try:
+            for table, index, columns, _ in RECOMMENDED_INDEXES:
+                if index in present.get(table, []):
+                    continue
+                logger.info(f"Creating index {index} on {table} ({', '.join(columns)})")
+                cursor.execute(f"CREATE INDEX {index} ON `{table}` ({', '.join(columns)})")
+                created.append(index)
+        finally:
+            cursor.close()
+    
+    return created
+
+def compare_plans(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Line up plan costs and flags before and after applying indexes
+    
+    Returns:
+        pd.DataFrame: One row per query with before/after cost and full scans
+    """
+    merged = before.merge(after, on='query', suffixes=('_before', '_after'))
+    return merged[['query', 'cost_before', 'cost_after', 'full_scans_before', 'full_scans_after',
+                   'filesort_before', 'filesort_after']]
+
+def main():
+    """Run the index advisor from the command line"""
+    parser = argparse.ArgumentParser(description="Explain analytics queries and manage their indexes")
+    parser.add_argument('--emit-ddl', metavar='PATH', help="Write the idempotent index DDL script to PATH")
+    parser.add_argument('--apply', action='store_true', help="Create missing indexes and report before/after plans")
+    parser.add_argument('--analyze', action='store_true', help="Also run EXPLAIN ANALYZE (executes the queries)")
+    args = parser.parse_args()
+    
+    if args.emit_ddl:
+        with open(args.emit_ddl, 'w') as f:
+            f.write(generate_ddl())
+        print(f"[SUCCESS] Wrote index DDL to {args.emit_ddl}")
+        if not args.apply:
+            return
+    
+    db = DatabaseConnection()
+    if not db.connect():
+        print("[ERROR] Database connection failed")
+        return
+    
+    try:
+        before = analyze_workload(db, args.analyze)
+        print(before.drop(columns=['analyze'], errors='ignore').to_string(index=False))
+        
+        if args.apply:
+            created = apply_indexes(db)
+            print(f"\nCreated indexes: {', '.join(created) if created else 'none (all present)'}")
+            after = analyze_workload(db, args.analyze)
+            print(compare_plans(before, after).to_string(index=False))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
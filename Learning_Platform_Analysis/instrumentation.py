@@ -0,0 +1,200 @@
+"""
+Instrumentation for Course Platform Analytics
+Records per-stage timings, rows, bytes and memory of the analytics pipeline
+"""
+
+import pandas as pd
+from contextlib import contextmanager
+from typing import Optional
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['stage', 'name', 'wall_seconds', 'server_seconds', 'transfer_seconds',
+                  'dataframe_seconds', 'rows', 'bytes', 'process_peak_mb', 'peak_growth_mb', 'started_at']
+
+def current_peak_memory_mb() -> Optional[float]:
+    """
+    Return the process's peak memory so far
+    
+    Uses tracemalloc's traced peak since tracing started when it is on, the
+    process max RSS otherwise. Both only ever grow, so the peak of one stage
+    is not available; QueryProfiler records how much a stage raised it.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / 1024 / 1024 if os.uname().sysname == 'Darwin' else max_rss / 1024
+    return None
+
+class QueryProfiler:
+    """Collects stage records from DatabaseConnection and AnalyticsEngine"""
+    
+    def __init__(self, slow_query_seconds: Optional[float] = None,
+                 slow_log_path: Optional[str] = None, measure_bytes: bool = False):
+        """
+        Initialize the profiler
+        
+        Args:
+            slow_query_seconds: Log queries slower than this many seconds
+            slow_log_path: Also append slow queries to this file
+            measure_bytes: Probe the session Bytes_sent counter around each query,
+                           which costs two extra round trips per query
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_log_path = slow_log_path
+        self.measure_bytes = measure_bytes
+        self.records = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, stage: str, name: str):
+        """
+        Time a pipeline stage
+        
+        The yielded dict can be filled with extra fields (rows, bytes,
+        server_seconds, ...) before the block ends. process_peak_mb is the
+        process's peak memory when the stage ends and peak_growth_mb how much
+        it rose during the stage, which concurrent stages contribute to.
+        
+        Args:
+            stage: Stage kind, e.g. 'fetch' or 'export'
+            name: Query or file the stage works on
+        
+        Yields:
+            dict: The stage record
+        """
+        record = {'stage': stage, 'name': name, 'started_at': time.time()}
+        peak_before = current_peak_memory_mb()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - started
+            record['process_peak_mb'] = current_peak_memory_mb()
+            if peak_before is not None and record['process_peak_mb'] is not None:
+                record['peak_growth_mb'] = max(record['process_peak_mb'] - peak_before, 0.0)
+            with self._lock:
+                self.records.append(record)
+    
+    def check_slow_query(self, name: str, query: str, seconds: float):
+        """Log a query that exceeded the slow query threshold"""
+        if self.slow_query_seconds is None or seconds < self.slow_query_seconds:
+            return
+        
+        normalized = re.sub(r'\s+', ' ', query).strip()
+        logger.warning(f"Slow query {name} took {seconds:.3f}s: {normalized}")
+        if self.slow_log_path:
+            with self._lock, open(self.slow_log_path, 'a') as f:
+                f.write(json.dumps({'name': name, 'seconds': round(seconds, 6),
+                                    'at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'query': normalized}) + '\n')
+    
+    def report(self) -> pd.DataFrame:
+        """
+        Return all stage records
+        
+        Returns:
+            pd.DataFrame: One row per stage in REPORT_COLUMNS order
+        """
+        with self._lock:
+            records = list(self.records)
+        return pd.DataFrame(records, columns=REPORT_COLUMNS)
+    
+    def summary(self) -> pd.DataFrame:
+        """
+        Summarize the records per query name, slowest first
+        
+        Returns:
+            pd.DataFrame: Total wall time and the time split per stage for each name
+        """
+        report = self.report()
+        if report.empty:
+            return report
+        pivot = report.pivot_table(index='name', columns='stage', values='wall_seconds', aggfunc='sum', fill_value=0)
+        pivot['total_seconds'] = pivot.sum(axis=1)
+        return pivot.sort_values('total_seconds', ascending=False).reset_index()
+    
+    def write_report(self, path: str):
+        """
+        Write the run report as JSON or CSV, chosen by the file extension
+        
+        Args:
+            path: Output path ending in .json or .csv
+        """
+        report = self.report()
+        if path.endswith('.csv'):
+            report.to_csv(path, index=False)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'stages': json.loads(report.to_json(orient='records')),
+                           'summary': json.loads(self.summary().to_json(orient='records'))}, f, indent=2)
+        logger.info(f"Wrote profiling report with {len(report)} stages to {path}")
+
+@contextmanager
+def profile_run(cprofile_path: Optional[str] = None, tracemalloc_top: int = 0):
+    """
+    Capture a cProfile and/or tracemalloc profile of the enclosed block
+    
+    cProfile only sees the thread that enables it, so threads started in the
+    block (the pipeline's and the concurrent exports' workers) get a profiler
+    of their own, and their statistics are merged into the dump.
+    
+    Args:
+        cprofile_path: Dump cProfile statistics here (readable with pstats/snakeviz)
+        tracemalloc_top: Log this many top allocation sites, 0 to skip tracemalloc
+    """
+    profiler = cProfile.Profile() if cprofile_path else None
+    thread_profilers = []
+    
+    def profile_thread(frame, event, arg):
+        # Runs once in each new thread, the thread's profiler replaces this hook
+        thread_profiler = cProfile.Profile()
+        thread_profilers.append(thread_profiler)
+        thread_profiler.enable()
+    
+    if tracemalloc_top:
+        tracemalloc.start()
+    if profiler:
+        threading.setprofile(profile_thread)
+        profiler.enable()
+    
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            threading.setprofile(None)
+            stats = pstats.Stats(profiler)
+            for thread_profiler in thread_profilers:
+                # Threads still running are cut off here, the block's workers have finished
+                thread_profiler.disable()
+                stats.add(thread_profiler)
+            stats.dump_stats(cprofile_path)
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(15)
+            logger.info(f"Wrote cProfile statistics of {len(thread_profilers) + 1} threads to {cprofile_path}\n"
+                        f"{output.getvalue()}")
+        if tracemalloc_top:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            logger.info(f"tracemalloc: current {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB")
+            for stat in snapshot.statistics('lineno')[:tracemalloc_top]:
+                logger.info(f"  {stat}")
@@ -0,0 +1,1031 @@
+"""
+Live Metrics for Course Platform Analytics
+Keeps running counters for every analytic current from a change feed, so a
+refresh costs O(changes) instead of recomputing the analytics from scratch
+"""
+
+import numpy as np
+import pandas as pd
+from collections import Counter
+from database_connection import DatabaseConnection
+from analytics_engine import AnalyticsEngine, POPULARITY_LIMIT
+from exporters import EXPORTERS
+from pandas_engine import round_mean, round_percent
+from rankings import rank_courses, ranking_key, top_k
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Captured columns of each table, primary key first, in foreign key order
+CAPTURED_TABLES = {
+    'user': ['user_id', 'subscription_type', 'regi_date', 'last_login', 'is_active'],
+    'course': ['course_id', 'course_title', 'instructor_name', 'subject', 'level', 'price'],
+    'erp': ['erp_id', 'user_id', 'course_id', 'completion_status', 'progress_per', 'rating_given'],
+    'subscriptions': ['subscription_id', 'plan_type', 'status', 'monthely_fee'],
+    'course_interactions': ['interaction_id', 'user_id']
+}
+
+# Tables whose updates polling can see once they have an updated_at column
+TRACKED_TABLES = ('user', 'course', 'erp', 'subscriptions')
+
+# Column each table's updates are polled by. Without change tracking only
+# logins are visible, through user.last_login.
+UPDATE_COLUMNS = {'user': 'last_login'}
+
+# Stand-in for NULL timestamps and months; the smallest int64 sorts first like NULL in MySQL
+NULL_TIME = np.iinfo(np.int64).min
+
+SECONDS_PER_DAY = 86400
+
+def enable_change_tracking(db: DatabaseConnection) -> bool:
+    """
+    Add an indexed updated_at column to the tracked tables that lack one
+    
+    MySQL maintains it with ON UPDATE CURRENT_TIMESTAMP, so PollingSource
+    can see updated rows as well as inserted ones.
+    
+    Args:
+        db: Connected MySQL DatabaseConnection
+    
+    Returns:
+        bool: True if every tracked table has the column
+    """
+    for table in TRACKED_TABLES:
+        existing = db.execute_query(f"SHOW COLUMNS FROM {table} LIKE 'updated_at'")
+        if existing is None:
+            return False
+        if existing:
+            continue
+        result = db.execute_query(f"""
+            ALTER TABLE {table}
+                ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                ADD INDEX idx_{table}_updated_at (updated_at)
+            """)
+        if result is None:
+            return False
+        logger.info(f"Added updated_at to {table}")
+    return True
+
+def _seconds(values: pd.Series) -> np.ndarray:
+    """Timestamps as int64 seconds, NULL_TIME for NULL"""
+    timestamps = pd.to_datetime(values, errors='coerce')
+    seconds = np.full(len(timestamps), NULL_TIME, dtype=np.int64)
+    known = timestamps.notna().to_numpy()
+    seconds[known] = timestamps[known].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return seconds
+
+def _months(seconds: np.ndarray) -> np.ndarray:
+    """Months since 1970-01 of int64 seconds, NULL_TIME stays NULL_TIME"""
+    known = seconds != NULL_TIME
+    months = np.full(len(seconds), NULL_TIME, dtype=np.int64)
+    months[known] = seconds[known].astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    return months
+
+def _month_label(month: int) -> Optional[str]:
+    """'YYYY-MM' of a month since 1970-01, None for NULL"""
+    return None if month == NULL_TIME else str(np.datetime64(int(month), 'M'))
+
+def _ids(values: pd.Series) -> np.ndarray:
+    """Ids as int64, -1 for NULL"""
+    return pd.to_numeric(values).fillna(-1).to_numpy(dtype=np.int64)
+
+def _bump(counter: Counter, keys, sign: int, weights: Optional[np.ndarray] = None):
+    """
+    Add sign times the row count, or weight sum, of each distinct key
+    
+    Args:
+        counter: Counter keyed by int or tuple of ints
+        keys: Key array, or tuple of arrays for tuple keys
+        sign: +1 to add rows, -1 to remove them
+        weights: Per-row weights (default: 1 per row)
+    """
+    keys = keys if isinstance(keys, tuple) else (keys,)
+    if not len(keys[0]):
+        return
+    values = pd.Series(np.ones(len(keys[0]), dtype=np.int64) if weights is None
+                       else np.asarray(weights, dtype=np.int64))
+    totals = values.groupby(list(keys)).sum()
+    for key, total in totals.items():
+        key = tuple(int(k) for k in key) if isinstance(key, tuple) else int(key)
+        counter[key] += sign * int(total)
+        if not counter[key]:
+            del counter[key]
+
+class RowStore:
+    """
+    Latest image of each row, in column arrays indexed by primary key
+    
+    Suited to auto-increment ids, which are dense: memory is a few bytes per
+    id up to the largest one, and lookups and updates are array indexing.
+    """
+    
+    def __init__(self, columns: Dict[str, Tuple[str, object]]):
+        """
+        Initialize an empty store
+        
+        Args:
+            columns: Column name -> (NumPy dtype, value of absent rows)
+        """
+        self.defaults = columns
+        self.present = np.zeros(0, dtype=bool)
+        self.columns = {name: np.zeros(0, dtype=dtype) for name, (dtype, _) in columns.items()}
+    
+    def _reserve(self, ids: np.ndarray):
+        """Grow the arrays, doubling, until they can hold every id"""
+        if not len(ids) or ids.max() < len(self.present):
+            return
+        size = max(int(ids.max()) + 1, 2 * len(self.present), 1024)
+        grown = np.zeros(size, dtype=bool)
+        grown[:len(self.present)] = self.present
+        self.present = grown
+        for name, (dtype, default) in self.defaults.items():
+            column = np.full(size, default, dtype=dtype)
+            column[:len(self.columns[name])] = self.columns[name]
+            self.columns[name] = column
+    
+    def get(self, ids: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Look up rows
+        
+        Returns:
+            tuple: (present flag per id, column name -> values, defaults for absent rows)
+        """
+        self._reserve(ids)
+        return self.present[ids], {name: column[ids] for name, column in self.columns.items()}
+    
+    def put(self, ids: np.ndarray, values: Dict[str, np.ndarray]):
+        """Insert or replace rows"""
+        self._reserve(ids)
+        self.present[ids] = True
+        for name, column in values.items():
+            self.columns[name][ids] = column
+    
+    def delete(self, ids: np.ndarray):
+        """Remove rows"""
+        self._reserve(ids)
+        self.present[ids] = False
+        for name, (_, default) in self.defaults.items():
+            self.columns[name][ids] = default
+    
+    def add(self, ids: np.ndarray, deltas: Dict[str, object]):
+        """Add to the columns of rows, repeated ids add up"""
+        self._reserve(ids)
+        for name, delta in deltas.items():
+            np.add.at(self.columns[name], ids, delta)
+
+class MetricState:
+    """
+    Running counters for every analytic, updated one changed row at a time
+    
+    Each change subtracts the old image's contribution to the counters and
+    adds the new one, so re-applying a row is harmless and deletes are exact.
+    Row images are kept in RowStores; the counters are Counters keyed by
+    category codes. Metrics that depend on the current time (the 30 day
+    retention window) are evaluated when read.
+    """
+    
+    def __init__(self):
+        """Initialize empty counters"""
+        # Category labels per column, code 0 is NULL
+        self.vocabulary = {name: [None] for name in
+                           ('subscription_type', 'plan_type', 'status', 'completion_status')}
+        self.users = RowStore({'type': ('int16', 0), 'active': ('bool', False),
+                               'month': ('int64', NULL_TIME), 'login': ('int64', NULL_TIME)})
+        self.enrollments = RowStore({'user_id': ('int64', -1), 'course_id': ('int64', -1),
+                                     'status': ('int16', 0), 'progress': ('int64', -1),
+                                     'rating': ('int64', 0)})
+        self.subscriptions = RowStore({'plan': ('int16', 0), 'status': ('int16', 0),
+                                       'fee_cents': ('int64', 0)})
+        self.interactions = RowStore({'user_id': ('int64', -1)})
+        # Activity per user and per course, kept whether or not the user or course exists
+        self.user_activity = RowStore({'enrollments': ('int64', 0), 'progress_sum': ('int64', 0),
+                                       'progress_count': ('int64', 0), 'interactions': ('int64', 0)})
+        self.course_activity = RowStore({'enrollments': ('int64', 0), 'completions': ('int64', 0),
+                                         'rating_sum': ('int64', 0), 'rating_count': ('int64', 0)})
+        self.courses = pd.DataFrame(columns=CAPTURED_TABLES['course'][1:],
+                                    index=pd.Index([], dtype='int64', name='course_id'))
+        self.counters = {name: Counter() for name in (
+            'users', 'active_users', 'registrations', 'cohort_users', 'login_days',
+            'subscriptions', 'cancelled', 'active_subscriptions', 'active_fee_cents',
+            'type_progress_sum', 'type_progress_count', 'type_interactions', 'type_courses', 'ratings')}
+        # day -> {user_id: (registration month, last login)} for days the retention window can start on
+        self.recent_logins = {}
+        self.recent_floor = None
+        # Source positions, saved with the counters so a restart resumes exactly
+        self.positions = {}
+        self.applied_changes = 0
+    
+    def code(self, column: str, label: str) -> int:
+        """Return the code of a category label, adding it when new"""
+        labels = self.vocabulary[column]
+        if label not in labels:
+            labels.append(label)
+        return labels.index(label)
+    
+    def encode(self, column: str, values: pd.Series) -> np.ndarray:
+        """Encode a column of category labels, NULL as 0"""
+        for label in pd.unique(values.dropna()):
+            self.code(column, label)
+        labels = self.vocabulary[column]
+        return (pd.Categorical(values, categories=labels[1:]).codes + 1).astype(np.int16)
+    
+    def _label_order(self, column: str) -> Callable[[int], Tuple]:
+        """Sort key of category codes, NULL first, then labels in order"""
+        labels = self.vocabulary[column]
+        return lambda code: (code != 0, labels[code] if code else '')
+    
+    def apply(self, table: str, op: str, frame: pd.DataFrame):
+        """
+        Apply a batch of changed rows of one table
+        
+        Args:
+            table: Table name from CAPTURED_TABLES
+            op: 'upsert' for inserted or updated rows (full row images), 'delete'
+            frame: Changed rows; deletes only need the primary key
+        """
+        key = CAPTURED_TABLES[table][0]
+        frame = frame.drop_duplicates(key, keep='last').reset_index(drop=True)
+        ids = _ids(frame[key])
+        getattr(self, f'_apply_{table}')(ids, None if op == 'delete' else frame)
+        self.applied_changes += len(ids)
+    
+    def _user_types(self, user_ids: np.ndarray) -> np.ndarray:
+        """Subscription type code of each user, -1 for NULL or unknown users"""
+        types = np.full(len(user_ids), -1, dtype=np.int64)
+        known = user_ids >= 0
+        present, rows = self.users.get(user_ids[known])
+        types[known] = np.where(present, rows['type'], -1)
+        return types
+    
+    def _apply_user(self, ids: np.ndarray, frame: Optional[pd.DataFrame]):
+        present, old = self.users.get(ids)
+        _, activity = self.user_activity.get(ids)
+        self._user_counts(ids[present], {name: values[present] for name, values in old.items()},
+                          {name: values[present] for name, values in activity.items()}, -1)
+        
+        if frame is None:
+            self.users.delete(ids)
+            new_types = np.full(len(ids), -1, dtype=np.int64)
+        else:
+            login = _seconds(frame['last_login'])
+            new = {'type': self.encode('subscription_type', frame['subscription_type']),
+                   'active': frame['is_active'].eq(1).fillna(False).to_numpy(dtype=bool),
+                   'month': _months(_seconds(frame['regi_date'])), 'login': login}
+            self.users.put(ids, new)
+            self._user_counts(ids, new, activity, 1)
+            new_types = new['type'].astype(np.int64)
+        
+        # Courses enrolled by users whose subscription type changed move with them
+        old_types = np.where(present, old['type'], -1)
+        moved = (old_types != new_types) & (activity['enrollments'] > 0)
+        if moved.any():
+            self._move_courses(ids[moved], old_types[moved], new_types[moved])
+    
+    def _user_counts(self, ids: np.ndarray, rows: Dict[str, np.ndarray], activity: Dict[str, np.ndarray], sign: int):
+        """Add (sign=1) or remove (sign=-1) the contribution of user rows"""
+        types, months, logins = rows['type'], rows['month'], rows['login']
+        counters = self.counters
+        _bump(counters['users'], types, sign)
+        _bump(counters['active_users'], types[rows['active']], sign)
+        _bump(counters['registrations'], (months, types), sign)
+        _bump(counters['cohort_users'], months, sign)
+        logged_in = logins != NULL_TIME
+        _bump(counters['login_days'], (months[logged_in], logins[logged_in] // SECONDS_PER_DAY), sign)
+        self._track_recent(ids[logged_in], months[logged_in], logins[logged_in], sign)
+        
+        # Engagement of a subscription type is the activity of its users
+        _bump(counters['type_progress_sum'], types, sign, activity['progress_sum'])
+        _bump(counters['type_progress_count'], types, sign, activity['progress_count'])
+        _bump(counters['type_interactions'], types, sign, activity['interactions'])
+    
+    def _track_recent(self, ids: np.ndarray, months: np.ndarray, logins: np.ndarray, sign: int):
+        """Keep the exact login time of users who may fall on the retention cutoff day"""
+        if self.recent_floor is None:
+            return
+        for user_id, month, login in zip(ids, months, logins):
+            day = int(login) // SECONDS_PER_DAY
+            if day < self.recent_floor:
+                continue
+            if sign > 0:
+                self.recent_logins.setdefault(day, {})[int(user_id)] = (int(month), int(login))
+            else:
+                self.recent_logins.get(day, {}).pop(int(user_id), None)
+    
+    def _move_courses(self, user_ids: np.ndarray, old_types: np.ndarray, new_types: np.ndarray):
+        """
+        Move the enrolled courses of users to their new subscription type
+        
+        Needs the enrollments of these users, found with one vectorized pass
+        over the stored enrollments. Only runs for users whose type changed.
+        """
+        enrolled = self.enrollments.present & np.isin(self.enrollments.columns['user_id'], user_ids)
+        users = self.enrollments.columns['user_id'][enrolled]
+        courses = self.enrollments.columns['course_id'][enrolled]
+        position = pd.Index(user_ids).get_indexer(users)
+        has_course = courses >= 0
+        for types, sign in ((old_types, -1), (new_types, 1)):
+            user_types = types[position]
+            keep = has_course & (user_types >= 0)
+            _bump(self.counters['type_courses'], (user_types[keep], courses[keep]), sign)
+    
+    def _apply_erp(self, ids: np.ndarray, frame: Optional[pd.DataFrame]):
+        present, old = self.enrollments.get(ids)
+        self._enrollment_counts({name: values[present] for name, values in old.items()}, -1)
+        if frame is None:
+            self.enrollments.delete(ids)
+            return
+        new = {'user_id': _ids(frame['user_id']), 'course_id': _ids(frame['course_id']),
+               'status': self.encode('completion_status', frame['completion_status']),
+               'progress': pd.to_numeric(frame['progress_per']).fillna(-1).to_numpy(dtype=np.int64),
+               'rating': pd.to_numeric(frame['rating_given']).fillna(0).to_numpy(dtype=np.int64)}
+        self.enrollments.put(ids, new)
+        self._enrollment_counts(new, 1)
+    
+    def _enrollment_counts(self, rows: Dict[str, np.ndarray], sign: int):
+        """Add (sign=1) or remove (sign=-1) the contribution of enrollment rows"""
+        users, courses = rows['user_id'], rows['course_id']
+        progress, ratings = rows['progress'], rows['rating']
+        completed = rows['status'] == self.code('completion_status', 'completed')
+        has_course, has_user = courses >= 0, users >= 0
+        has_progress, rated = progress >= 0, ratings > 0
+        
+        self.course_activity.add(courses[has_course], {
+            'enrollments': sign, 'completions': sign * completed[has_course],
+            'rating_sum': sign * np.where(rated, ratings, 0)[has_course],
+            'rating_count': sign * rated[has_course]})
+        self.user_activity.add(users[has_user], {
+            'enrollments': sign, 'progress_sum': sign * np.where(has_progress, progress, 0)[has_user],
+            'progress_count': sign * has_progress[has_user]})
+        self.counters['ratings']['sum'] += sign * int(ratings[rated].sum())
+        self.counters['ratings']['count'] += sign * int(rated.sum())
+        
+        types = self._user_types(users)
+        known = types >= 0
+        _bump(self.counters['type_progress_sum'], types[known & has_progress], sign, progress[known & has_progress])
+        _bump(self.counters['type_progress_count'], types[known & has_progress], sign)
+        _bump(self.counters['type_courses'], (types[known & has_course], courses[known & has_course]), sign)
+    
+    def _apply_subscriptions(self, ids: np.ndarray, frame: Optional[pd.DataFrame]):
+        present, old = self.subscriptions.get(ids)
+        self._subscription_counts({name: values[present] for name, values in old.items()}, -1)
+        if frame is None:
+            self.subscriptions.delete(ids)
+            return
+        fees = pd.to_numeric(frame['monthely_fee']).fillna(0).to_numpy(dtype='float64')
+        new = {'plan': self.encode('plan_type', frame['plan_type']),
+               'status': self.encode('status', frame['status']),
+               'fee_cents': np.round(fees * 100).astype(np.int64)}
+        self.subscriptions.put(ids, new)
+        self._subscription_counts(new, 1)
+    
+    def _subscription_counts(self, rows: Dict[str, np.ndarray], sign: int):
+        """Add (sign=1) or remove (sign=-1) the contribution of subscription rows"""
+        plans, status = rows['plan'], rows['status']
+        active = status == self.code('status', 'active')
+        _bump(self.counters['subscriptions'], plans, sign)
+        _bump(self.counters['cancelled'], plans[status == self.code('status', 'cancelled')], sign)
+        _bump(self.counters['active_subscriptions'], plans[active], sign)
+        _bump(self.counters['active_fee_cents'], plans[active], sign, rows['fee_cents'][active])
+    
+    def _apply_course_interactions(self, ids: np.ndarray, frame: Optional[pd.DataFrame]):
+        present, old = self.interactions.get(ids)
+        self._interaction_counts(old['user_id'][present], -1)
+        if frame is None:
+            self.interactions.delete(ids)
+            return
+        users = _ids(frame['user_id'])
+        self.interactions.put(ids, {'user_id': users})
+        self._interaction_counts(users, 1)
+    
+    def _interaction_counts(self, users: np.ndarray, sign: int):
+        """Add (sign=1) or remove (sign=-1) interactions of users"""
+        users = users[users >= 0]
+        self.user_activity.add(users, {'interactions': sign})
+        types = self._user_types(users)
+        _bump(self.counters['type_interactions'], types[types >= 0], sign)
+    
+    def _apply_course(self, ids: np.ndarray, frame: Optional[pd.DataFrame]):
+        # Courses change rarely, their attributes are kept as a frame
+        courses = self.courses.drop(ids, errors='ignore')
+        if frame is not None:
+            changed = frame[CAPTURED_TABLES['course'][1:]].astype(object)
+            changed['price'] = pd.to_numeric(frame['price']).astype('float64')
+            changed.index = pd.Index(ids, name='course_id')
+            courses = pd.concat([courses, changed]) if len(courses) else changed
+        self.courses = courses
+    
+    def set_clock(self, now: pd.Timestamp):
+        """
+        Advance the start of the retention window
+        
+        Exact login times are kept from the day the window starts on; older
+        ones are dropped since the window only moves forward.
+        """
+        floor = (int(_seconds(pd.Series([now]))[0]) - 30 * SECONDS_PER_DAY) // SECONDS_PER_DAY
+        if self.recent_floor is None:
+            self.recent_floor = floor
+            # Seed from the stored users once, later changes keep it current
+            logins = self.users.columns['login']
+            recent = np.flatnonzero(self.users.present & (logins != NULL_TIME) & (logins // SECONDS_PER_DAY >= floor))
+            self._track_recent(recent, self.users.columns['month'][recent], logins[recent], 1)
+        elif floor > self.recent_floor:
+            self.recent_floor = floor
+            for day in [day for day in self.recent_logins if day < floor]:
+                del self.recent_logins[day]
+    
+    def save(self, path: str):
+        """Write the state to a checkpoint file, atomically replacing the previous one"""
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    
+    @staticmethod
+    def load(path: str) -> 'MetricState':
+        """Read a state written by save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
+    # Analytics, shaped like the AnalyticsEngine results
+    
+    def user_scan(self) -> pd.DataFrame:
+        users, active = self.counters['users'], self.counters['active_users']
+        types = sorted(users, key=self._label_order('subscription_type'))
+        counts = np.array([users[code] for code in types], dtype=np.int64)
+        order = np.argsort(-counts, kind='stable')
+        labels = self.vocabulary['subscription_type']
+        return pd.DataFrame({
+            'subscription_type': [labels[types[i]] for i in order],
+            'user_count': counts[order],
+            'percentage': round_percent(counts[order], counts.sum()),
+            'active_users': np.array([active[types[i]] for i in order], dtype=np.int64)
+        })
+    
+    def subscription_scan(self) -> pd.DataFrame:
+        counters = self.counters
+        plans = sorted(counters['subscriptions'], key=self._label_order('plan_type'))
+        total = np.array([counters['subscriptions'][p] for p in plans], dtype=np.int64)
+        churned = np.array([counters['cancelled'][p] for p in plans], dtype=np.int64)
+        active = np.array([counters['active_subscriptions'][p] for p in plans], dtype=np.int64)
+        revenue = np.array([counters['active_fee_cents'][p] for p in plans], dtype=np.int64) / 100
+        labels = self.vocabulary['plan_type']
+        return pd.DataFrame({
+            'plan_type': [labels[p] for p in plans],
+            'total_subscriptions': total,
+            'churned': churned,
+            'churn_rate': round_percent(churned, total),
+            'active_subscriptions': active,
+            'monthly_revenue': np.where(active > 0, revenue, np.nan),
+            'avg_monthly_fee': round_mean(revenue, active, 6),
+            'monthly_recurring_revenue': revenue.sum() if active.any() else np.nan
+        })
+    
+    def catalog_scan(self) -> pd.DataFrame:
+        ratings = self.counters['ratings']
+        return pd.DataFrame([{
+            'total_courses': len(self.courses),
+            'avg_course_rating': round_mean(ratings['sum'], ratings['count'], 4) if ratings['count'] else None
+        }])
+    
+    def registration_trends(self) -> pd.DataFrame:
+        order = self._label_order('subscription_type')
+        keys = sorted(self.counters['registrations'], key=lambda key: (key[0], order(key[1])))
+        labels = self.vocabulary['subscription_type']
+        return pd.DataFrame({
+            'month': [_month_label(month) for month, _ in keys],
+            'subscription_type': [labels[code] for _, code in keys],
+            'new_users': np.array([self.counters['registrations'][key] for key in keys], dtype=np.int64)
+        })
+    
+    def cohort_analysis(self, now: pd.Timestamp) -> pd.DataFrame:
+        """Cohorts with logins since now - 30 days: whole days from counters, the cutoff day exactly"""
+        self.set_clock(now)
+        cutoff = int(_seconds(pd.Series([now - pd.Timedelta(days=30)]))[0])
+        cutoff_day = cutoff // SECONDS_PER_DAY
+        active = Counter()
+        for (month, day), users in self.counters['login_days'].items():
+            if day > cutoff_day:
+                active[month] += users
+        for month, login in self.recent_logins.get(cutoff_day, {}).values():
+            if login >= cutoff:
+                active[month] += 1
+        
+        months = sorted(self.counters['cohort_users'])
+        total = np.array([self.counters['cohort_users'][month] for month in months], dtype=np.int64)
+        active_users = np.array([active[month] for month in months], dtype=np.int64)
+        return pd.DataFrame({
+            'registration_month': [_month_label(month) for month in months],
+            'total_users': total,
+            'active_last_30_days': active_users,
+            'retention_rate': round_percent(active_users, total)
+        })
+    
+    def course_stats(self) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """Existing courses with their enrollments and average rating"""
+        courses = self.courses.reset_index()
+        _, activity = self.course_activity.get(courses['course_id'].to_numpy(dtype=np.int64))
+        return courses, activity['enrollments'], round_mean(activity['rating_sum'], activity['rating_count'], 4)
+    
+    def completion_rates(self) -> pd.DataFrame:
+        courses = self.courses.reset_index()
+        _, activity = self.course_activity.get(courses['course_id'].to_numpy(dtype=np.int64))
+        by_level = pd.DataFrame({'level': courses['level'], 'total_enrollments': activity['enrollments'],
+                                 'completions': activity['completions']}) \
+            .groupby('level', dropna=False, sort=False).sum()
+        by_level = by_level[by_level['total_enrollments'] > 0]
+        by_level = by_level.iloc[sorted(range(len(by_level)),
+                                        key=lambda i: (pd.notna(by_level.index[i]), str(by_level.index[i])))]
+        return pd.DataFrame({
+            'level': [None if pd.isna(level) else level for level in by_level.index],
+            'total_enrollments': by_level['total_enrollments'].to_numpy(dtype=np.int64),
+            'completions': by_level['completions'].to_numpy(dtype=np.int64),
+            'completion_rate': round_percent(by_level['completions'], by_level['total_enrollments'])
+        })
+    
+    def engagement_metrics(self) -> pd.DataFrame:
+        counters = self.counters
+        types = sorted(counters['users'], key=self._label_order('subscription_type'))
+        courses = Counter(code for code, _ in counters['type_courses'])
+        labels = self.vocabulary['subscription_type']
+        return pd.DataFrame({
+            'subscription_type': [labels[code] for code in types],
+            'avg_courses_enrolled': np.array([courses[code] for code in types], dtype=np.int64),
+            'avg_completion_rate': round_mean(
+                np.array([counters['type_progress_sum'][code] for code in types], dtype=np.int64),
+                np.array([counters['type_progress_count'][code] for code in types], dtype=np.int64), 4),
+            'total_interactions': np.array([counters['type_interactions'][code] for code in types], dtype=np.int64)
+        })
+
+class PollingSource:
+    """
+    Reads changes by polling high-water marks
+    
+    Inserts are rows with a primary key above the largest one seen. Updates
+    are rows whose update column (user.last_login, or updated_at on every
+    tracked table with track_updates) is at or after its largest value seen.
+    
+    Transactions can commit out of id order, and an update's timestamp is
+    taken before it commits, so each poll re-reads the last id_overlap ids
+    and the last update_lag seconds of updates. Row images already read are
+    skipped by key and content, so an unchanged overlap costs no apply.
+    Rows committed later than that, and deletes, are not visible to polling:
+    rebuild the state periodically (start without the checkpoint) to pick
+    them up.
+    """
+    
+    def __init__(self, db: DatabaseConnection, batch_size: int = 50000, track_updates: bool = False,
+                 id_overlap: int = 1000, update_lag: float = 60):
+        """
+        Initialize the source
+        
+        Args:
+            db: Connected DatabaseConnection
+            batch_size: Rows read per query
+            track_updates: Poll updated_at on the tracked tables (see enable_change_tracking)
+            id_overlap: Ids below the insert mark re-read by every poll, for inserts committed out of order
+            update_lag: Seconds before the update mark re-read by every poll, for updates committed late
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.update_columns = {table: 'updated_at' for table in TRACKED_TABLES} if track_updates else UPDATE_COLUMNS
+        self.id_overlap = id_overlap
+        self.update_lag = pd.Timedelta(seconds=update_lag)
+    
+    def _read(self, query: str) -> pd.DataFrame:
+        df = self.db.fetch_dataframe(query, label='live_poll')
+        if df is None:
+            raise ConnectionError("Polling query failed")
+        return df
+    
+    @staticmethod
+    def _unseen(frame: pd.DataFrame, key: str, columns: List[str], seen: Dict[int, int]) -> pd.DataFrame:
+        """Rows whose image differs from the one last read for their key, recording them in seen"""
+        images = pd.util.hash_pandas_object(frame[columns], index=False).to_numpy()
+        keys = frame[key].to_numpy(dtype=np.int64)
+        fresh = np.array([seen.get(int(k)) != int(image) for k, image in zip(keys, images)], dtype=bool)
+        seen.update(zip(keys[fresh].tolist(), images[fresh].tolist()))
+        return frame[fresh]
+    
+    def changes(self, positions: Dict) -> Iterator[Tuple[str, str, pd.DataFrame]]:
+        """
+        Yield batches of changed rows, in foreign key order
+        
+        positions is updated after each batch has been consumed.
+        
+        Yields:
+            tuple: (table, 'upsert', changed rows)
+        """
+        for table, column in self.update_columns.items():
+            # The first update mark is taken before the first full read, so nothing falls in between
+            if f'{table}.{column}' not in positions:
+                latest = self._read(f"SELECT MAX({column}) AS latest FROM {table}")['latest'].iloc[0]
+                positions[f'{table}.{column}'] = None if pd.isna(latest) else str(pd.Timestamp(latest))
+        
+        for table, columns in CAPTURED_TABLES.items():
+            key = columns[0]
+            select = f"SELECT {', '.join(columns)} FROM {table}"
+            # Image hash of each row read within the overlap, by id
+            seen = positions.setdefault(f'{table}.seen', {})
+            after = max(int(positions.get(f'{table}.id', 0)) - self.id_overlap, 0)
+            while True:
+                frame = self._read(f"{select} WHERE {key} > {after} ORDER BY {key} LIMIT {self.batch_size}")
+                if frame.empty:
+                    break
+                after = int(frame[key].max())
+                fresh = self._unseen(frame, key, columns, seen)
+                if not fresh.empty:
+                    yield table, 'upsert', fresh
+                positions[f'{table}.id'] = max(after, int(positions.get(f'{table}.id', 0)))
+                floor = positions[f'{table}.id'] - self.id_overlap
+                positions[f'{table}.seen'] = seen = {k: image for k, image in seen.items() if k > floor}
+                if len(frame) < self.batch_size:
+                    break
+            
+            column = self.update_columns.get(table)
+            mark = positions.get(f'{table}.{column}') if column else None
+            if mark is None:
+                continue
+            # Marks are timestamps this class formatted itself
+            since = pd.Timestamp(mark) - self.update_lag
+            frame = self._read(f"SELECT {', '.join(columns)}, {column} AS change_mark FROM {table} "
+                               f"WHERE {column} >= '{since}' AND {key} <= {int(positions.get(f'{table}.id', 0))}")
+            # Image hash and change mark of each row updated within the lag, by id
+            updated = positions.setdefault(f'{table}.{column}.seen', {})
+            hashes = {k: image for k, (image, _) in updated.items()}
+            fresh = self._unseen(frame, key, columns, hashes)
+            if not fresh.empty:
+                yield table, 'upsert', fresh[columns]
+            if not frame.empty:
+                mark = max(pd.Timestamp(mark), pd.Timestamp(frame['change_mark'].max()))
+                positions[f'{table}.{column}'] = str(mark)
+            for k, changed in zip(frame[key].to_numpy(dtype=np.int64).tolist(), pd.to_datetime(frame['change_mark'])):
+                updated[k] = (hashes[k], changed)
+            floor = pd.Timestamp(positions[f'{table}.{column}']) - self.update_lag
+            positions[f'{table}.{column}.seen'] = {k: entry for k, entry in updated.items() if entry[1] >= floor}
+
+class FileFeedSource:
+    """
+    Tails a change feed file, one JSON event per line
+    
+    A stand-in for a binlog reader: each line is
+    {"table": "erp", "op": "insert" | "update" | "delete", "row": {...}}
+    where row is the full row image (the primary key is enough for deletes).
+    Consecutive events of the same table and kind are applied as one batch, and
+    the byte offset after the last applied line is the position.
+    """
+    
+    def __init__(self, path: str, batch_size: int = 50000):
+        """
+        Initialize the source
+        
+        Args:
+            path: Feed file, appended to by the change producer
+            batch_size: Events applied per batch at most
+        """
+        self.path = path
+        self.batch_size = batch_size
+    
+    def changes(self, positions: Dict) -> Iterator[Tuple[str, str, pd.DataFrame]]:
+        """
+        Yield batches of changed rows in feed order
+        
+        A partially written last line is left for the next call.
+        
+        Yields:
+            tuple: (table, 'upsert' or 'delete', changed rows)
+        """
+        if not os.path.exists(self.path):
+            return
+        offset = positions.get('feed_offset', 0)
+        batch, kind = [], None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                event = json.loads(line)
+                if event['table'] not in CAPTURED_TABLES:
+                    logger.warning(f"Skipping change to untracked table {event['table']}")
+                    offset += len(line)
+                    continue
+                event_kind = (event['table'], 'delete' if event['op'] == 'delete' else 'upsert')
+                if batch and (event_kind != kind or len(batch) >= self.batch_size):
+                    yield kind[0], kind[1], pd.DataFrame(batch)
+                    positions['feed_offset'] = offset
+                    batch = []
+                kind = event_kind
+                batch.append(event['row'])
+                offset += len(line)
+        if batch:
+            yield kind[0], kind[1], pd.DataFrame(batch)
+        positions['feed_offset'] = offset
+
+class LiveMetricsService(AnalyticsEngine):
+    """
+    AnalyticsEngine whose analytics come from running counters
+    
+    refresh() applies the changes since the last refresh, costing O(changes);
+    every get_* method then reads the counters. The state is checkpointed
+    to disk periodically and restored on start, so a restart resumes from the
+    checkpointed source position instead of re-reading the tables.
+    """
+    
+    # Analytics read in-memory counters, concurrent export workers share the service
+    shares_engine_across_workers = True
+    
+    def __init__(self, source, db_connection: Optional[DatabaseConnection] = None,
+                 checkpoint_path: Optional[str] = None, checkpoint_interval: float = 60,
+                 rankings: Optional[Dict[str, int]] = None,
+                 clock: Optional[Callable[[], pd.Timestamp]] = None):
+        """
+        Initialize the service
+        
+        Args:
+            source: PollingSource or FileFeedSource
+            db_connection: DatabaseConnection, needed for polling only
+            checkpoint_path: State checkpoint file, restored when it exists
+            checkpoint_interval: Minimum seconds between checkpoints
+            rankings: Course rankings of get_course_rankings, see AnalyticsEngine
+            clock: Current time for the 30 day retention window (default: the
+                   database's NOW() when polling, else the local time)
+        """
+        super().__init__(db_connection, rankings=rankings)
+        self.source = source
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.clock = clock or (self._database_now if db_connection is not None else pd.Timestamp.now)
+        self._state_lock = threading.RLock()
+        self._last_checkpoint = time.monotonic()
+        
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.state = MetricState.load(checkpoint_path)
+            logger.info(f"Restored live metrics from {checkpoint_path} ({self.state.applied_changes} changes applied)")
+        else:
+            self.state = MetricState()
+    
+    def _database_now(self) -> pd.Timestamp:
+        """The database's NOW(), which the SQL retention window is relative to"""
+        now = self.db.fetch_dataframe("SELECT NOW() AS now", label='now')
+        if now is None:
+            return pd.Timestamp.now()
+        now = pd.Timestamp(now['now'].iloc[0])
+        return now.tz_localize(None) if now.tzinfo is not None else now
+    
+    def refresh(self) -> Optional[int]:
+        """
+        Apply every change since the last refresh
+        
+        Returns:
+            int: Number of changed rows applied, None if reading changes failed
+        """
+        applied = 0
+        started = time.perf_counter()
+        with self._state_lock:
+            self.state.set_clock(self.clock())
+            try:
+                for table, op, frame in self.source.changes(self.state.positions):
+                    self.state.apply(table, op, frame)
+                    applied += len(frame)
+            except (ConnectionError, ValueError, KeyError) as e:
+                logger.error(f"Error reading changes: {e}")
+                return None
+            finally:
+                if applied:
+                    logger.info(f"Applied {applied} changed rows in {time.perf_counter() - started:.3f}s")
+        return applied
+    
+    def checkpoint(self, force: bool = False) -> bool:
+        """
+        Save the state when the checkpoint interval has passed
+        
+        Args:
+            force: Save regardless of the interval
+        
+        Returns:
+            bool: True if a checkpoint was written
+        """
+        if not self.checkpoint_path:
+            return False
+        if not force and time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return False
+        with self._state_lock:
+            self.state.save(self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+        logger.info(f"Checkpointed live metrics to {self.checkpoint_path}")
+        return True
+    
+    def run(self, interval: float = 10, export_interval: Optional[float] = None,
+            formats: Optional[Sequence[str]] = None, iterations: Optional[int] = None):
+        """
+        Refresh, checkpoint and optionally export in a loop until interrupted
+        
+        Args:
+            interval: Seconds between refreshes
+            export_interval: Seconds between exports of all analytics, None for no exports
+            formats: Export formats (default: ['csv'])
+            iterations: Stop after this many refreshes, None to run until interrupted
+        """
+        last_export = None
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                self.refresh()
+                self.checkpoint()
+                if export_interval is not None and (last_export is None or
+                                                    time.monotonic() - last_export >= export_interval):
+                    self.export_all_analytics(formats=formats)
+                    last_export = time.monotonic()
+                count += 1
+                if iterations is None or count < iterations:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("Stopping live metrics")
+        finally:
+            self.checkpoint(force=True)
+    
+    def registered_queries(self) -> Dict[str, Tuple[str, List[str], Optional[Dict[str, Any]]]]:
+        """The service runs no analytics queries"""
+        return {}
+    
+    def _read_state(self, read: Callable[[MetricState], pd.DataFrame],
+                    filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Read the counters, which cover all data: filtered analytics are not available"""
+        if self._filters(filters):
+            logger.error("Live metrics cover all data; run filtered analytics on AnalyticsEngine")
+            return None
+        with self._state_lock:
+            return read(self.state)
+    
+    def _user_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        return self._read_state(MetricState.user_scan, filters)
+    
+    def _subscription_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        return self._read_state(MetricState.subscription_scan, filters)
+    
+    def _catalog_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        return self._read_state(MetricState.catalog_scan, filters)
+    
+    def _ranking_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        stats = self._read_state(MetricState.course_stats, filters)
+        if stats is None:
+            return None
+        return rank_courses(*stats, self.rankings)
+    
+    def get_user_registration_trends(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get premium vs free users trend over time"""
+        return self._read_state(MetricState.registration_trends, filters)
+    
+    def get_course_popularity(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get course popularity analysis"""
+        stats = self._read_state(MetricState.course_stats, filters)
+        if stats is None:
+            return None
+        courses, enrollments, avg_rating = stats
+        top = top_k(ranking_key(enrollments, courses['course_id'].to_numpy()), POPULARITY_LIMIT)
+        result = courses.iloc[top][['course_title', 'instructor_name', 'subject']].astype(object)
+        result['total_enrollments'] = enrollments[top]
+        result['avg_rating'] = avg_rating[top]
+        result['price'] = courses['price'].to_numpy(dtype='float64')[top]
+        return result.reset_index(drop=True)
+    
+    def get_completion_rates(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get course completion rates by level"""
+        return self._read_state(MetricState.completion_rates, filters)
+    
+    def get_engagement_metrics(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get user engagement metrics by subscription type"""
+        return self._read_state(MetricState.engagement_metrics, filters)
+    
+    def get_cohort_analysis(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get cohort analysis for user retention"""
+        now = self.clock()
+        return self._read_state(lambda state: state.cohort_analysis(now), filters)
+
+def test_live_metrics(scale_factor: float = 1, engine: str = 'duckdb'):
+    """
+    Check the live metrics against the SQL engine on synthetic data
+    
+    Bootstraps the counters by polling an embedded database, commits an
+    enrollment below the insert mark and a login older than the update mark
+    as late transactions would, compares every analytic, then restores the
+    counters from a checkpoint and compares again.
+    
+    Args:
+        scale_factor: Synthetic data scale factor
+        engine: Embedded engine to poll, 'duckdb' or 'sqlite'
+    """
+    from benchmark_suite import best_time
+    from embedded_backend import EmbeddedConnection
+    from pandas_engine import check_equivalence
+    from synthetic_data import generate_tables, write_snapshot
+    
+    with tempfile.TemporaryDirectory(prefix='live_metrics_') as workdir:
+        write_snapshot(generate_tables(scale_factor), workdir)
+        db = EmbeddedConnection(workdir, engine=engine)
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+        
+        try:
+            # An enrollment whose transaction is still open when the counters bootstrap
+            late = db.fetch_dataframe("SELECT * FROM erp WHERE erp_id = (SELECT MAX(erp_id) - 5 FROM erp)")
+            db.execute_query(f"DELETE FROM erp WHERE erp_id = {int(late['erp_id'].iloc[0])}")
+            
+            checkpoint_path = os.path.join(workdir, 'live_metrics.ckpt')
+            service = LiveMetricsService(PollingSource(db), db, checkpoint_path=checkpoint_path)
+            seconds, applied = best_time(service.refresh, 1)
+            print(f"Bootstrapped from {applied} rows in {seconds:.2f}s")
+            seconds, applied = best_time(service.refresh, 1)
+            print(f"Refresh without changes: {applied} rows in {seconds:.4f}s")
+            
+            # The enrollment commits below the insert mark, and a login commits 30 seconds behind the update mark
+            columns = ', '.join(late.columns)
+            values = ', '.join('NULL' if pd.isna(value) else str(value) if isinstance(value, (int, float)) else f"'{value}'"
+                               for value in late.iloc[0].tolist())
+            db.execute_query(f"INSERT INTO erp ({columns}) VALUES ({values})")
+            mark = pd.Timestamp(service.state.positions['user.last_login']) - pd.Timedelta(seconds=30)
+            db.execute_query(f"UPDATE user SET last_login = '{mark}' "
+                             f"WHERE user_id = (SELECT MIN(user_id) FROM user WHERE last_login IS NULL)")
+            print(f"Refresh after late commits: {service.refresh()} rows")
+            service.checkpoint(force=True)
+            
+            restored = LiveMetricsService(PollingSource(db), db, checkpoint_path=checkpoint_path)
+            for label, live in (('live', service), ('restored', restored)):
+                for method_name, problems in check_equivalence(AnalyticsEngine(db), live).items():
+                    if problems:
+                        print(f"[ERROR] {label} {method_name}: {'; '.join(problems)}")
+                    else:
+                        print(f"[SUCCESS] {label} {method_name} matches the SQL version")
+        finally:
+            db.close()
+
+def main():
+    """Run the live metrics service from the command line"""
+    parser = argparse.ArgumentParser(description="Keep the analytics current from a change feed")
+    parser.add_argument('--feed', metavar='PATH',
+                        help="Tail this JSON-lines change feed instead of polling the database")
+    parser.add_argument('--snapshot', metavar='DIR', help="Poll an embedded database loaded from DIR")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--track-updates', action='store_true',
+                        help="Poll updated_at columns for updated rows (see --enable-change-tracking)")
+    parser.add_argument('--id-overlap', type=int, default=1000,
+                        help="Ids below the insert mark re-read by every poll, for inserts committed out of order")
+    parser.add_argument('--update-lag', type=float, default=60,
+                        help="Seconds before the update mark re-read by every poll, for updates committed late")
+    parser.add_argument('--enable-change-tracking', action='store_true',
+                        help="Add indexed updated_at columns to the tracked MySQL tables and exit")
+    parser.add_argument('--checkpoint', default='live_metrics.ckpt', help="State checkpoint file")
+    parser.add_argument('--checkpoint-interval', type=float, default=60)
+    parser.add_argument('--interval', type=float, default=10, help="Seconds between refreshes")
+    parser.add_argument('--export-interval', type=float,
+                        help="Export all analytics every this many seconds")
+    parser.add_argument('--formats', nargs='+', default=['csv'], choices=list(EXPORTERS))
+    parser.add_argument('--once', action='store_true', help="Refresh and export once, then exit")
+    parser.add_argument('--test', action='store_true',
+                        help="Check the counters against the SQL engine on synthetic data and exit")
+    args = parser.parse_args()
+    
+    if args.test:
+        test_live_metrics(engine=args.engine)
+        return
+    
+    db = None
+    if args.feed is None or args.enable_change_tracking:
+        if args.snapshot:
+            from embedded_backend import EmbeddedConnection
+            db = EmbeddedConnection(args.snapshot, engine=args.engine)
+        else:
+            db = DatabaseConnection()
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+    
+    try:
+        if args.enable_change_tracking:
+            if enable_change_tracking(db):
+                print("[SUCCESS] Change tracking enabled")
+            return
+        
+        source = FileFeedSource(args.feed) if args.feed else PollingSource(
+            db, track_updates=args.track_updates, id_overlap=args.id_overlap, update_lag=args.update_lag)
+        service = LiveMetricsService(source, db, checkpoint_path=args.checkpoint,
+                                     checkpoint_interval=args.checkpoint_interval)
+        if args.once:
+            service.run(iterations=1, export_interval=0, formats=args.formats)
+        else:
+            service.run(args.interval, args.export_interval, args.formats)
+    finally:
+        if db is not None:
+            db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -5,52 +5,187 @@ Runs the complete analytics pipeline and exports data for Excel dashboard
 
 from database_connection import DatabaseConnection
 from analytics_engine import AnalyticsEngine
+from query_cache import QueryCache
+from instrumentation import QueryProfiler, profile_run
+from exporters import EXPORTERS
+from pipeline import build_pipeline
+from query_filters import last_months, validate_filters
+from typing import Optional, Sequence
+import argparse
 import logging
+import sys
+
+# The embedded engines, the in-memory engine, the course catalog and the
+# sketches are imported by the options that use them, so a plain run starts
+# without loading DuckDB or their dependencies
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-def main():
-    """Main function to run analytics pipeline"""
-    logger.info("Starting Course Platform Analytics Pipeline...")
+# Database configuration - Your MySQL credentials
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '1234',
+    'database': 'OnlineCourseDB'
+}
+
+# Log format of the command line entry points
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def parse_ranking(value: str):
+    """Parse a NAME=K course ranking option"""
+    name, _, k = value.partition('=')
+    if not k.isdigit():
+        raise argparse.ArgumentTypeError(f"expected NAME=K, got {value}")
+    return name, int(k)
+
+def parse_args(argv: Optional[Sequence[str]] = None):
+    """Parse command line options for the analytics pipeline (default: sys.argv)"""
+    parser = argparse.ArgumentParser(description="Run the course platform analytics pipeline")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of analytics tasks run concurrently (default: 1)")
+    parser.add_argument('--tasks', nargs='+', metavar='TASK',
+                        help="Only run these pipeline tasks and the tasks they depend on, e.g. churn_analysis "
+                             "(default: all; see python pipeline.py --list)")
+    parser.add_argument('--force', action='store_true',
+                        help="Rerun tasks even when their input tables and files are unchanged")
+    parser.add_argument('--pipeline-dir', default='pipeline_runs', metavar='DIR',
+                        help="Directory of the pipeline state and run manifests (default: pipeline_runs)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="Extra attempts of a failing task (default: 2)")
+    parser.add_argument('--cache-dir',
+                        help="Cache query results in this directory and reuse them while the source tables are unchanged")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Serve registration trends and cohorts from incrementally refreshed summary tables")
+    parser.add_argument('--approximate', metavar='SKETCH_DIR',
+                        help="Serve engagement metrics approximately from activity sketches kept in SKETCH_DIR")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Pull each base table once and compute the analytics in pandas instead of SQL")
+    parser.add_argument('--catalog', metavar='PATH',
+                        help="With --in-memory, take course metadata from the catalog snapshot at PATH "
+                             "(rebuilt when the course table changed)")
+    parser.add_argument('--rankings', nargs='+', metavar='NAME=K', type=parse_ranking,
+                        help="Course rankings of course_rankings.csv, 'global' or a course column with its K "
+                             "(default: global=20 subject=10 instructor_name=10)")
+    parser.add_argument('--snapshot', metavar='DIR',
+                        help="Run on an embedded database loaded from the CSV/Parquet snapshot in DIR instead of MySQL")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb',
+                        help="Embedded engine used with --snapshot (default: duckdb)")
+    parser.add_argument('--formats', nargs='+', default=['csv'], choices=list(EXPORTERS),
+                        help="Export formats; xlsx writes one workbook with a sheet per analytic (default: csv)")
+    parser.add_argument('--profile-report', metavar='PATH',
+                        help="Write per-query timings, rows, bytes and memory to PATH (.json or .csv)")
+    parser.add_argument('--measure-bytes', action='store_true',
+                        help="With --profile-report, record the bytes the server sent per query "
+                             "(two extra round trips per query, MySQL only)")
+    parser.add_argument('--slow-query-seconds', type=float,
+                        help="Log queries that run longer than this many seconds")
+    parser.add_argument('--slow-log', metavar='PATH',
+                        help="Also append slow queries to PATH as JSON lines")
+    parser.add_argument('--cprofile', metavar='PATH',
+                        help="Capture a cProfile of the export run into PATH")
+    parser.add_argument('--tracemalloc', type=int, default=0, metavar='N',
+                        help="Trace allocations during the export run and log the top N sites")
     
-    # Database configuration - Your MySQL credentials
-    DB_CONFIG = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': '1234',
-        'database': 'OnlineCourseDB'
-    }
+    window = parser.add_argument_group('filters', "Restrict every analytic to a time window and segment")
+    window.add_argument('--since', metavar='DATE', help="Window start, inclusive (e.g. 2024-01-01)")
+    window.add_argument('--until', metavar='DATE', help="Window end, exclusive")
+    window.add_argument('--last-months', type=int, metavar='N',
+                        help="Window of the current and previous N-1 calendar months (instead of --since/--until)")
+    window.add_argument('--subject', help="Only courses of this subject")
+    window.add_argument('--plan-type', help="Only subscriptions of this plan")
+    window.add_argument('--country', help="Only users from this country")
+    args = parser.parse_args(argv)
     
-    # Initialize database connection
-    db = DatabaseConnection(**DB_CONFIG)
+    if args.last_months is not None and (args.since or args.until):
+        parser.error("--last-months cannot be combined with --since/--until")
+    filters = last_months(args.last_months) if args.last_months is not None else \
+        {'start': args.since, 'end': args.until}
+    filters.update(subject=args.subject, plan_type=args.plan_type, country=args.country)
+    try:
+        args.filters = validate_filters(filters)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def main(argv: Optional[Sequence[str]] = None) -> bool:
+    """
+    Main function to run analytics pipeline
+    
+    Returns:
+        bool: True if every analytic was exported, False otherwise
+    """
+    args = parse_args(argv)
+    logger.info("Starting Course Platform Analytics Pipeline...")
+    
+    # Initialize database connection, pooled when queries run concurrently
+    if args.snapshot:
+        from embedded_backend import EmbeddedConnection
+        db = EmbeddedConnection(args.snapshot, engine=args.engine)
+    else:
+        db = DatabaseConnection(**DB_CONFIG, pool_size=args.workers if args.workers > 1 else 0)
     
     try:
         # Connect to database
         if not db.connect():
             logger.error("Failed to connect to database. Please check your credentials.")
-            return
+            return False
         
         # Initialize analytics engine
-        analytics = AnalyticsEngine(db)
+        cache = QueryCache(cache_dir=args.cache_dir) if args.cache_dir else None
+        rankings = dict(args.rankings) if args.rankings else None
+        if args.in_memory:
+            if args.incremental:
+                logger.warning("--incremental does not apply to --in-memory, computing all analytics from the pulled tables")
+            if args.approximate:
+                logger.warning("--approximate does not apply to --in-memory, computing exact engagement metrics")
+            from course_catalog import CourseCatalog
+            from pandas_engine import PandasAnalyticsEngine
+            catalog = CourseCatalog.load_cached(args.catalog, db=db, cache=cache) if args.catalog else None
+            analytics = PandasAnalyticsEngine(db, cache=cache, rankings=rankings, filters=args.filters,
+                                              catalog=catalog)
+        else:
+            if args.catalog:
+                logger.warning("--catalog only applies to --in-memory, the SQL engine reads the course table")
+            sketches = None
+            if args.approximate:
+                from sketches import SketchStore
+                sketches = SketchStore(args.approximate)
+            analytics = AnalyticsEngine(db, cache=cache, incremental=args.incremental, rankings=rankings,
+                                        filters=args.filters, sketches=sketches)
         
-        # Export all analytics data to CSV files
-        analytics.export_all_analytics()
+        if args.profile_report or args.slow_query_seconds is not None:
+            db.profiler = QueryProfiler(slow_query_seconds=args.slow_query_seconds,
+                                        slow_log_path=args.slow_log, measure_bytes=args.measure_bytes)
         
+        # Export the analytics as pipeline tasks, skipping those whose inputs are unchanged
+        pipeline = build_pipeline(analytics, args.formats, state_dir=args.pipeline_dir,
+                                  max_workers=args.workers, retries=args.retries)
+        with profile_run(args.cprofile, args.tracemalloc):
+            manifest = pipeline.run(args.tasks, force=args.force)
+        if args.profile_report:
+            db.profiler.write_report(args.profile_report)
+        if cache is not None:
+            logger.info(f"Query cache statistics: {cache.stats}")
+        
+        failed = [task['name'] for task in manifest['tasks'] if task['status'] in ('failed', 'blocked')]
+        if failed:
+            logger.error(f"Analytics pipeline finished with failed tasks: {', '.join(failed)}")
+            return False
         logger.info("✅ Analytics pipeline completed successfully!")
-        logger.info("📁 Check the 'data_exports' folder for CSV files")
+        logger.info(f"📁 Check the 'data_exports' folder for {', '.join(args.formats).upper()} files")
         logger.info("📊 You can now import these CSV files into Excel to create your dashboard")
-        
+        return True
+    
     except Exception as e:
         logger.error(f"Error in analytics pipeline: {e}")
+        return False
     
     finally:
         # Close database connection
+        logger.info(f"Connection statistics: {db.pool_stats()}")
         db.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    sys.exit(0 if main() else 1)
\ No newline at end of file
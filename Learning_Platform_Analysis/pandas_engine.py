@@ -0,0 +1,669 @@
+"""
+Pandas Analytics Engine for Course Platform Analytics
+Pulls each base table once as compact typed frames and computes every analytic
+in memory with vectorized NumPy, keeping the aggregation load off the database
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from database_connection import DatabaseConnection
+from analytics_engine import AnalyticsEngine, EXPORT_TASKS, POPULARITY_LIMIT
+from course_catalog import CourseCatalog
+from query_cache import QueryCache
+from query_filters import RETENTION_DAYS
+from rankings import rank_courses, ranking_key, top_k
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import logging
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns pulled from each base table and the compact dtype they are stored as.
+# Nullable foreign keys are stored as int32 with -1 for NULL, since ids are positive.
+FRAME_COLUMNS = {
+    'user': {'user_id': 'int32', 'subscription_type': 'category', 'regi_date': 'datetime64[ns]',
+             'last_login': 'datetime64[ns]', 'is_active': 'bool', 'country': 'category'},
+    'course': {'course_id': 'int32', 'course_title': 'object', 'instructor_name': 'object',
+               'subject': 'category', 'level': 'category', 'price': 'float64'},
+    'erp': {'user_id': 'int32', 'course_id': 'int32', 'erp_date': 'datetime64[ns]',
+            'completion_status': 'category', 'progress_per': 'float32', 'rating_given': 'float32'},
+    'subscriptions': {'user_id': 'int32', 'plan_type': 'category', 'status': 'category',
+                      'start_date': 'datetime64[ns]', 'monthely_fee': 'float64'},
+    'course_interactions': {'user_id': 'int32', 'course_id': 'int32', 'interaction_data': 'datetime64[ns]'}
+}
+
+# Analytic -> columns identifying a row, for comparing results whose SQL has no ORDER BY
+EQUIVALENCE_KEYS = {
+    'get_completion_rates': ['level'],
+    'get_engagement_metrics': ['subscription_type'],
+    # DuckDB sorts NULL groups last, MySQL and SQLite first
+    'get_course_rankings': ['ranking', 'group_value', 'course_rank']
+}
+
+def _type_column(series: pd.Series, dtype: str) -> pd.Series:
+    """Convert one fetched column to its compact dtype"""
+    if dtype == 'int32':
+        return pd.to_numeric(series).fillna(-1).astype('int32')
+    if dtype == 'bool':
+        # MySQL returns BOOLEAN as 0/1, NULL counts as not active like in the SQL
+        return series.eq(1).fillna(False).astype(bool)
+    if dtype == 'datetime64[ns]':
+        return pd.to_datetime(series, errors='coerce')
+    if dtype == 'category':
+        return series.astype(object).astype('category')
+    if dtype == 'object':
+        return series.astype(object)
+    return pd.to_numeric(series).astype(dtype)
+
+def type_frame(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a fetched base table (or chunk of one) to the compact dtypes of FRAME_COLUMNS
+    
+    Args:
+        table: Table name from FRAME_COLUMNS
+        df: Fetched rows with the FRAME_COLUMNS columns
+    
+    Returns:
+        pd.DataFrame: Typed frame
+    """
+    return pd.DataFrame({column: _type_column(df[column], dtype)
+                         for column, dtype in FRAME_COLUMNS[table].items()})
+
+def concat_typed(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate typed chunks, merging the categories of categorical columns"""
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = pd.Series(union_categoricals([chunk[column] for chunk in chunks],
+                                                           sort_categories=True))
+        else:
+            columns[column] = pd.concat([chunk[column] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+def _group_codes(values: pd.Series) -> Tuple[np.ndarray, List]:
+    """
+    Number the groups of a column in sort order
+    
+    Returns:
+        tuple: (group code per row, group labels) where code 0 / label None is
+        the NULL group, which MySQL sorts first
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes + 1, [None] + list(uniques)
+
+def _month_codes(values: pd.Series) -> Tuple[np.ndarray, List]:
+    """Number the 'YYYY-MM' months of a datetime column in sort order, NULL first"""
+    months = values.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    # NaT is the smallest int64, so it sorts first like NULL does in MySQL
+    uniques, codes = np.unique(months.view('int64'), return_inverse=True)
+    labels = np.datetime_as_string(uniques.view('datetime64[M]'), unit='M')
+    return codes.reshape(-1), [None if label == 'NaT' else label for label in labels]
+
+def round_percent(part: np.ndarray, whole) -> np.ndarray:
+    """part * 100 / whole rounded half up to 2 decimals, like ROUND on a MySQL DECIMAL"""
+    part = np.asarray(part, dtype=np.int64)
+    whole = np.asarray(whole, dtype=np.int64)
+    return ((part * 20000 + whole) // (2 * whole)) / 100
+
+def round_mean(sums: np.ndarray, counts: np.ndarray, decimals: int) -> np.ndarray:
+    """Group means, NaN for empty groups, rounded to the scale of MySQL's AVG result"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.round(sums / counts, decimals)
+
+class PandasAnalyticsEngine(AnalyticsEngine):
+    """
+    AnalyticsEngine that computes every analytic from in-memory frames
+    
+    Each base table is pulled once with a plain SELECT of the columns the
+    analytics need and stored compactly: categoricals for subscription_type,
+    plan_type, level, completion_status and status, int32 ids. Groups are
+    counted with np.bincount over category codes, so an export run costs the
+    database five sequential scans instead of nine aggregation queries.
+    
+    Results match the SQL versions: same columns, NULL groups included and
+    sorted first, percentages rounded half up to 2 decimals and averages of
+    integer columns rounded to 4 decimals like MySQL's DECIMAL AVG, and course
+    ranking ties broken by course_id. The frames
+    are a snapshot; call refresh() to pull the tables again.
+    """
+    
+    # The frames are loaded before concurrent export workers start, so they share this engine
+    shares_engine_across_workers = True
+    
+    def __init__(self, db_connection: DatabaseConnection, cache: Optional[QueryCache] = None,
+                 chunksize: int = 100000, rankings: Optional[Dict[str, int]] = None,
+                 filters: Optional[Dict[str, Any]] = None, catalog: Optional[CourseCatalog] = None):
+        """
+        Initialize the engine
+        
+        Args:
+            db_connection: DatabaseConnection instance
+            cache: Optional QueryCache for the base table pulls
+            chunksize: Rows fetched and typed per chunk while pulling a table
+            rankings: Course rankings of get_course_rankings, see AnalyticsEngine
+            filters: Default time window and filters, see AnalyticsEngine
+            catalog: Course catalog the course frame is taken from instead of pulling the course table
+        """
+        super().__init__(db_connection, cache=cache, rankings=rankings, filters=filters)
+        self.chunksize = chunksize
+        self.catalog = catalog
+        self.frames = None
+        # Database clock when the frames were pulled, the NOW() of the SQL versions
+        self.now = None
+        self._frames_lock = threading.Lock()
+    
+    @staticmethod
+    def frame_query(table: str) -> str:
+        """Return the SELECT that pulls a base table"""
+        columns = ', '.join(FRAME_COLUMNS[table])
+        return f"SELECT {columns} FROM {table}"
+    
+    def registered_queries(self) -> Dict[str, Tuple[str, List[str], Optional[Dict[str, Any]]]]:
+        """
+        Collect the SQL the engine runs, one pull per base table
+        
+        Returns:
+            dict: query name -> (SQL query string, base tables it reads, values of its parameters)
+        """
+        return {f'{table}_frame': (self.frame_query(table), [table], None) for table in FRAME_COLUMNS}
+    
+    def _pull(self, table: str) -> pd.DataFrame:
+        """Pull one base table as a typed frame, through the cache when one is configured"""
+        query = self.frame_query(table)
+        name = f'{table}_frame'
+        if self.cache is not None:
+            df = self._fetch(name, query, [table])
+            if df is None:
+                raise ConnectionError(f"Could not pull {table}")
+            return type_frame(table, df)
+        
+        # Typing each chunk as it arrives keeps only one chunk of raw rows in memory
+        chunks = [type_frame(table, chunk) for chunk in self.db.fetch_iter(query, self.chunksize, label=name)]
+        if not chunks:
+            raise ConnectionError(f"Could not pull {table}")
+        return concat_typed(chunks)
+    
+    def load_frames(self) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Pull the base tables, once per engine until refresh()
+        
+        Join positions are resolved once: erp and course_interactions get
+        course_row and user_row and subscriptions gets user_row, the row of the
+        referenced course or user (-1 when it does not exist).
+        
+        Returns:
+            dict: table name -> typed frame, None if a table could not be pulled
+        """
+        with self._frames_lock:
+            if self.frames is not None:
+                return self.frames
+            
+            started = time.perf_counter()
+            try:
+                now = self.db.fetch_dataframe("SELECT NOW() AS now", label='now')
+                frames = {table: type_frame(table, self.catalog.frame(list(FRAME_COLUMNS[table])))
+                          if table == 'course' and self.catalog is not None else self._pull(table)
+                          for table in FRAME_COLUMNS}
+            except self.db.QUERY_ERRORS as e:
+                logger.error(f"Error pulling base tables: {e}")
+                return None
+            if now is None:
+                return None
+            
+            users = pd.Index(frames['user']['user_id'])
+            courses = pd.Index(frames['course']['course_id'])
+            for table in ('erp', 'course_interactions'):
+                frames[table]['course_row'] = courses.get_indexer(frames[table]['course_id']).astype('int32')
+            for table in ('erp', 'course_interactions', 'subscriptions'):
+                frames[table]['user_row'] = users.get_indexer(frames[table]['user_id']).astype('int32')
+            
+            self.now = pd.Timestamp(now['now'].iloc[0])
+            self.frames = frames
+            logger.info(f"Pulled {sum(len(df) for df in frames.values())} rows "
+                        f"({self.memory_usage().sum() / 2**20:.1f} MB) in {time.perf_counter() - started:.2f}s")
+            return self.frames
+    
+    def refresh(self):
+        """Drop the frames so the next analytic pulls the tables again"""
+        with self._frames_lock:
+            self.frames = None
+            self.now = None
+    
+    def memory_usage(self) -> pd.Series:
+        """
+        Return the memory held by each frame
+        
+        Returns:
+            pd.Series: table name -> bytes, including string contents
+        """
+        frames = self.frames or {}
+        return pd.Series({table: int(df.memory_usage(deep=True).sum()) for table, df in frames.items()},
+                         dtype='int64')
+    
+    def _run_exports(self, max_workers: int) -> List[Dict]:
+        """Pull the frames once, then run every export task"""
+        self.load_frames()
+        return super()._run_exports(max_workers)
+    
+    @staticmethod
+    def _window_mask(values: pd.Series, filters: Dict[str, Any]) -> np.ndarray:
+        """Rows whose timestamp is in the window; NULL timestamps never are, as in SQL"""
+        mask = np.ones(len(values), dtype=bool)
+        if 'start' in filters:
+            mask &= (values >= filters['start']).to_numpy()
+        if 'end' in filters:
+            mask &= (values < filters['end']).to_numpy()
+        return mask
+    
+    @staticmethod
+    def _row_mask(rows: np.ndarray, referenced: np.ndarray) -> np.ndarray:
+        """Rows whose referenced row (-1 when missing) is selected by a mask over the referenced table"""
+        return (rows >= 0) & referenced[np.maximum(rows, 0)]
+    
+    def _user_mask(self, filters: Dict[str, Any], window: bool = True) -> np.ndarray:
+        """Users of the country, registered in the window unless window is False"""
+        users = self.frames['user']
+        mask = self._window_mask(users['regi_date'], filters) if window else np.ones(len(users), dtype=bool)
+        if 'country' in filters:
+            mask &= (users['country'] == filters['country']).to_numpy()
+        return mask
+    
+    def _course_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Courses of the subject"""
+        courses = self.frames['course']
+        if 'subject' not in filters:
+            return np.ones(len(courses), dtype=bool)
+        return (courses['subject'] == filters['subject']).to_numpy()
+    
+    def _activity_mask(self, table: str, column: str, filters: Dict[str, Any],
+                       subject: bool = True, country: bool = True) -> np.ndarray:
+        """Rows of erp or course_interactions in the window, for courses of the subject and users of the country"""
+        frame = self.frames[table]
+        mask = self._window_mask(frame[column], filters)
+        if subject and 'subject' in filters:
+            mask &= self._row_mask(frame['course_row'].to_numpy(), self._course_mask(filters))
+        if country and 'country' in filters:
+            mask &= self._row_mask(frame['user_row'].to_numpy(), self._user_mask(filters, window=False))
+        return mask
+    
+    def _user_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Group users by subscription type, shaped like AnalyticsEngine._user_scan"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        users = frames['user'][self._user_mask(self._filters(filters))]
+        
+        codes, labels = _group_codes(users['subscription_type'])
+        user_counts = np.bincount(codes, minlength=len(labels))
+        active_users = np.bincount(codes[users['is_active'].to_numpy()], minlength=len(labels))
+        present = np.flatnonzero(user_counts)
+        order = present[np.argsort(-user_counts[present], kind='stable')]
+        
+        return pd.DataFrame({
+            'subscription_type': [labels[i] for i in order],
+            'user_count': user_counts[order],
+            'percentage': round_percent(user_counts[order], len(users)),
+            'active_users': active_users[order]
+        })
+    
+    def _subscription_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Group subscriptions by plan, shaped like AnalyticsEngine._subscription_scan"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        filters = self._filters(filters)
+        subscriptions = frames['subscriptions']
+        mask = self._window_mask(subscriptions['start_date'], filters)
+        if 'plan_type' in filters:
+            mask &= (subscriptions['plan_type'] == filters['plan_type']).to_numpy()
+        if 'country' in filters:
+            mask &= self._row_mask(subscriptions['user_row'].to_numpy(), self._user_mask(filters, window=False))
+        subscriptions = subscriptions[mask]
+        
+        codes, labels = _group_codes(subscriptions['plan_type'])
+        groups = len(labels)
+        active = (subscriptions['status'] == 'active').to_numpy()
+        cancelled = (subscriptions['status'] == 'cancelled').to_numpy()
+        fees = subscriptions['monthely_fee'].to_numpy(dtype='float64')
+        
+        total = np.bincount(codes, minlength=groups)
+        churned = np.bincount(codes[cancelled], minlength=groups)
+        active_count = np.bincount(codes[active], minlength=groups)
+        revenue = np.bincount(codes[active], weights=fees[active], minlength=groups)
+        present = np.flatnonzero(total)
+        
+        # SUM of no rows is NULL in SQL
+        monthly_revenue = np.where(active_count > 0, np.round(revenue, 2), np.nan)
+        recurring = np.round(revenue.sum(), 2) if active.any() else np.nan
+        return pd.DataFrame({
+            'plan_type': [labels[i] for i in present],
+            'total_subscriptions': total[present],
+            'churned': churned[present],
+            'churn_rate': round_percent(churned[present], total[present]),
+            'active_subscriptions': active_count[present],
+            'monthly_revenue': monthly_revenue[present],
+            # AVG of a DECIMAL(10, 2) has 6 decimals in MySQL
+            'avg_monthly_fee': round_mean(revenue[present], active_count[present], 6),
+            'monthly_recurring_revenue': recurring
+        })
+    
+    def _catalog_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Course count and average rating, shaped like AnalyticsEngine._catalog_scan"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        filters = self._filters(filters)
+        ratings = frames['erp']['rating_given'].to_numpy(dtype='float64')
+        ratings = ratings[self._activity_mask('erp', 'erp_date', filters)]
+        rated = ratings[~np.isnan(ratings)]
+        return pd.DataFrame([{
+            'total_courses': int(self._course_mask(filters).sum()),
+            'avg_course_rating': round_mean(rated.sum(), len(rated), 4) if len(rated) else None
+        }])
+    
+    def get_user_registration_trends(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get premium vs free users trend over time"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        users = frames['user'][self._user_mask(self._filters(filters))]
+        
+        months, month_labels = _month_codes(users['regi_date'])
+        types, type_labels = _group_codes(users['subscription_type'])
+        counts = np.bincount(months * len(type_labels) + types, minlength=len(month_labels) * len(type_labels))
+        # Keys are ordered by month, then subscription type, as in the ORDER BY
+        keys = np.flatnonzero(counts)
+        
+        return pd.DataFrame({
+            'month': [month_labels[i] for i in keys // len(type_labels)],
+            'subscription_type': [type_labels[i] for i in keys % len(type_labels)],
+            'new_users': counts[keys]
+        })
+    
+    def _course_stats(self, filters: Optional[Dict[str, Any]] = None
+                      ) -> Optional[Tuple[pd.DataFrame, np.ndarray, np.ndarray]]:
+        """
+        Aggregate enrollments and ratings per course in one pass over erp
+        
+        Returns:
+            tuple: (frame of the courses of the subject, enrollments in the window
+            per course row, average rating per course row with NaN for unrated
+            courses), None if the tables could not be pulled
+        """
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        filters = self._filters(filters)
+        courses, erp = frames['course'], frames['erp']
+        
+        rows = erp['course_row'].to_numpy()
+        ratings = erp['rating_given'].to_numpy(dtype='float64')
+        matched = (rows >= 0) & self._activity_mask('erp', 'erp_date', filters, subject=False)
+        rated = matched & ~np.isnan(ratings)
+        enrollments = np.bincount(rows[matched], minlength=len(courses))
+        rating_sums = np.bincount(rows[rated], weights=ratings[rated], minlength=len(courses))
+        rating_counts = np.bincount(rows[rated], minlength=len(courses))
+        avg_rating = round_mean(rating_sums, rating_counts, 4)
+        if 'subject' in filters:
+            keep = self._course_mask(filters)
+            return courses[keep].reset_index(drop=True), enrollments[keep], avg_rating[keep]
+        return courses, enrollments, avg_rating
+    
+    def _ranking_scan(self, filters: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """Rank courses for every ranking, shaped like AnalyticsEngine._ranking_scan"""
+        stats = self._course_stats(filters)
+        if stats is None:
+            return None
+        return rank_courses(*stats, self.rankings)
+    
+    def get_course_popularity(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get course popularity analysis"""
+        stats = self._course_stats(filters)
+        if stats is None:
+            return None
+        courses, enrollments, avg_rating = stats
+        top = top_k(ranking_key(enrollments, courses['course_id'].to_numpy()), POPULARITY_LIMIT)
+        
+        result = courses.iloc[top][['course_title', 'instructor_name', 'subject']].astype(object)
+        result['total_enrollments'] = enrollments[top]
+        result['avg_rating'] = avg_rating[top]
+        result['price'] = courses['price'].to_numpy()[top]
+        return result.reset_index(drop=True)
+    
+    def get_completion_rates(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get course completion rates by level"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        courses, erp = frames['course'], frames['erp']
+        
+        levels, labels = _group_codes(courses['level'])
+        rows = erp['course_row'].to_numpy()
+        matched = (rows >= 0) & self._activity_mask('erp', 'erp_date', self._filters(filters))
+        groups = levels[rows[matched]]
+        completed = (erp['completion_status'] == 'completed').to_numpy()[matched]
+        
+        total = np.bincount(groups, minlength=len(labels))
+        completions = np.bincount(groups[completed], minlength=len(labels))
+        present = np.flatnonzero(total)
+        return pd.DataFrame({
+            'level': [labels[i] for i in present],
+            'total_enrollments': total[present],
+            'completions': completions[present],
+            'completion_rate': round_percent(completions[present], total[present])
+        })
+    
+    def get_engagement_metrics(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get user engagement metrics by subscription type"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        filters = self._filters(filters)
+        users, erp, interactions = frames['user'], frames['erp'], frames['course_interactions']
+        
+        user_groups, labels = _group_codes(users['subscription_type'])
+        groups = len(labels)
+        selected = self._user_mask(filters, window=False)
+        present = np.flatnonzero(np.bincount(user_groups[selected], minlength=groups))
+        
+        # Enrollments of existing users, as in the user LEFT JOIN erp
+        rows = erp['user_row'].to_numpy()
+        matched = self._row_mask(rows, selected) & self._activity_mask('erp', 'erp_date', filters, country=False)
+        erp_groups = user_groups[rows[matched]]
+        progress = erp['progress_per'].to_numpy(dtype='float64')[matched]
+        course_ids = erp['course_id'].to_numpy()[matched].astype(np.int64)
+        
+        has_progress = ~np.isnan(progress)
+        progress_sums = np.bincount(erp_groups[has_progress], weights=progress[has_progress], minlength=groups)
+        progress_counts = np.bincount(erp_groups[has_progress], minlength=groups)
+        
+        # Distinct (group, course) pairs, NULL course ids are not counted
+        has_course = course_ids >= 0
+        stride = course_ids.max() + 1 if has_course.any() else 1
+        pairs = np.unique(erp_groups[has_course] * stride + course_ids[has_course])
+        distinct_courses = np.bincount(pairs // stride, minlength=groups)
+        
+        interaction_rows = interactions['user_row'].to_numpy()
+        counted = self._row_mask(interaction_rows, selected) & \
+            self._activity_mask('course_interactions', 'interaction_data', filters, country=False)
+        interaction_counts = np.bincount(user_groups[interaction_rows[counted]], minlength=groups)
+        
+        return pd.DataFrame({
+            'subscription_type': [labels[i] for i in present],
+            'avg_courses_enrolled': distinct_courses[present],
+            'avg_completion_rate': round_mean(progress_sums[present], progress_counts[present], 4),
+            'total_interactions': interaction_counts[present]
+        })
+    
+    def get_cohort_analysis(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Get cohort analysis for user retention"""
+        frames = self.load_frames()
+        if frames is None:
+            return None
+        filters = self._filters(filters)
+        users = frames['user'][self._user_mask(filters)]
+        
+        months, labels = _month_codes(users['regi_date'])
+        end = filters.get('end')
+        recent = (users['last_login'] >= (end or self.now) - pd.Timedelta(days=RETENTION_DAYS)).to_numpy()
+        if end is not None:
+            recent = recent & (users['last_login'] < end).to_numpy()
+        total = np.bincount(months, minlength=len(labels))
+        active = np.bincount(months[recent], minlength=len(labels))
+        
+        return pd.DataFrame({
+            'registration_month': labels,
+            'total_users': total,
+            'active_last_30_days': active,
+            'retention_rate': round_percent(active, total)
+        })
+
+def compare_frames(name: str, expected: Optional[pd.DataFrame], actual: Optional[pd.DataFrame],
+                   atol: float = 0.01) -> List[str]:
+    """
+    Compare an AnalyticsEngine result with a PandasAnalyticsEngine result
+    
+    Rows are matched by EQUIVALENCE_KEYS for queries without ORDER BY.
+    Numbers may differ by atol, the last digit of a 2-decimal rounding.
+    
+    Args:
+        name: AnalyticsEngine method name
+        expected: SQL result
+        actual: pandas result
+        atol: Absolute tolerance for floating point columns
+    
+    Returns:
+        list: Differences found, empty when the results are equivalent
+    """
+    if expected is None or actual is None:
+        return [] if expected is None and actual is None else ["one result is None"]
+    if list(expected.columns) != list(actual.columns):
+        return [f"columns {list(expected.columns)} != {list(actual.columns)}"]
+    if len(expected) != len(actual):
+        return [f"{len(expected)} rows != {len(actual)} rows"]
+    
+    differences = []
+    if name in EQUIVALENCE_KEYS:
+        expected = expected.sort_values(EQUIVALENCE_KEYS[name], na_position='first')
+        actual = actual.sort_values(EQUIVALENCE_KEYS[name], na_position='first')
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    
+    for column in expected.columns:
+        left, right = expected[column], actual[column]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            same = np.allclose(left.to_numpy(dtype='float64'), right.to_numpy(dtype='float64'),
+                               rtol=1e-9, atol=atol, equal_nan=True)
+        else:
+            same = (left.isna() == right.isna()).all() and \
+                (left[left.notna()].astype(str) == right[right.notna()].astype(str)).all()
+        if not same:
+            differences.append(f"column {column} differs")
+    return differences
+
+def check_equivalence(sql_engine: AnalyticsEngine, pandas_engine: PandasAnalyticsEngine) -> Dict[str, List[str]]:
+    """
+    Run every exported analytic on both engines and compare the results
+    
+    Returns:
+        dict: method name -> differences, empty lists for equivalent results
+    """
+    return {method_name: compare_frames(method_name, getattr(sql_engine, method_name)(),
+                                        getattr(pandas_engine, method_name)())
+            for method_name, _ in EXPORT_TASKS}
+
+def benchmark_engines(db: DatabaseConnection, repeat: int = 3) -> pd.DataFrame:
+    """
+    Time every analytic on the SQL engine and the pandas engine
+    
+    The pandas engine is timed on loaded frames; the pull itself is reported
+    as 'load_frames'.
+    
+    Args:
+        db: Connected DatabaseConnection
+        repeat: Runs per method, the fastest is reported
+    
+    Returns:
+        pd.DataFrame: name, sql_seconds, pandas_seconds
+    """
+    from benchmark_suite import best_time
+    
+    sql_engine = AnalyticsEngine(db)
+    pandas_engine = PandasAnalyticsEngine(db)
+    load_seconds, _ = best_time(pandas_engine.load_frames, 1)
+    
+    rows = [{'name': 'load_frames', 'sql_seconds': np.nan, 'pandas_seconds': load_seconds}]
+    for method_name, _ in EXPORT_TASKS:
+        rows.append({'name': method_name,
+                     'sql_seconds': best_time(getattr(sql_engine, method_name), repeat)[0],
+                     'pandas_seconds': best_time(getattr(pandas_engine, method_name), repeat)[0]})
+    return pd.DataFrame(rows)
+
+def benchmark_memory(db: DatabaseConnection) -> pd.DataFrame:
+    """
+    Compare the memory of the typed frames with the same columns fetched untyped
+    
+    Returns:
+        pd.DataFrame: table, rows, untyped_mb, typed_mb
+    """
+    engine = PandasAnalyticsEngine(db)
+    if engine.load_frames() is None:
+        return None
+    typed = engine.memory_usage()
+    rows = []
+    for table in FRAME_COLUMNS:
+        untyped = db.fetch_dataframe(engine.frame_query(table))
+        rows.append({'table': table, 'rows': len(untyped),
+                     'untyped_mb': untyped.memory_usage(deep=True).sum() / 2**20,
+                     'typed_mb': typed[table] / 2**20})
+    return pd.DataFrame(rows)
+
+# Test function
+def test_pandas_engine(scale_factor: float = 1, engine: str = 'duckdb', repeat: int = 3):
+    """
+    Check the pandas engine against the SQL engine on synthetic data and benchmark both
+    
+    Args:
+        scale_factor: Synthetic data scale factor
+        engine: Embedded engine the SQL versions run on, 'duckdb' or 'sqlite'
+        repeat: Runs per method in the runtime benchmark
+    """
+    from embedded_backend import EmbeddedConnection
+    from synthetic_data import generate_tables, write_snapshot
+    
+    with tempfile.TemporaryDirectory(prefix='pandas_engine_') as snapshot_dir:
+        write_snapshot(generate_tables(scale_factor), snapshot_dir)
+        db = EmbeddedConnection(snapshot_dir, engine=engine)
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+        
+        try:
+            differences = check_equivalence(AnalyticsEngine(db), PandasAnalyticsEngine(db))
+            for method_name, problems in differences.items():
+                if problems:
+                    print(f"[ERROR] {method_name}: {'; '.join(problems)}")
+                else:
+                    print(f"[SUCCESS] {method_name} matches the SQL version")
+            
+            print("\nRuntime (seconds):")
+            print(benchmark_engines(db, repeat).to_string(index=False, float_format='%.4f'))
+            print("\nMemory (MB):")
+            print(benchmark_memory(db).to_string(index=False, float_format='%.2f'))
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check and benchmark the pandas analytics engine")
+    parser.add_argument('--scale-factor', type=float, default=1, help="1 = 10,000 users and 500 courses")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    test_pandas_engine(args.scale_factor, args.engine, args.repeat)
@@ -0,0 +1,295 @@
+"""
+Table Partitioning for Course Platform Analytics
+Monthly RANGE partitions for erp and course_interactions, so windowed
+analytics read only the months in their window
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from query_filters import (TIMESTAMP_FORMAT, describe_filters, filter_predicates, last_months, validate_filters,
+                           where_clause)
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> (id column, TIMESTAMP column partitioned by month).
+# MySQL requires the partitioning column in every unique key, so the primary
+# key becomes (id, timestamp), and partitioned InnoDB tables cannot have
+# foreign keys, so theirs are dropped.
+PARTITIONED_TABLES = {
+    'erp': ('erp_id', 'erp_date'),
+    'course_interactions': ('interaction_id', 'interaction_data')
+}
+
+# Partition holding rows past the last monthly partition, split by rollover
+OVERFLOW_PARTITION = 'pmax'
+
+def partition_name(month: pd.Period) -> str:
+    """Name of the partition holding one month, e.g. p202401"""
+    return f"p{month.strftime('%Y%m')}"
+
+def partition_months(start: str, months_ahead: int = 3, now: Optional[pd.Timestamp] = None) -> List[pd.Period]:
+    """
+    Months that get their own partition
+    
+    Args:
+        start: First partitioned month ('2024-01'); older rows share its partition
+        months_ahead: Months after the current one created in advance
+        now: Current time (default: local time)
+    
+    Returns:
+        list: Monthly periods from start through the current month plus months_ahead
+    """
+    last = (now or pd.Timestamp.now()).to_period('M') + months_ahead
+    return list(pd.period_range(pd.Period(start, 'M'), max(last, pd.Period(start, 'M')), freq='M'))
+
+def partition_definitions(months: List[pd.Period], overflow: bool = True) -> str:
+    """
+    Partition list for the months, each holding rows before the next month starts
+    
+    Bounds are UNIX_TIMESTAMP() values of the month starts in the session time
+    zone, the only partitioning function MySQL allows on TIMESTAMP columns.
+    """
+    partitions = [f"PARTITION {partition_name(month)} VALUES LESS THAN "
+                  f"(UNIX_TIMESTAMP('{(month + 1).to_timestamp().strftime(TIMESTAMP_FORMAT)}'))"
+                  for month in months]
+    if overflow:
+        partitions.append(f"PARTITION {OVERFLOW_PARTITION} VALUES LESS THAN MAXVALUE")
+    return ',\n    '.join(partitions)
+
+def partition_statements(table: str, months: List[pd.Period]) -> List[str]:
+    """
+    ALTER TABLE statements that partition one table by month
+    
+    Args:
+        table: Key of PARTITIONED_TABLES
+        months: Months from partition_months()
+    
+    Returns:
+        list: Primary key change and PARTITION BY statement (foreign keys must be dropped first)
+    
+    Primary key columns are NOT NULL, so rows without a timestamp must be given one first.
+    """
+    id_column, date_column = PARTITIONED_TABLES[table]
+    return [
+        f"ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY ({id_column}, {date_column})",
+        f"ALTER TABLE `{table}` PARTITION BY RANGE (UNIX_TIMESTAMP({date_column})) (\n"
+        f"    {partition_definitions(months)}\n)"
+    ]
+
+def generate_ddl(start: str, months_ahead: int = 3, now: Optional[pd.Timestamp] = None) -> str:
+    """
+    Build an idempotent DDL script partitioning erp and course_interactions by month
+    
+    Like the index advisor's script, each step is prepared conditionally on
+    information_schema, so already partitioned tables are left alone.
+    
+    Args:
+        start: First partitioned month
+        months_ahead: Months after the current one created in advance
+        now: Current time (default: local time)
+    
+    Returns:
+        str: SQL script that can be run any number of times
+    """
+    months = partition_months(start, months_ahead, now)
+    lines = [f"-- Monthly partitions {months[0]} to {months[-1]} for windowed analytics (safe to re-run)", ""]
+    for table in PARTITIONED_TABLES:
+        unpartitioned = (f"(SELECT COUNT(*) FROM information_schema.partitions WHERE table_schema = DATABASE() "
+                         f"AND table_name = '{table}' AND partition_name IS NOT NULL) = 0")
+        lines += [
+            f"-- {table}: drop foreign keys, which partitioned InnoDB tables cannot have",
+            "SET @ddl = (SELECT IFNULL(CONCAT('ALTER TABLE `" + table + "` ', "
+            "GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', constraint_name, '`'))), 'DO 0')",
+            "            FROM information_schema.referential_constraints",
+            f"            WHERE constraint_schema = DATABASE() AND table_name = '{table}');",
+            "PREPARE stmt FROM @ddl;",
+            "EXECUTE stmt;",
+            "DEALLOCATE PREPARE stmt;",
+            ""
+        ]
+        for statement in partition_statements(table, months):
+            quoted = statement.replace("'", "''")
+            lines += [
+                f"SET @ddl = IF({unpartitioned},",
+                f"    '{quoted}',",
+                "    'DO 0');",
+                "PREPARE stmt FROM @ddl;",
+                "EXECUTE stmt;",
+                "DEALLOCATE PREPARE stmt;",
+                ""
+            ]
+    return '\n'.join(lines)
+
+def existing_partitions(db: DatabaseConnection, table: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    List the partitions of a table in order
+    
+    Returns:
+        list: (partition name, VALUES LESS THAN expression) pairs, empty for an
+              unpartitioned table, None if error
+    """
+    rows = db.execute_query("""
+    SELECT partition_name, partition_description
+    FROM information_schema.partitions
+    WHERE table_schema = DATABASE() AND table_name = %(table)s AND partition_name IS NOT NULL
+    ORDER BY partition_ordinal_position
+    """, {'table': table})
+    if rows is None:
+        return None
+    return [(name, description) for name, description in rows]
+
+def foreign_keys(db: DatabaseConnection, table: str) -> List[str]:
+    """Names of the foreign keys of a table"""
+    rows = db.execute_query("""
+    SELECT constraint_name
+    FROM information_schema.referential_constraints
+    WHERE constraint_schema = DATABASE() AND table_name = %(table)s
+    """, {'table': table}) or []
+    return [row[0] for row in rows]
+
+def apply_partitioning(db: DatabaseConnection, start: str, months_ahead: int = 3) -> List[str]:
+    """
+    Partition the tables that are not partitioned yet
+    
+    Rebuilds each table, which copies it and blocks writes for the duration.
+    
+    Args:
+        db: Connected DatabaseConnection
+        start: First partitioned month
+        months_ahead: Months after the current one created in advance
+    
+    Returns:
+        list: Names of the tables partitioned
+    """
+    months = partition_months(start, months_ahead)
+    pending = {}
+    for table in PARTITIONED_TABLES:
+        partitions = existing_partitions(db, table)
+        if partitions is None:
+            logger.error(f"Could not read the partitions of {table}, skipping it")
+        elif not partitions:
+            pending[table] = foreign_keys(db, table)
+    partitioned = []
+    
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        try:
+            for table, constraints in pending.items():
+                if constraints:
+                    logger.info(f"Dropping foreign keys of {table}: {', '.join(constraints)}")
+                    cursor.execute(f"ALTER TABLE `{table}` " +
+                                   ', '.join(f"DROP FOREIGN KEY `{name}`" for name in constraints))
+                logger.info(f"Partitioning {table} by month from {months[0]} to {months[-1]}")
+                for statement in partition_statements(table, months):
+                    cursor.execute(statement)
+                partitioned.append(table)
+        finally:
+            cursor.close()
+    
+    return partitioned
+
+def roll_partitions(db: DatabaseConnection, months_ahead: int = 3) -> Dict[str, List[str]]:
+    """
+    Split the overflow partition so every table has partitions months_ahead into the future
+    
+    Run monthly (e.g. from cron); REORGANIZE PARTITION of the overflow
+    partition only moves the rows already in it, normally none.
+    
+    Args:
+        db: Connected DatabaseConnection
+        months_ahead: Months after the current one that must have a partition
+    
+    Returns:
+        dict: table -> names of the partitions added
+    """
+    added = {}
+    target = pd.Timestamp.now().to_period('M') + months_ahead
+    for table in PARTITIONED_TABLES:
+        partitions = existing_partitions(db, table)
+        if not partitions:
+            logger.warning(f"{table} is not partitioned, skipping rollover")
+            continue
+        names = [name for name, _ in partitions]
+        monthly = [name for name in names if name != OVERFLOW_PARTITION]
+        if OVERFLOW_PARTITION not in names or not monthly:
+            logger.error(f"{table} has no {OVERFLOW_PARTITION} partition to split")
+            continue
+        
+        last = pd.Period(monthly[-1][1:], 'M')
+        months = list(pd.period_range(last + 1, target, freq='M')) if last < target else []
+        if months:
+            logger.info(f"Adding partitions {months[0]} to {months[-1]} to {table}")
+            db.execute_query(f"ALTER TABLE `{table}` REORGANIZE PARTITION {OVERFLOW_PARTITION} INTO (\n"
+                             f"    {partition_definitions(months)}\n)")
+        added[table] = [partition_name(month) for month in months]
+    return added
+
+def explain_pruning(db: DatabaseConnection, filters: Dict) -> pd.DataFrame:
+    """
+    Show which partitions a windowed scan of each table reads
+    
+    Args:
+        db: Connected DatabaseConnection
+        filters: Filters with a 'start' and/or 'end' window
+    
+    Returns:
+        pd.DataFrame: One row per table with the partitions EXPLAIN reports
+    """
+    filters = validate_filters(filters)
+    report = []
+    for table, (_, date_column) in PARTITIONED_TABLES.items():
+        predicates, params = filter_predicates(filters, window=date_column)
+        query = f"SELECT COUNT(*) FROM `{table}` {where_clause(predicates)}"
+        # Traditional EXPLAIN columns: id, select_type, table, partitions, ...
+        plan = db.execute_query(f"EXPLAIN {query}", params)
+        if plan is None:
+            logger.error(f"Could not explain the windowed scan of {table}")
+            continue
+        partitions = str(plan[0][3] or '')
+        report.append({'table': table, 'window': describe_filters(filters),
+                       'partitions_read': len(partitions.split(',')) if partitions else 0,
+                       'partitions': partitions})
+    return pd.DataFrame(report, columns=['table', 'window', 'partitions_read', 'partitions'])
+
+def main():
+    """Manage the monthly partitions from the command line"""
+    parser = argparse.ArgumentParser(description="Partition erp and course_interactions by month")
+    parser.add_argument('--start', default=str(pd.Timestamp.now().to_period('M') - 35),
+                        help="First partitioned month, older rows share its partition (default: 3 years ago)")
+    parser.add_argument('--months-ahead', type=int, default=3, help="Future months partitioned in advance")
+    parser.add_argument('--emit-ddl', metavar='PATH', help="Write the idempotent partitioning DDL script to PATH")
+    parser.add_argument('--apply', action='store_true', help="Partition the tables that are not partitioned yet")
+    parser.add_argument('--rollover', action='store_true', help="Add the partitions of upcoming months")
+    parser.add_argument('--explain-months', type=int, default=3,
+                        help="Window, in months, of the pruning check run after --apply/--rollover")
+    args = parser.parse_args()
+    
+    if args.emit_ddl:
+        with open(args.emit_ddl, 'w') as f:
+            f.write(generate_ddl(args.start, args.months_ahead))
+        print(f"[SUCCESS] Wrote partitioning DDL to {args.emit_ddl}")
+        if not (args.apply or args.rollover):
+            return
+    
+    db = DatabaseConnection()
+    if not db.connect():
+        print("[ERROR] Database connection failed")
+        return
+    
+    try:
+        if args.apply:
+            partitioned = apply_partitioning(db, args.start, args.months_ahead)
+            print(f"Partitioned tables: {', '.join(partitioned) if partitioned else 'none (all partitioned)'}")
+        if args.rollover:
+            for table, added in roll_partitions(db, args.months_ahead).items():
+                print(f"{table}: added {', '.join(added) if added else 'no partitions'}")
+        print(explain_pruning(db, last_months(args.explain_months)).to_string(index=False))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
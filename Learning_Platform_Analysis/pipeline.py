@@ -0,0 +1,566 @@
+"""
+Pipeline Scheduler for Course Platform Analytics
+Runs the analytics exports as a dependency graph of tasks, in parallel, skipping
+tasks whose inputs have not changed since their last successful run
+"""
+
+import pandas as pd
+from analytics_engine import AnalyticsEngine, EXPORT_TASKS
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from database_connection import DatabaseConnection
+from exporters import EXPORTERS, XLSXExporter, pa
+from graphlib import TopologicalSorter
+from query_cache import DEFAULT_TTLS, TABLE_KEYS, QueryCache
+from query_filters import describe_filters
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Base tables each exported analytic reads, without filters
+ANALYTICS_INPUTS = {
+    'get_user_distribution': ['user'],
+    'get_user_registration_trends': ['user'],
+    'get_course_popularity': ['course', 'erp'],
+    'get_course_rankings': ['course', 'erp'],
+    'get_completion_rates': ['course', 'erp'],
+    'get_revenue_metrics': ['subscriptions'],
+    'get_churn_analysis': ['subscriptions'],
+    'get_engagement_metrics': ['course_interactions', 'erp', 'user'],
+    'get_cohort_analysis': ['user'],
+    'get_platform_kpis': ['course', 'erp', 'subscriptions', 'user']
+}
+
+# Filter -> table an activity query reads to apply it (country through user, subject through course)
+FILTER_INPUTS = {'country': 'user', 'subject': 'course'}
+ACTIVITY_TABLES = ('erp', 'subscriptions', 'course_interactions')
+
+# Task outcomes: ran, skipped (inputs unchanged), failed (after its retries)
+# and blocked (an upstream task failed)
+TASK_STATUSES = ('ran', 'skipped', 'failed', 'blocked')
+
+class PipelineTask:
+    """One unit of the pipeline with the tables and files it reads and the files it writes"""
+    
+    def __init__(self, name: str, run: Callable[[], Optional[Dict]], inputs: Sequence[str] = (),
+                 outputs: Sequence[str] = (), config: Optional[Dict[str, Any]] = None,
+                 max_age: Optional[float] = None):
+        """
+        Declare a task
+        
+        Args:
+            name: Unique task name
+            run: Does the work, returns details for the manifest (or None) and
+                 raises on failure; called on a worker thread
+            inputs: Base tables and files read. A file written by another task
+                    makes this task depend on it.
+            outputs: Files written
+            config: Options that change the outputs (filters, formats, ...);
+                    a changed config reruns the task like a changed input
+            max_age: Seconds after which the outputs are stale even with
+                     unchanged inputs, for results that depend on the clock
+        """
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.config = config or {}
+        self.max_age = max_age
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's content, '' when it does not exist"""
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class Pipeline:
+    """
+    Dependency-aware scheduler of PipelineTasks
+    
+    A task depends on the tasks that write its input files. Tasks whose
+    dependencies are done run concurrently on a thread pool. Before running,
+    a task's inputs are fingerprinted: base tables by QueryCache.table_fingerprint
+    and files by content hash. When the fingerprint and config match the last
+    successful run and its outputs still exist, the task is skipped. A failing
+    task is retried on its own with exponential backoff; tasks downstream of a
+    task that still fails are blocked, independent tasks carry on.
+    
+    Each run writes a JSON manifest with every task's status, attempts,
+    timings, input fingerprints and output hashes to state_dir, next to
+    state.json with the last successful run of each task.
+    """
+    
+    def __init__(self, db: DatabaseConnection, state_dir: str = 'pipeline_runs', max_workers: int = 4,
+                 retries: int = 2, retry_backoff: float = 0.5, fingerprint: Optional[str] = None):
+        """
+        Initialize the scheduler
+        
+        Args:
+            db: Connected DatabaseConnection the table fingerprints are probed on
+            state_dir: Directory of state.json and the run manifests
+            max_workers: Tasks run at the same time
+            retries: Extra attempts of a failing task
+            retry_backoff: Seconds before the first retry, doubled each retry
+            fingerprint: Table change markers, see QueryCache (default: 'update_time',
+                         which checksums the tables on the embedded engines). 'count'
+                         misses UPDATEs and is replaced by 'checksum'
+        """
+        self.db = db
+        self.state_dir = state_dir
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        # Probed once per run, never reused across runs
+        # A skipped task keeps its old files, so the markers must catch every write
+        fingerprint = 'checksum' if fingerprint == 'count' else fingerprint or 'update_time'
+        self.cache = QueryCache(cache_dir=None, fingerprint=fingerprint, probe_interval=0)
+        self.tasks: Dict[str, PipelineTask] = {}
+        # Called before and after every run, e.g. to open shared state and close
+        # the connections opened by the tasks
+        self.initializers: List[Callable[[], None]] = []
+        self.finalizers: List[Callable[[], None]] = []
+        os.makedirs(state_dir, exist_ok=True)
+    
+    def add(self, task: PipelineTask) -> PipelineTask:
+        """Register a task, names must be unique"""
+        if task.name in self.tasks:
+            raise ValueError(f"Duplicate pipeline task: {task.name}")
+        self.tasks[task.name] = task
+        return task
+    
+    def dependencies(self) -> Dict[str, Set[str]]:
+        """
+        Upstream tasks of every task
+        
+        Returns:
+            dict: task name -> names of the tasks writing its input files
+        """
+        producers = {}
+        for task in self.tasks.values():
+            for output in task.outputs:
+                if output in producers:
+                    raise ValueError(f"{output} is written by both {producers[output]} and {task.name}")
+                producers[output] = task.name
+        return {task.name: {producers[source] for source in task.inputs if source in producers}
+                for task in self.tasks.values()}
+    
+    def select(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Tasks to run for a subset, with everything they depend on
+        
+        Args:
+            names: Task names (default: all tasks)
+        
+        Returns:
+            list: Selected task names in dependency order
+        """
+        dependencies = self.dependencies()
+        names = list(self.tasks) if names is None else list(names)
+        unknown = [name for name in names if name not in self.tasks]
+        if unknown:
+            raise ValueError(f"Unknown pipeline tasks: {', '.join(unknown)} (choose from {', '.join(self.tasks)})")
+        
+        selected, pending = set(), list(names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(dependencies[name])
+        order = TopologicalSorter({name: dependencies[name] for name in selected}).static_order()
+        return list(order)
+    
+    def _state_path(self) -> str:
+        return os.path.join(self.state_dir, 'state.json')
+    
+    def _read_state(self) -> Dict[str, Dict]:
+        """Last successful run of each task"""
+        if not os.path.exists(self._state_path()):
+            return {}
+        with open(self._state_path()) as f:
+            return json.load(f)
+    
+    def _write_state(self, state: Dict[str, Dict]):
+        """Write state.json atomically"""
+        temp_path = f"{self._state_path()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, self._state_path())
+    
+    def _fingerprint(self, task: PipelineTask, tables: Dict[str, str]) -> Dict[str, str]:
+        """Fingerprint of a task's inputs and config"""
+        fingerprint = {source: tables[source] if source in tables else file_hash(source) for source in task.inputs}
+        fingerprint['config'] = hashlib.sha256(json.dumps(task.config, sort_keys=True, default=str)
+                                               .encode('utf-8')).hexdigest()
+        return fingerprint
+    
+    @staticmethod
+    def _is_current(task: PipelineTask, fingerprint: Dict[str, str], last: Optional[Dict]) -> bool:
+        """Whether the last successful run of a task is still valid"""
+        if not last or last['fingerprint'] != fingerprint:
+            return False
+        if task.max_age is not None and time.time() - last['finished'] >= task.max_age:
+            return False
+        return all(os.path.exists(path) for path, digest in last['outputs'].items() if digest)
+    
+    def _attempt(self, task: PipelineTask) -> Dict[str, Any]:
+        """Run a task with its retries, on a worker thread"""
+        record = {'attempts': 0, 'error': None, 'details': None}
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            record['attempts'] = attempt + 1
+            try:
+                record['details'] = task.run()
+                record['error'] = None
+                break
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+                if attempt < self.retries:
+                    delay = self.retry_backoff * 2 ** attempt
+                    logger.warning(f"Task {task.name} failed ({record['error']}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                else:
+                    logger.error(f"Task {task.name} failed after {record['attempts']} attempts: {record['error']}")
+        record['status'] = 'failed' if record['error'] else 'ran'
+        record['seconds'] = time.perf_counter() - started
+        return record
+    
+    def run(self, names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Run the selected tasks and their dependencies
+        
+        Args:
+            names: Tasks to run (default: all tasks)
+            force: Run every selected task even if its inputs are unchanged
+        
+        Returns:
+            dict: The run manifest, also written to state_dir/manifest_<run id>.json
+        """
+        selected = self.select(names)
+        dependencies = self.dependencies()
+        run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        started_at = datetime.now().isoformat(timespec='seconds')
+        started = time.perf_counter()
+        logger.info(f"Pipeline run {run_id}: {len(selected)} tasks{' (forced)' if force else ''}")
+        
+        # One probe per table, so every task of the run sees the same table versions
+        produced = {output for name in selected for output in self.tasks[name].outputs}
+        tables = sorted({source for name in selected for source in self.tasks[name].inputs
+                         if source in TABLE_KEYS and source not in produced})
+        table_markers = self.cache.table_fingerprint(self.db, tables) if tables else {}
+        
+        state = self._read_state()
+        records: Dict[str, Dict] = {}
+        sorter = TopologicalSorter({name: dependencies[name] for name in selected})
+        sorter.prepare()
+        for initializer in self.initializers:
+            initializer()
+        
+        def finish(name: str, record: Dict[str, Any]):
+            task = self.tasks[name]
+            record['name'] = name
+            records[name] = record
+            if record['status'] == 'ran':
+                record['outputs'] = {path: file_hash(path) for path in task.outputs}
+                state[name] = {'fingerprint': record['inputs'], 'outputs': record['outputs'], 'finished': time.time()}
+                self._write_state(state)
+            elif record['status'] == 'skipped':
+                record['outputs'] = state[name]['outputs']
+            logger.info(f"Task {name}: {record['status']}"
+                        + (f" in {record['seconds']:.3f}s" if record['status'] == 'ran' else ''))
+            sorter.done(name)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as pool:
+                running = {}
+                while sorter.is_active():
+                    for name in sorter.get_ready():
+                        task = self.tasks[name]
+                        failed = [upstream for upstream in dependencies[name]
+                                  if records[upstream]['status'] in ('failed', 'blocked')]
+                        if failed:
+                            finish(name, {'status': 'blocked', 'attempts': 0, 'seconds': 0.0, 'inputs': {},
+                                          'error': f"upstream failed: {', '.join(sorted(failed))}"})
+                            continue
+                        fingerprint = self._fingerprint(task, table_markers)
+                        if not force and self._is_current(task, fingerprint, state.get(name)):
+                            finish(name, {'status': 'skipped', 'attempts': 0, 'seconds': 0.0,
+                                          'inputs': fingerprint, 'error': None})
+                            continue
+                        future = pool.submit(self._attempt, task)
+                        running[future] = (name, fingerprint)
+                    
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, fingerprint = running.pop(future)
+                        record = future.result()
+                        record['inputs'] = fingerprint
+                        finish(name, record)
+        finally:
+            for finalizer in self.finalizers:
+                finalizer()
+        
+        manifest = {
+            'run_id': run_id,
+            'started': started_at,
+            'seconds': time.perf_counter() - started,
+            'forced': force,
+            'selected': selected,
+            'counts': {status: sum(record['status'] == status for record in records.values())
+                       for status in TASK_STATUSES},
+            'tasks': [records[name] for name in selected]
+        }
+        path = os.path.join(self.state_dir, f"manifest_{run_id}.json")
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        self._log_summary(manifest)
+        logger.info(f"Wrote run manifest to {path}")
+        return manifest
+    
+    @staticmethod
+    def _log_summary(manifest: Dict[str, Any]):
+        """Log every task's status and time, slowest first"""
+        logger.info(f"{'task':<32} {'status':<8} {'tries':>5} {'seconds':>9}")
+        for record in sorted(manifest['tasks'], key=lambda record: record['seconds'], reverse=True):
+            logger.info(f"{record['name']:<32} {record['status']:<8} {record['attempts']:>5} {record['seconds']:>9.3f}")
+        counts = ', '.join(f"{count} {status}" for status, count in manifest['counts'].items() if count)
+        logger.info(f"Pipeline finished in {manifest['seconds']:.3f}s: {counts}")
+
+def analytic_inputs(method_name: str, filters: Dict[str, Any]) -> List[str]:
+    """Base tables an analytic reads with the given filters"""
+    inputs = list(ANALYTICS_INPUTS[method_name])
+    if any(table in inputs for table in ACTIVITY_TABLES):
+        inputs += [table for name, table in FILTER_INPUTS.items() if name in filters and table not in inputs]
+    return sorted(inputs)
+
+def task_name(method_name: str) -> str:
+    """Pipeline task name of an exported analytic, the method name without get_"""
+    return method_name[len('get_'):]
+
+def file_formats(formats: Sequence[str]) -> List[str]:
+    """Per-analytic file formats; the workbook alone still needs one to be built from"""
+    files = [fmt for fmt in formats if fmt != 'xlsx']
+    return files or ['parquet' if pa is not None else 'csv']
+
+def read_export(path: str) -> pd.DataFrame:
+    """Read back an exported analytic file"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.feather'):
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+def workbook_task(sources: Dict[str, str], export_dir: str) -> PipelineTask:
+    """
+    Task writing the XLSX dashboard from the exported analytic files
+    
+    Args:
+        sources: Analytic name -> exported file, sheets are written in this order
+        export_dir: Directory of the workbook
+    """
+    workbook = os.path.join(export_dir, f"analytics_dashboard{XLSXExporter.extension}")
+    
+    def run() -> Dict:
+        exporter = XLSXExporter(export_dir)
+        for name, path in sources.items():
+            if os.path.exists(path):
+                exporter.export(read_export(path), name)
+        if exporter.close() is None:
+            raise RuntimeError("no analytic files to build the workbook from")
+        return {'path': workbook, 'sheets': len(exporter._sheets)}
+    
+    return PipelineTask('dashboard_workbook', run, inputs=list(sources.values()), outputs=[workbook])
+
+def build_pipeline(engine: AnalyticsEngine, formats: Optional[Sequence[str]] = None,
+                   state_dir: str = 'pipeline_runs', max_workers: int = 4, retries: int = 2,
+                   retry_backoff: float = 0.5) -> Pipeline:
+    """
+    Register every exported analytic of an engine as a pipeline task
+    
+    Tasks: one per EXPORT_TASKS method, writing its file in each format;
+    activity_sketches when the engine serves approximate engagement metrics
+    (engagement then reads the sketch state); dashboard_workbook when 'xlsx'
+    is among the formats. On worker threads each task uses engine.worker_engine(),
+    so unpooled MySQL connections are not shared between threads.
+    
+    Args:
+        engine: AnalyticsEngine (or a subclass) whose results are exported
+        formats: Export formats as for export_all_analytics (default: ['csv'])
+        state_dir: Directory of the run state and manifests
+        max_workers: Tasks run at the same time
+        retries: Extra attempts of a failing task
+        retry_backoff: Seconds before the first retry, doubled each retry
+    
+    Returns:
+        Pipeline: The scheduler, run() it
+    """
+    formats = list(formats or ['csv'])
+    unknown = [fmt for fmt in formats if fmt not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export formats: {', '.join(unknown)} (choose from {', '.join(EXPORTERS)})")
+    files = file_formats(formats)
+    pipeline = Pipeline(engine.db, state_dir, max_workers, retries, retry_backoff,
+                        engine.cache.fingerprint if engine.cache is not None else None)
+    
+    local = threading.local()
+    connections, connections_lock = [], threading.Lock()
+    
+    def worker() -> AnalyticsEngine:
+        if not hasattr(local, 'engine'):
+            local.engine = engine.worker_engine()
+            if local.engine is not engine:
+                with connections_lock:
+                    connections.append(local.engine.db)
+        return local.engine
+    
+    def share_scans():
+        # Analytics of one run reading the same base table share its scan
+        engine._scans = {}
+    
+    def close_connections():
+        engine._scans = None
+        with connections_lock:
+            for worker_db in connections:
+                worker_db.close()
+            connections.clear()
+    
+    pipeline.initializers.append(share_scans)
+    pipeline.finalizers.append(close_connections)
+    config = {'engine': type(engine).__name__, 'filters': describe_filters(engine.filters),
+              'rankings': engine.rankings, 'formats': files}
+    
+    sketch_state = None
+    if engine.sketches is not None:
+        sketch_state = os.path.join(engine.sketches.directory, 'state.json')
+        
+        def refresh_sketches() -> Dict:
+            if not engine.sketches.refresh(worker().db):
+                raise RuntimeError("activity sketches could not be refreshed")
+            return {'directory': engine.sketches.directory}
+        
+        pipeline.add(PipelineTask('activity_sketches', refresh_sketches,
+                                  inputs=['course', 'course_interactions', 'erp', 'user'],
+                                  outputs=[sketch_state]))
+    
+    sources = {}
+    for method_name, filename in EXPORT_TASKS:
+        name = os.path.splitext(filename)[0]
+        outputs = [os.path.join(engine.export_dir, f"{name}{EXPORTERS[fmt].extension}") for fmt in files]
+        inputs = analytic_inputs(method_name, engine.filters)
+        if method_name == 'get_engagement_metrics' and sketch_state:
+            inputs.append(sketch_state)
+        # Results relative to NOW() go stale with the clock, like their cache entries
+        max_age = DEFAULT_TTLS.get(task_name(method_name)) if 'end' not in engine.filters else None
+        
+        def run(method_name: str = method_name) -> Dict:
+            timing = worker().export_analytic(method_name, files)
+            if timing is None:
+                raise RuntimeError(f"{method_name} returned no result")
+            return timing
+        
+        pipeline.add(PipelineTask(task_name(method_name), run, inputs, outputs, config, max_age))
+        sources[name] = outputs[0]
+    
+    if 'xlsx' in formats:
+        pipeline.add(workbook_task(sources, engine.export_dir))
+    return pipeline
+
+def test_pipeline(scale_factor: float = 1, engine: str = 'duckdb', workers: int = 4):
+    """
+    Run the pipeline on synthetic data: a full run, an unchanged rerun, and a run after a table changed
+    
+    Args:
+        scale_factor: Synthetic data scale factor
+        engine: Embedded engine, 'duckdb' or 'sqlite'
+        workers: Tasks run at the same time
+    """
+    from embedded_backend import EmbeddedConnection
+    from instrumentation import profile_run
+    from synthetic_data import generate_tables, write_snapshot
+    
+    with tempfile.TemporaryDirectory(prefix='pipeline_') as work_dir:
+        snapshot_dir = os.path.join(work_dir, 'snapshot')
+        write_snapshot(generate_tables(scale_factor), snapshot_dir)
+        db = EmbeddedConnection(snapshot_dir, engine=engine)
+        if not db.connect():
+            print("[ERROR] Database connection failed")
+            return
+        
+        try:
+            analytics = AnalyticsEngine(db)
+            analytics.export_dir = os.path.join(work_dir, 'exports')
+            os.makedirs(analytics.export_dir)
+            pipeline = build_pipeline(analytics, ['csv', 'xlsx'], os.path.join(work_dir, 'state'), workers)
+            
+            first = pipeline.run()
+            second = pipeline.run()
+            db.execute_query("DELETE FROM subscriptions WHERE status = 'cancelled'")
+            if engine == 'sqlite':
+                db.connection.commit()
+            third = pipeline.run()
+            # An UPDATE keeps the row count and max id, only the contents change
+            db.execute_query("UPDATE subscriptions SET status = 'cancelled' WHERE status = 'active'")
+            if engine == 'sqlite':
+                db.connection.commit()
+            fourth = pipeline.run()
+            # Tasks run on worker threads, which the profile must include
+            profile_path = os.path.join(work_dir, 'pipeline.prof')
+            with profile_run(profile_path):
+                subset = pipeline.run(['churn_analysis'], force=True)
+            
+            for label, manifest, expected in (('first run', first, {'ran': len(pipeline.tasks)}),
+                                              ('unchanged rerun', second, {'skipped': len(pipeline.tasks)}),
+                                              ('subset', subset, {'ran': 1})):
+                counts = {status: count for status, count in manifest['counts'].items() if count}
+                print(f"[{'SUCCESS' if counts == expected else 'ERROR'}] {label}: {counts}")
+            for label, manifest in (('deleting', third), ('updating', fourth)):
+                reran = sorted(record['name'] for record in manifest['tasks'] if record['status'] == 'ran')
+                print(f"[{'SUCCESS' if 'churn_analysis' in reran else 'ERROR'}] After {label} subscriptions, "
+                      f"reran: {', '.join(reran)}")
+            churned = pd.read_csv(os.path.join(analytics.export_dir, 'churn_analysis.csv'))['churned'].sum()
+            cancelled = db.execute_query("SELECT COUNT(*) FROM subscriptions WHERE status = 'cancelled'")[0][0]
+            print(f"[{'SUCCESS' if churned == cancelled else 'ERROR'}] churn_analysis.csv counts {churned} "
+                  f"of {cancelled} cancelled subscriptions after the UPDATE")
+            profiled = {function for _, _, function in pstats.Stats(profile_path).stats}
+            print(f"[{'SUCCESS' if 'export_analytic' in profiled else 'ERROR'}] cProfile of the run "
+                  f"{'includes' if 'export_analytic' in profiled else 'misses'} the worker threads' export_analytic")
+        finally:
+            db.close()
+
+def main():
+    """Show the pipeline tasks or test the scheduler from the command line"""
+    parser = argparse.ArgumentParser(description="Analytics pipeline scheduler (run it through main.py --tasks)")
+    parser.add_argument('--list', action='store_true', help="List the tasks with their inputs and outputs")
+    parser.add_argument('--formats', nargs='+', default=['csv'], choices=list(EXPORTERS))
+    parser.add_argument('--scale-factor', type=float, default=1, help="Scale factor of the self-test data")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    
+    if args.list:
+        pipeline = build_pipeline(AnalyticsEngine(DatabaseConnection()), args.formats)
+        dependencies = pipeline.dependencies()
+        for name in pipeline.select():
+            task = pipeline.tasks[name]
+            after = f" after {', '.join(sorted(dependencies[name]))}" if dependencies[name] else ''
+            print(f"{name:<28} reads {', '.join(task.inputs)}{after}")
+        return
+    test_pipeline(args.scale_factor, args.engine, args.workers)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,320 @@
+"""
+Query Result Cache for Course Platform Analytics
+Caches analytics query results in memory and on disk, invalidated by TTL and table changes
+"""
+
+import pandas as pd
+from database_connection import DatabaseConnection
+from collections import OrderedDict
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine for the disk tier)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Primary key of each base table, used for row-count/max-id fingerprints
+TABLE_KEYS = {
+    'user': 'user_id',
+    'cat': 'cat_id',
+    'course': 'course_id',
+    'erp': 'erp_id',
+    'course_interactions': 'interaction_id',
+    'subscriptions': 'subscription_id'
+}
+
+# Queries whose result depends on the current time get a shorter default TTL
+DEFAULT_TTLS = {
+    'cohort_analysis': 900
+}
+
+class QueryCache:
+    """Two-tier (memory LRU + Parquet on disk) cache for query results"""
+    
+    def __init__(self, cache_dir: Optional[str] = 'query_cache', max_entries: int = 64,
+                 default_ttl: float = 3600, ttls: Optional[Dict[str, float]] = None,
+                 fingerprint: str = 'update_time', probe_interval: float = 5.0):
+        """
+        Initialize the cache
+        
+        Args:
+            cache_dir: Directory of the Parquet tier, None for memory only
+            max_entries: Number of results kept in the in-memory LRU tier
+            default_ttl: Seconds a result stays valid when no per-query TTL is set
+            ttls: Per-query TTLs in seconds, keyed by query name (merged over DEFAULT_TTLS)
+            fingerprint: 'update_time' to probe information_schema.tables on MySQL,
+                         'checksum' to checksum each table's contents, or 'count'
+                         to probe row count and max primary key per table (cheap,
+                         but misses in-place UPDATEs, for append-only tables only).
+                         Tables without an UPDATE_TIME, and every table on the
+                         embedded engines, are checksummed in 'update_time' mode
+            probe_interval: Seconds a table fingerprint is reused before re-probing
+        """
+        self.cache_dir = cache_dir if PARQUET_AVAILABLE else None
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.fingerprint = fingerprint
+        self.probe_interval = probe_interval
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._memory = OrderedDict()
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        
+        if cache_dir and not PARQUET_AVAILABLE:
+            logger.warning("pyarrow is not installed, query cache is memory only")
+        if self.cache_dir and not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Collapse whitespace so formatting changes do not change the cache key"""
+        return re.sub(r'\s+', ' ', query).strip()
+    
+    def key(self, query: str, params: Union[Sequence, Mapping, None] = None) -> str:
+        """
+        Build the cache key of a query
+        
+        Args:
+            query: SQL query string
+            params: Bound query parameters, positional or named
+        
+        Returns:
+            str: Hex digest of the normalized query text and parameters
+        """
+        if isinstance(params, Mapping):
+            params = sorted(params.items())
+        payload = json.dumps([self.normalize(query), list(params or [])], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def table_fingerprint(self, db: DatabaseConnection, tables: Sequence[str]) -> Dict[str, str]:
+        """
+        Probe change markers for the given tables
+        
+        Markers are reused for probe_interval seconds, so the queries of one
+        export run share a single metadata probe per table.
+        
+        Args:
+            db: Connected DatabaseConnection
+            tables: Base tables read by the query
+        
+        Returns:
+            dict: table name -> change marker
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = {table: self._fingerprints[table] for table in tables
+                      if table in self._fingerprints and now - self._fingerprints[table][0] < self.probe_interval}
+        fingerprint = {table: marker for table, (_, marker) in cached.items()}
+        missing = [table for table in tables if table not in fingerprint]
+        
+        if missing:
+            probed = self._probe(db, missing)
+            with self._lock:
+                for table, marker in probed.items():
+                    self._fingerprints[table] = (now, marker)
+            fingerprint.update(probed)
+        
+        return fingerprint
+    
+    def _probe(self, db: DatabaseConnection, tables: List[str]) -> Dict[str, str]:
+        """Run the metadata queries that produce table change markers"""
+        markers = {}
+        if self.fingerprint == 'update_time' and db.dialect == 'mysql':
+            markers.update(self._update_time_markers(db, tables))
+        
+        for table in tables:
+            if table in markers:
+                continue
+            if self.fingerprint == 'count':
+                key_column = TABLE_KEYS.get(table)
+                select = f"COUNT(*), MAX({key_column})" if key_column else "COUNT(*)"
+                rows = db.execute_query(f"SELECT {select} FROM {table}")
+                markers[table] = '|'.join(str(value) for value in rows[0]) if rows else ''
+            else:
+                markers[table] = db.table_checksum(table) or ''
+        
+        return markers
+    
+    @staticmethod
+    def _update_time_markers(db: DatabaseConnection, tables: List[str]) -> Dict[str, str]:
+        """
+        Read UPDATE_TIME of the given tables, which InnoDB moves on every committed write
+        
+        MySQL 8 serves information_schema.tables from statistics cached for up
+        to a day, so the probe turns the cache off for its session first.
+        UPDATE_TIME has one-second resolution: a table written during the
+        current second gets a marker that never matches again, so a second
+        write within that second is not missed. Tables whose UPDATE_TIME is
+        NULL (after a server restart) are left out.
+        """
+        table_list = ', '.join(f"'{table}'" for table in tables)
+        try:
+            with db.checkout() as connection:
+                cursor = connection.cursor()
+                try:
+                    try:
+                        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+                    except db.QUERY_ERRORS:
+                        pass  # MySQL 5.7 has no statistics cache to turn off
+                    cursor.execute(f"""
+                    SELECT table_name, update_time, table_rows, NOW()
+                    FROM information_schema.tables
+                    WHERE table_schema = DATABASE() AND table_name IN ({table_list})
+                    """)
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except db.QUERY_ERRORS as e:
+            logger.warning(f"Could not read table update times: {e}")
+            return {}
+        
+        markers = {}
+        for table_name, update_time, table_rows, now in rows:
+            if update_time is None:
+                continue
+            marker = f"{update_time}|{table_rows}"
+            if (now - update_time).total_seconds() < 1:
+                marker += f"|{time.time_ns()}"
+            markers[table_name] = marker
+        return markers
+    
+    def _paths(self, key: str) -> Tuple[str, str]:
+        """Return the Parquet data and JSON metadata paths of a cache key"""
+        return (os.path.join(self.cache_dir, f"{key}.parquet"),
+                os.path.join(self.cache_dir, f"{key}.json"))
+    
+    def _is_valid(self, meta: Dict, fingerprint: Dict[str, str]) -> bool:
+        """Check an entry's age against its TTL and its table markers against the current ones"""
+        return time.time() - meta['created'] < meta['ttl'] and meta['fingerprint'] == fingerprint
+    
+    def get(self, key: str, fingerprint: Dict[str, str]) -> Optional[pd.DataFrame]:
+        """
+        Look a result up in the memory tier, then the disk tier
+        
+        Args:
+            key: Cache key from key()
+            fingerprint: Current markers of the tables the query reads
+        
+        Returns:
+            pd.DataFrame: Cached result or None on a miss
+        """
+        stale = False
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                meta, df = entry
+                if self._is_valid(meta, fingerprint):
+                    self._memory.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return df.copy()
+                del self._memory[key]
+                stale = True
+        
+        if self.cache_dir:
+            data_path, meta_path = self._paths(key)
+            if os.path.exists(meta_path) and os.path.exists(data_path):
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                    if self._is_valid(meta, fingerprint):
+                        df = pd.read_parquet(data_path)
+                        self._remember(key, meta, df)
+                        with self._lock:
+                            self.stats['disk_hits'] += 1
+                        return df.copy()
+                    stale = True
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+        
+        # An entry found stale in both tiers is one invalidation
+        if stale:
+            with self._lock:
+                self.stats['invalidations'] += 1
+        return None
+    
+    def _remember(self, key: str, meta: Dict, df: pd.DataFrame):
+        """Store an entry in the memory tier, evicting the least recently used"""
+        with self._lock:
+            self._memory[key] = (meta, df)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def put(self, key: str, df: pd.DataFrame, fingerprint: Dict[str, str], ttl: float, name: str = ''):
+        """
+        Store a result in both tiers
+        
+        Args:
+            key: Cache key from key()
+            df: Query result
+            fingerprint: Table markers the result was computed against
+            ttl: Seconds the result stays valid
+            name: Query name, recorded for inspection of the disk tier
+        """
+        meta = {'name': name, 'created': time.time(), 'ttl': ttl, 'fingerprint': fingerprint}
+        self._remember(key, meta, df.copy())
+        
+        if self.cache_dir:
+            data_path, meta_path = self._paths(key)
+            try:
+                df.to_parquet(data_path, index=False)
+                with open(meta_path, 'w') as f:
+                    json.dump(meta, f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not write cache entry for {name}: {e}")
+    
+    def fetch(self, db: DatabaseConnection, name: str, query: str, tables: Sequence[str],
+              params: Union[Sequence, Mapping, None] = None,
+              loader: Optional[Callable[[], Optional[pd.DataFrame]]] = None) -> Optional[pd.DataFrame]:
+        """
+        Return a cached result, running the query only on a miss
+        
+        Args:
+            db: Connected DatabaseConnection used for probes and the query
+            name: Query name used for TTL lookup and logging
+            query: SQL query string
+            tables: Base tables the query reads
+            params: Bound query parameters
+            loader: Callable that runs the query, defaults to db.fetch_dataframe(query)
+        
+        Returns:
+            pd.DataFrame: Query result or None if the query failed
+        """
+        key = self.key(query, params)
+        fingerprint = self.table_fingerprint(db, tables)
+        
+        df = self.get(key, fingerprint)
+        if df is not None:
+            logger.info(f"Cache hit for {name}")
+            return df
+        
+        with self._lock:
+            self.stats['misses'] += 1
+        logger.info(f"Cache miss for {name}")
+        
+        df = loader() if loader else db.fetch_dataframe(query, params=params)
+        if df is not None:
+            self.put(key, df, fingerprint, self.ttls.get(name, self.default_ttl), name)
+        return df
+    
+    def clear(self):
+        """Drop every cached result from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._fingerprints.clear()
+        
+        if self.cache_dir:
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(('.parquet', '.json')):
+                    os.remove(os.path.join(self.cache_dir, filename))
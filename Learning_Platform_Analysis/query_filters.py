@@ -0,0 +1,137 @@
+"""
+Analytics Filters for Course Platform Analytics
+Time windows and subject/plan/country filters turned into bound-parameter SQL predicates
+"""
+
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+# Filter name -> what it restricts. 'start' and 'end' form a half-open time window.
+FILTER_KEYS = ('start', 'end', 'subject', 'plan_type', 'country')
+
+# Timestamp format of bound window parameters, understood by MySQL, DuckDB and SQLite
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Days before the window end that count as recently active in the cohort analysis
+RETENTION_DAYS = 30
+
+def validate_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Check and normalize analytics filters
+
+    Args:
+        filters: Filter name -> value. 'start' and 'end' accept anything
+                 pd.Timestamp does ('2024-01', '2024-06-30 12:00', datetimes);
+                 subject, plan_type and country are matched exactly. None values
+                 are dropped.
+
+    Returns:
+        dict: The filters with timestamps parsed, sorted by name
+    """
+    filters = {name: value for name, value in (filters or {}).items() if value is not None}
+    unknown = [name for name in filters if name not in FILTER_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)} (choose from {', '.join(FILTER_KEYS)})")
+    for name in ('start', 'end'):
+        if name in filters:
+            filters[name] = pd.Timestamp(filters[name])
+            if filters[name].tzinfo is not None:
+                filters[name] = filters[name].tz_localize(None)
+    if 'start' in filters and 'end' in filters and filters['start'] >= filters['end']:
+        raise ValueError(f"Window start {filters['start']} is not before its end {filters['end']}")
+    return {name: filters[name] for name in sorted(filters)}
+
+def last_months(months: int, now: Optional[pd.Timestamp] = None) -> Dict[str, pd.Timestamp]:
+    """
+    Window covering the current month and the months before it
+
+    Args:
+        months: Number of calendar months, including the current one
+        now: Current time (default: local time)
+
+    Returns:
+        dict: 'start' at the first day of the earliest month and 'end' at the start of next month
+    """
+    current = (now or pd.Timestamp.now()).to_period('M')
+    return {'start': (current - (months - 1)).to_timestamp(), 'end': (current + 1).to_timestamp()}
+
+def filter_predicates(filters: Dict[str, Any], window: Optional[str] = None, date_window: Optional[str] = None,
+                      subject: Optional[str] = None, plan_type: Optional[str] = None,
+                      country: Optional[str] = None, user_id: Optional[str] = None,
+                      course_id: Optional[str] = None) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Build the SQL predicates of the filters that apply to one query
+
+    Each argument names the column a filter is compared with in the query;
+    filters without a column do not apply and are left out. Windows are
+    half-open ranges on the bare column, so they can use an index or prune
+    partitions. Values are bound as named %(name)s parameters.
+
+    Args:
+        filters: Validated filters from validate_filters()
+        window: TIMESTAMP column the window applies to
+        date_window: DATE column the window applies to (compared by whole days,
+                     as MySQL compares a DATE with a timestamp)
+        subject: course.subject column
+        plan_type: subscriptions.plan_type column
+        country: user.country column
+        user_id: user id column, filtered by country through the user table
+                 when the query has no user.country column
+        course_id: course id column, filtered by subject through the course table
+                   when the query has no course.subject column
+
+    Returns:
+        tuple: (list of SQL predicates, dict of bound parameters they use)
+    """
+    predicates, params = [], {}
+    if window or date_window:
+        for name, operator in (('start', '>='), ('end', '<')):
+            if name not in filters:
+                continue
+            if window:
+                predicates.append(f"{window} {operator} %({name})s")
+                params[name] = filters[name].strftime(TIMESTAMP_FORMAT)
+            else:
+                # A date at midnight is >= or < a timestamp exactly when it is
+                # >= or < the timestamp rounded up to a whole day
+                predicates.append(f"{date_window} {operator} %({name}_date)s")
+                params[f'{name}_date'] = filters[name].ceil('D').strftime('%Y-%m-%d')
+
+    if 'subject' in filters and (subject or course_id):
+        predicates.append(f"{subject} = %(subject)s" if subject else
+                          f"{course_id} IN (SELECT course_id FROM course WHERE subject = %(subject)s)")
+        params['subject'] = filters['subject']
+    if 'plan_type' in filters and plan_type:
+        predicates.append(f"{plan_type} = %(plan_type)s")
+        params['plan_type'] = filters['plan_type']
+    if 'country' in filters and (country or user_id):
+        predicates.append(f"{country} = %(country)s" if country else
+                          f"{user_id} IN (SELECT user_id FROM user WHERE country = %(country)s)")
+        params['country'] = filters['country']
+    return predicates, params
+
+def where_clause(predicates: List[str], keyword: str = 'WHERE') -> str:
+    """Join predicates into a WHERE (or AND/ON continuation) clause, empty when there are none"""
+    return f"{keyword} {' AND '.join(predicates)}" if predicates else ''
+
+def retention_window(filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Predicate on u.last_login for users active in the RETENTION_DAYS before the window end
+
+    Without an end the window ends now, evaluated by the database's NOW().
+
+    Returns:
+        tuple: (SQL predicate, dict of bound parameters it uses)
+    """
+    if 'end' not in filters:
+        return f"u.last_login >= DATE_SUB(NOW(), INTERVAL {RETENTION_DAYS} DAY)", {}
+    end = filters['end']
+    return ("u.last_login >= %(active_since)s AND u.last_login < %(end)s",
+            {'active_since': (end - pd.Timedelta(days=RETENTION_DAYS)).strftime(TIMESTAMP_FORMAT),
+             'end': end.strftime(TIMESTAMP_FORMAT)})
+
+def describe_filters(filters: Dict[str, Any]) -> str:
+    """Short text of the filters for logs, 'all data' when there are none"""
+    if not filters:
+        return 'all data'
+    return ', '.join(f"{name}={value}" for name, value in filters.items())
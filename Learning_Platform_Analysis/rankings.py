@@ -0,0 +1,197 @@
+"""
+Course Rankings for Course Platform Analytics
+Global and per-group top-K course lists from one pass over the enrollment counts
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+# Ranking name -> K. 'global' ranks all courses, every other name is a course
+# column the courses are grouped by.
+DEFAULT_RANKINGS = {'global': 20, 'subject': 10, 'instructor_name': 10}
+
+# Course columns a ranking can group by
+RANKING_KEYS = ('subject', 'instructor_name', 'level')
+
+# Columns of a rankings result, one row per ranked course
+RANKING_COLUMNS = ['ranking', 'group_value', 'course_rank', 'course_title', 'instructor_name',
+                   'subject', 'total_enrollments', 'avg_rating', 'price']
+
+def validate_rankings(rankings: Dict[str, int]) -> Dict[str, int]:
+    """
+    Check ranking names and K values, since both end up in SQL text
+    
+    Args:
+        rankings: Ranking name -> K
+    
+    Returns:
+        dict: The rankings, sorted by name as they are ordered in results
+    """
+    unknown = [name for name in rankings if name != 'global' and name not in RANKING_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown ranking keys: {', '.join(unknown)} (choose from global, {', '.join(RANKING_KEYS)})")
+    for name, k in rankings.items():
+        if not isinstance(k, (int, np.integer)) or k < 1:
+            raise ValueError(f"K of ranking {name} must be a positive integer, got {k!r}")
+    return {name: int(rankings[name]) for name in sorted(rankings)}
+
+def ranking_query(rankings: Dict[str, int], course_predicates: Sequence[str] = (),
+                  enrollment_predicates: Sequence[str] = ()) -> str:
+    """
+    Build one query that ranks courses for every ranking
+    
+    Enrollments and ratings are aggregated per course once, in the
+    course_stats CTE, and each ranking keeps its top K with ROW_NUMBER()
+    over that small per-course result. Ties are broken by course_id.
+    
+    Args:
+        rankings: Ranking name -> K
+        course_predicates: Conditions on the courses ranked (alias c)
+        enrollment_predicates: Conditions on the enrollments counted (alias e),
+                               applied in the join so courses without any still rank
+    
+    Returns:
+        str: SQL query returning RANKING_COLUMNS, ordered by ranking, group and rank
+    """
+    enrollment_join = ''.join(f" AND {predicate}" for predicate in enrollment_predicates)
+    course_where = f"WHERE {' AND '.join(course_predicates)}" if course_predicates else ''
+    selects = []
+    for name, k in validate_rankings(rankings).items():
+        partition = '' if name == 'global' else f"PARTITION BY {name} "
+        group_value = 'NULL' if name == 'global' else name
+        selects.append(f"""
+            SELECT
+                '{name}' AS ranking,
+                {group_value} AS group_value,
+                ROW_NUMBER() OVER ({partition}ORDER BY total_enrollments DESC, course_id) AS course_rank,
+                course_title, instructor_name, subject, total_enrollments, avg_rating, price,
+                {k} AS k
+            FROM course_stats""")
+    
+    return f"""
+        WITH course_stats AS (
+            SELECT
+                c.course_id,
+                c.course_title,
+                c.instructor_name,
+                c.subject,
+                c.level,
+                c.price,
+                COUNT(e.erp_id) AS total_enrollments,
+                AVG(e.rating_given) AS avg_rating
+            FROM course c
+            LEFT JOIN erp e ON c.course_id = e.course_id{enrollment_join}
+            {course_where}
+            GROUP BY c.course_id, c.course_title, c.instructor_name, c.subject, c.level, c.price
+        )
+        SELECT {', '.join(RANKING_COLUMNS)}
+        FROM ({' UNION ALL'.join(selects)}
+        ) ranked
+        WHERE course_rank <= k
+        ORDER BY ranking, group_value, course_rank
+        """
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k largest values, largest first
+    
+    Uses a partial selection, O(n + k log k), instead of sorting every value.
+    Ties are broken by position among the selected values; pass unique values
+    (see ranking_key) for a deterministic selection.
+    """
+    values = np.asarray(values)
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    if k < len(values):
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+def top_k_per_group(codes: np.ndarray, values: np.ndarray, k: int) -> List[np.ndarray]:
+    """
+    Positions of the k largest values within each group
+    
+    Rows are bucketed by group code with a stable sort of the integer codes,
+    then each bucket is partially selected with top_k.
+    
+    Args:
+        codes: Group code per row, 0..groups-1
+        values: Ranking value per row
+        k: Positions kept per group
+    
+    Returns:
+        list: For each group code present, in code order, the positions of its top rows
+    """
+    codes = np.asarray(codes)
+    if not len(codes):
+        return []
+    order = np.argsort(codes, kind='stable')
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    return [bucket[top_k(values[bucket], k)] for bucket in np.split(order, boundaries)]
+
+def ranking_key(enrollments: np.ndarray, course_ids: np.ndarray) -> np.ndarray:
+    """
+    Unique ranking value per course: more enrollments first, then lower course_id
+    
+    Matches ORDER BY total_enrollments DESC, course_id so the partial selection
+    picks the same courses as the SQL at ties.
+    """
+    course_ids = np.asarray(course_ids, dtype=np.int64)
+    stride = course_ids.max() + 1 if len(course_ids) else 1
+    return np.asarray(enrollments, dtype=np.int64) * stride + (stride - 1 - course_ids)
+
+def rank_courses(courses: pd.DataFrame, enrollments: np.ndarray, avg_rating: np.ndarray,
+                 rankings: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    Rank courses in memory for every ranking
+    
+    The per-course enrollments and ratings are computed once by the caller;
+    each ranking then costs one pass over the courses plus O(n log K).
+    
+    Args:
+        courses: Course frame with course_id and the RANKING_COLUMNS course columns
+        enrollments: Enrollments per course row
+        avg_rating: Average rating per course row, NaN for unrated courses
+        rankings: Ranking name -> K (default: DEFAULT_RANKINGS)
+    
+    Returns:
+        pd.DataFrame: RANKING_COLUMNS, ordered like ranking_query()
+    """
+    rankings = validate_rankings(rankings or DEFAULT_RANKINGS)
+    keys = ranking_key(enrollments, courses['course_id'].to_numpy())
+    
+    names, group_values, ranks, positions = [], [], [], []
+    for name, k in rankings.items():
+        if name == 'global':
+            selections = [top_k(keys, k)]
+            labels = [None]
+        else:
+            # Group codes in sort order, with the NULL group first as MySQL sorts it
+            codes, uniques = pd.factorize(courses[name], sort=True)
+            selections = top_k_per_group(codes + 1, keys, k)
+            labels = [None if codes[top[0]] < 0 else uniques[codes[top[0]]] for top in selections]
+        if not selections:
+            continue
+        
+        sizes = [len(top) for top in selections]
+        names.append(np.repeat(name, sum(sizes)).astype(object))
+        group_values.append(np.repeat(np.array(labels, dtype=object), sizes))
+        ranks.append(np.concatenate([np.arange(1, size + 1) for size in sizes]))
+        positions.append(np.concatenate(selections))
+    
+    if not positions:
+        return pd.DataFrame(columns=RANKING_COLUMNS)
+    top = np.concatenate(positions).astype(np.int64)
+    return pd.DataFrame({
+        'ranking': np.concatenate(names),
+        'group_value': np.concatenate(group_values),
+        'course_rank': np.concatenate(ranks),
+        'course_title': courses['course_title'].to_numpy(dtype=object)[top],
+        'instructor_name': courses['instructor_name'].to_numpy(dtype=object)[top],
+        'subject': courses['subject'].to_numpy(dtype=object)[top],
+        'total_enrollments': np.asarray(enrollments)[top],
+        'avg_rating': np.asarray(avg_rating)[top],
+        'price': courses['price'].to_numpy()[top]
+    })
@@ -0,0 +1,446 @@
+"""
+Sharded Loader for Course Platform Analytics
+Loads a table snapshot and the udemy courses CSV with a process pool, one database connection per worker
+"""
+
+import io
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from database_connection import DatabaseConnection
+from embedded_backend import EmbeddedConnection, SNAPSHOT_TABLES
+from import_csv_data import (COURSE_COLUMN_MAP, COURSE_CSV_DTYPES, coerce_course_frame, insert_course_batches,
+                             write_rejected_rows)
+from multiprocessing import util
+from query_filters import TIMESTAMP_FORMAT
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tables loaded together, in foreign key order: course references cat, and
+# erp, subscriptions and course_interactions reference course and user
+LOAD_PHASES = [['cat'], ['course', 'user'], ['erp', 'subscriptions', 'course_interactions']]
+
+# Column whose hash picks the shard of a row. Child tables shard by user, so
+# all rows of one user are written by one worker.
+SHARD_KEYS = {
+    'cat': 'cat_id',
+    'course': 'course_id',
+    'user': 'user_id',
+    'erp': 'user_id',
+    'subscriptions': 'user_id',
+    'course_interactions': 'user_id'
+}
+
+SHARD_MODES = ('range', 'hash')
+
+# Report columns, one row per shard
+REPORT_COLUMNS = ['table', 'shard', 'source_bytes', 'rows', 'rejected', 'seconds', 'rows_per_sec', 'error']
+
+# Connection of this worker process, opened by _open_worker_connection
+_worker_db: Optional[DatabaseConnection] = None
+
+def record_boundaries(path: str, shards: int, block_size: int = 1 << 20) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file into byte ranges that start and end on record boundaries
+    
+    Quoted fields may contain newlines (udemy_courses.csv has a few course
+    titles that do), so a newline only ends a record when an even number of
+    quote characters precede it. Escaped quotes ("") do not change the parity.
+    
+    Args:
+        path: CSV file with a header line
+        shards: Number of ranges to aim for
+        block_size: Bytes read at a time while counting quotes
+    
+    Returns:
+        list: (start, end) byte offsets of the non-empty ranges, after the header
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        data_start = f.tell()
+        boundaries = [data_start]
+        quotes = 0
+        position = data_start
+        
+        for shard in range(1, shards):
+            target = data_start + (size - data_start) * shard // shards
+            while position < target:
+                block = f.read(min(block_size, target - position))
+                quotes += block.count(b'"')
+                position += len(block)
+            
+            # Finish the record that contains the target
+            while position < size:
+                line = f.readline()
+                quotes += line.count(b'"')
+                position += len(line)
+                if quotes % 2 == 0:
+                    break
+            boundaries.append(position)
+        boundaries.append(size)
+    
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def read_byte_range(path: str, start: int, end: int, **read_options) -> pd.DataFrame:
+    """
+    Parse one byte range of a CSV file as a DataFrame with the file's header
+    
+    Args:
+        path: CSV file
+        start: First byte of the range, from record_boundaries()
+        end: Byte after the range
+        **read_options: Passed to pd.read_csv
+    
+    Returns:
+        pd.DataFrame: Rows of the range
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), **read_options)
+
+def is_udemy_layout(path: str) -> bool:
+    """Return True if a course CSV has the udemy_courses.csv header rather than the course table's"""
+    if path.endswith('.parquet'):
+        return False
+    header = set(pd.read_csv(path, nrows=0).columns)
+    return set(COURSE_COLUMN_MAP) <= header and 'course_url' not in header
+
+def shard_rows(frame: pd.DataFrame, key: str, shard: int, shards: int) -> pd.DataFrame:
+    """
+    Keep the rows whose key hashes to a shard
+    
+    pd.util.hash_array is stable across processes and runs, unlike hash().
+    """
+    hashes = pd.util.hash_array(frame[key].to_numpy())
+    return frame[hashes % shards == shard]
+
+def plan_shards(sources: Dict[str, str], workers: int, mode: str = 'range',
+                shards: Optional[int] = None, primary_keys: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    Split each source file into shard tasks, grouped by load phase
+    
+    In range mode every CSV is split into byte ranges on record boundaries.
+    Parquet files cannot be split by bytes and are sharded by hash instead.
+    In hash mode every worker reads the whole file and keeps the rows whose
+    SHARD_KEYS column hashes to its shard.
+    
+    Args:
+        sources: table -> Parquet or CSV file
+        workers: Number of worker processes
+        mode: 'range' or 'hash'
+        shards: Shards per table (default: one per worker)
+        primary_keys: Whether the target rejects duplicate keys. Without them,
+                      udemy course files are sharded by hash in either mode, so
+                      all copies of a course id reach the shard that drops them
+    
+    Returns:
+        list: One list of shard tasks per phase of LOAD_PHASES
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {mode} (choose from {', '.join(SHARD_MODES)})")
+    shards = shards or workers
+    phases = []
+    
+    for tables in LOAD_PHASES:
+        tasks = []
+        for table in tables:
+            path = sources.get(table)
+            if path is None:
+                continue
+            task = {'table': table, 'path': path, 'udemy': table == 'course' and is_udemy_layout(path)}
+            by_range = mode == 'range' and not path.endswith('.parquet')
+            if by_range and task['udemy'] and not primary_keys:
+                logger.info(f"Sharding {path} by course_id hash, the target has no primary key to reject duplicates")
+                by_range = False
+            if by_range:
+                ranges = record_boundaries(path, shards)
+                tasks += [dict(task, shard=shard, byte_range=byte_range)
+                          for shard, byte_range in enumerate(ranges)]
+            else:
+                tasks += [dict(task, shard=shard, shards=shards) for shard in range(shards)]
+        phases.append(tasks)
+    return phases
+
+def connection_spec(db: DatabaseConnection) -> Tuple[str, Dict[str, Any]]:
+    """
+    Describe a connection so that each worker process can open its own
+    
+    Args:
+        db: MySQL DatabaseConnection, or an EmbeddedConnection to a SQLite file
+    
+    Returns:
+        tuple: (backend name, keyword arguments of its constructor)
+    """
+    if isinstance(db, EmbeddedConnection):
+        if db.engine != 'sqlite' or db.database == ':memory:':
+            raise ValueError("Sharded loads need MySQL or a SQLite database file; DuckDB allows one "
+                             "writing process and in-memory databases are private to a process")
+        return 'sqlite', {'engine': 'sqlite', 'database': db.database}
+    return 'mysql', {'host': db.host, 'user': db.user, 'password': db.password, 'database': db.database,
+                     'max_retries': db.max_retries, 'retry_backoff': db.retry_backoff}
+
+def _open_worker_connection(backend: str, params: Dict[str, Any]):
+    """Pool initializer: open the worker's connection, closed when the worker exits"""
+    global _worker_db
+    _worker_db = EmbeddedConnection(**params) if backend == 'sqlite' else DatabaseConnection(**params)
+    if not _worker_db.connect():
+        _worker_db = None
+        return
+    # Runs at worker shutdown, which skips atexit handlers
+    util.Finalize(None, _worker_db.close, exitpriority=10)
+
+def read_shard(task: Dict[str, Any]) -> pd.DataFrame:
+    """Read the rows of one shard task from its source file"""
+    path = task['path']
+    # Udemy columns are read as text, coerce_course_frame rejects the values it cannot convert
+    options = {'dtype': COURSE_CSV_DTYPES} if task['udemy'] else {}
+    
+    if 'byte_range' in task:
+        return read_byte_range(path, *task['byte_range'], **options)
+    frame = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, **options)
+    return shard_rows(frame, SHARD_KEYS[task['table']], task['shard'], task['shards'])
+
+def insert_rows(db: DatabaseConnection, table: str, frame: pd.DataFrame, batch_size: int = 10000) -> int:
+    """
+    Insert a frame into a table with one executemany and one commit per batch
+    
+    Args:
+        db: Connected DatabaseConnection
+        table: Table name
+        frame: Rows with the table's column names
+        batch_size: Rows per batch
+    
+    Returns:
+        int: Rows inserted
+    """
+    placeholder = '%s' if db.dialect == 'mysql' else '?'
+    insert = (f"INSERT INTO `{table}` ({', '.join(f'`{column}`' for column in frame.columns)}) "
+              f"VALUES ({', '.join([placeholder] * len(frame.columns))})")
+    insert = db.translate(insert)
+    if db.dialect != 'mysql':
+        # sqlite3 has no adapter for pandas timestamps; store ISO text as to_sql does
+        frame = frame.copy()
+        for column in frame.select_dtypes('datetime').columns:
+            frame[column] = frame[column].dt.strftime(TIMESTAMP_FORMAT)
+    values = frame.astype(object).where(frame.notna(), None)
+    
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        try:
+            for offset in range(0, len(values), batch_size):
+                batch = values.iloc[offset:offset + batch_size]
+                cursor.executemany(insert, list(batch.itertuples(index=False, name=None)))
+                connection.commit()
+        finally:
+            cursor.close()
+    return len(values)
+
+def load_shard(task: Dict[str, Any], batch_size: int = 10000) -> Dict[str, Any]:
+    """
+    Parse, coerce and insert one shard on the worker's connection
+    
+    Course rows in the udemy CSV layout go through the importer's coercion and
+    batch insert, so unconvertible and failing rows are rejected one by one.
+    Duplicate course ids are only seen together in hash mode; in range mode
+    MySQL rejects the later copy through the primary key. Embedded targets
+    have no primary key, so plan_shards() always shards their udemy course
+    files by hash and each shard keeps the first row of every course id.
+    
+    Args:
+        task: Shard task from plan_shards()
+        batch_size: Rows per INSERT batch and commit
+    
+    Returns:
+        dict: The shard's row in the report, plus its 'rejected_rows' frames. source_bytes
+        is the size of a byte range shard and None for hash shards, which read the whole file
+    """
+    started = time.perf_counter()
+    errors = (OSError, ValueError) + (_worker_db.QUERY_ERRORS if _worker_db is not None else (ConnectionError,))
+    start, end = task.get('byte_range', (None, None))
+    result = {'table': task['table'], 'shard': task['shard'],
+              'source_bytes': end - start if start is not None else None,
+              'rows': 0, 'rejected': 0, 'error': None, 'rejected_rows': []}
+    
+    try:
+        if _worker_db is None:
+            raise ConnectionError("worker has no database connection")
+        frame = read_shard(task)
+        
+        if task['udemy']:
+            frame, rejected = coerce_course_frame(frame)
+            # Coerce and insert rejects have different columns, write_rejected_rows aligns each
+            result['rejected_rows'].append(rejected)
+            if _worker_db.dialect == 'mysql':
+                result['rows'], failed = insert_course_batches(_worker_db, frame, batch_size)
+                result['rejected_rows'].append(failed)
+            else:
+                # The embedded schema has no primary key to reject duplicate course ids
+                result['rows'] = insert_rows(_worker_db, 'course', frame.drop_duplicates('course_id'), batch_size)
+            result['rejected'] = sum(len(rejects) for rejects in result['rejected_rows'])
+        else:
+            result['rows'] = insert_rows(_worker_db, task['table'], frame, batch_size)
+    except errors as e:
+        logger.error(f"Shard {task['shard']} of {task['table']} failed: {e}")
+        result['error'] = str(e)
+    
+    result['seconds'] = time.perf_counter() - started
+    result['rows_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0.0
+    return result
+
+def prepare_tables(db: DatabaseConnection, tables: List[str], replace: bool = False):
+    """
+    Make the target tables ready for a sharded load
+    
+    Embedded tables are (re)created from the snapshot schema. On MySQL the
+    tables must exist; with replace their rows are deleted children first.
+    
+    Args:
+        db: Connected target database
+        tables: Tables about to be loaded
+        replace: Delete the existing rows of the tables first
+    """
+    if isinstance(db, EmbeddedConnection):
+        for table in tables:
+            db._create_table(table)
+        db.connection.commit()
+        return
+    
+    if replace:
+        for table in reversed(SNAPSHOT_TABLES):
+            if table in tables:
+                db.execute_query(f"DELETE FROM `{table}`")
+
+def sharded_load(db: DatabaseConnection, sources: Dict[str, str], workers: int = 4, mode: str = 'range',
+                 shards: Optional[int] = None, batch_size: int = 10000, replace: bool = False,
+                 rejects_path: str = 'rejected_courses.csv') -> Optional[pd.DataFrame]:
+    """
+    Load tables in parallel, one phase of LOAD_PHASES at a time
+    
+    All shards of a phase run concurrently on the process pool, each worker
+    parsing, coercing and inserting on its own connection, so CPU-bound
+    parsing overlaps with other workers' inserts. A phase starts only after
+    every shard of the previous phase is committed; if any of them failed the
+    tables referencing it are not loaded.
+    
+    Args:
+        db: Connected target database, see connection_spec()
+        sources: table -> Parquet or CSV file (course may be in the udemy CSV layout)
+        workers: Number of worker processes, each with one connection
+        mode: 'range' to split CSVs by byte range, 'hash' to split rows by SHARD_KEYS hash
+        shards: Shards per table (default: one per worker)
+        batch_size: Rows per INSERT batch and commit
+        replace: Delete the existing rows of the loaded tables first
+        rejects_path: CSV file that receives course rows which could not be imported
+    
+    Returns:
+        pd.DataFrame: One row per shard with its throughput, None if the load did not start
+    """
+    try:
+        backend, params = connection_spec(db)
+        phases = plan_shards(sources, workers, mode, shards, primary_keys=not isinstance(db, EmbeddedConnection))
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot plan the sharded load: {e}")
+        return None
+    
+    prepare_tables(db, [table for table in SNAPSHOT_TABLES if table in sources], replace)
+    started = time.perf_counter()
+    results = []
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_connection,
+                             initargs=(backend, params)) as pool:
+        for phase, tasks in zip(LOAD_PHASES, phases):
+            if not tasks:
+                continue
+            phase_started = time.perf_counter()
+            phase_results = list(pool.map(load_shard, tasks, [batch_size] * len(tasks)))
+            results += phase_results
+            
+            for result in phase_results:
+                for rejected in result.pop('rejected_rows'):
+                    write_rejected_rows(rejected, rejects_path)
+            rows = sum(result['rows'] for result in phase_results)
+            logger.info(f"Loaded {rows} rows into {', '.join(phase)} with {len(tasks)} shards "
+                        f"in {time.perf_counter() - phase_started:.2f}s")
+            
+            failed = sorted({result['table'] for result in phase_results if result['error']})
+            if failed:
+                logger.error(f"Shards of {', '.join(failed)} failed, not loading the tables that reference them")
+                break
+    
+    elapsed = time.perf_counter() - started
+    report = pd.DataFrame(results, columns=REPORT_COLUMNS)
+    report['source_bytes'] = report['source_bytes'].astype('Int64')
+    total = report['rows'].sum()
+    logger.info(f"Sharded load of {total} rows finished in {elapsed:.2f}s ({total / elapsed:.0f} rows/sec)")
+    return report
+
+def snapshot_sources(snapshot_dir: str, course_csv: Optional[str] = None) -> Dict[str, str]:
+    """
+    Find the source file of each table in a snapshot directory
+    
+    Args:
+        snapshot_dir: Directory of <table>.parquet / <table>.csv files
+        course_csv: udemy courses CSV loaded into course instead of the snapshot's file
+    
+    Returns:
+        dict: table -> source file, for the tables that have one
+    """
+    sources = {}
+    for table in SNAPSHOT_TABLES:
+        path = EmbeddedConnection.snapshot_file(snapshot_dir, table) if snapshot_dir else None
+        if path:
+            sources[table] = path
+    if course_csv:
+        sources['course'] = course_csv
+    return sources
+
+def main():
+    """Load a snapshot into the database from the command line"""
+    parser = argparse.ArgumentParser(description="Load table snapshots with a pool of worker processes")
+    parser.add_argument('snapshot_dir', nargs='?', help="Directory of <table>.parquet / <table>.csv files")
+    parser.add_argument('--course-csv', help="udemy_courses.csv (or the synthetic one) to load into course")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Worker processes, each with its own connection (default: one per core)")
+    parser.add_argument('--shard-by', choices=SHARD_MODES, default='range',
+                        help="Split CSVs by byte range, or rows by course_id/user_id hash")
+    parser.add_argument('--shards', type=int, help="Shards per table (default: one per worker)")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Rows per INSERT batch and commit")
+    parser.add_argument('--replace', action='store_true', help="Delete the existing rows of the loaded tables")
+    parser.add_argument('--sqlite', metavar='PATH', help="Load into a SQLite database file instead of MySQL")
+    args = parser.parse_args()
+    
+    sources = snapshot_sources(args.snapshot_dir, args.course_csv)
+    if not sources:
+        parser.error("nothing to load: give a snapshot directory and/or --course-csv")
+    
+    db = EmbeddedConnection(engine='sqlite', database=args.sqlite) if args.sqlite else DatabaseConnection()
+    if not db.connect():
+        print("[ERROR] Database connection failed")
+        return
+    
+    try:
+        report = sharded_load(db, sources, args.workers, args.shard_by, args.shards,
+                              args.batch_size, args.replace)
+    finally:
+        db.close()
+    if report is None:
+        print("[ERROR] Sharded load failed")
+        return
+    
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+    failed = report[report['error'].notna()]
+    if len(failed):
+        print(f"[ERROR] {len(failed)} shards failed")
+    else:
+        print(f"[SUCCESS] Loaded {report['rows'].sum()} rows in {len(report)} shards")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
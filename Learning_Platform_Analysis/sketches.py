@@ -0,0 +1,587 @@
+"""
+Approximate Analytics Sketches for Course Platform Analytics
+Mergeable distinct-count and quantile sketches of daily activity, persisted per
+day and month and merged to answer engagement metrics for any date range
+"""
+
+import numpy as np
+import pandas as pd
+from database_connection import DatabaseConnection
+from query_filters import filter_predicates, validate_filters, where_clause
+from typing import Dict, Iterable, List, Optional, Sequence
+import argparse
+import copy
+import json
+import logging
+import os
+import pickle
+import time
+
+logger = logging.getLogger(__name__)
+
+# HyperLogLog registers are 2**HLL_PRECISION bytes. The relative standard error
+# of a distinct count is 1.04 / sqrt(2**precision): 1.6% at 12, 0.8% at 14.
+# Counts below 2.5 * 2**precision use linear counting and are nearly exact.
+HLL_PRECISION = 12
+
+# KLL accuracy parameter. The rank of a returned quantile is within about
+# 1.7% of the requested one at k=200 (99% confidence), independent of the
+# number of values; the error shrinks in proportion to 1/k.
+KLL_K = 200
+
+# Quantiles reported by SketchStore.activity_quantiles
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Activity rows sketched per day, with their timestamp as activity_time and the
+# user's subscription type as the segment. Only activity of existing users
+# counts, as in get_engagement_metrics.
+ENROLLMENT_ACTIVITY = """
+SELECT
+    e.erp_date AS activity_time,
+    u.subscription_type,
+    e.user_id,
+    e.course_id,
+    e.progress_per,
+    c.content_duration
+FROM erp e
+JOIN user u ON u.user_id = e.user_id
+LEFT JOIN course c ON c.course_id = e.course_id
+"""
+
+INTERACTION_ACTIVITY = """
+SELECT
+    ci.interaction_data AS activity_time,
+    u.subscription_type,
+    ci.user_id,
+    ci.interaction_id
+FROM course_interactions ci
+JOIN user u ON u.user_id = ci.user_id
+"""
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of each uint64 value, 0 for 0 (exact: each float64 conversion holds 32 bits)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+def _sigma(x: float) -> float:
+    """Correction for empty registers in the improved HyperLogLog estimator"""
+    if x == 1:
+        return np.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+def _tau(x: float) -> float:
+    """Correction for saturated registers in the improved HyperLogLog estimator"""
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+def hash_ids(values: Iterable[int]) -> np.ndarray:
+    """64-bit hashes of integer ids, independent of their integer dtype"""
+    return pd.util.hash_array(np.asarray(values, dtype=np.int64))
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over integer ids
+    
+    Each id is hashed to 64 bits; the first precision bits pick a register
+    and the register keeps the longest run of leading zeros seen in the
+    rest. Sketches of the same precision merge by taking register maxima,
+    so the union of any set of days is counted from their sketches alone.
+    """
+    
+    def __init__(self, precision: int = HLL_PRECISION):
+        """
+        Initialize an empty sketch
+        
+        Args:
+            precision: Register index bits, 4 to 18
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def add(self, values: Iterable[int]):
+        """Add integer ids; adding an id again has no effect"""
+        self.add_hashes(hash_ids(values))
+    
+    def add_hashes(self, hashes: np.ndarray):
+        """Add ids already hashed by hash_ids(), e.g. once for a whole chunk"""
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rank = rest_bits + 1 - _bit_length(hashes & np.uint64((1 << rest_bits) - 1)).astype(np.int64)
+        
+        # Sorted unique (register, rank) pairs; the last pair of each register has its largest rank
+        pairs = np.unique(index * 64 + rank)
+        index, rank = pairs // 64, (pairs % 64).astype(np.uint8)
+        last = np.append(index[1:] != index[:-1], True)
+        index, rank = index[last], rank[last]
+        self.registers[index] = np.maximum(self.registers[index], rank)
+    
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog precisions {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+    
+    def count(self) -> int:
+        """
+        Estimated number of distinct ids added
+        
+        Uses Ertl's improved estimator ("New cardinality estimation algorithms
+        for HyperLogLog sketches", 2017), which needs no empirical bias
+        correction and stays unbiased from empty to full registers.
+        """
+        m = len(self.registers)
+        rest_bits = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=rest_bits + 2).astype(np.float64)
+        if histogram[0] == m:
+            return 0
+        z = m * _tau(1 - histogram[rest_bits + 1] / m)
+        for rank in range(rest_bits, 0, -1):
+            z = 0.5 * (z + histogram[rank])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * np.log(2)) / z))
+    
+    def __getstate__(self):
+        # Daily sketches mostly have empty registers, so only the set ones are stored
+        index = np.flatnonzero(self.registers)
+        if len(index) * 5 < len(self.registers):
+            return {'precision': self.precision, 'index': index.astype(np.uint32), 'values': self.registers[index]}
+        return {'precision': self.precision, 'registers': self.registers}
+    
+    def __setstate__(self, state):
+        self.precision = state['precision']
+        if 'registers' in state:
+            self.registers = state['registers']
+        else:
+            self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+            self.registers[state['index']] = state['values']
+
+# Random offsets of KLL compactions, shared so sketches stay small to store
+_compaction_offsets = np.random.default_rng()
+
+class KLLSketch:
+    """
+    KLL quantile sketch
+    
+    Values go into a stack of compactors; level h holds values that each
+    stand for 2**h inputs. A full level is sorted and every other value,
+    from a random offset, is promoted to the next level. Capacities shrink
+    geometrically down the stack, so the sketch holds O(k) values however
+    many were added. Sketches merge level by level.
+    """
+    
+    def __init__(self, k: int = KLL_K):
+        """
+        Initialize an empty sketch
+        
+        Args:
+            k: Capacity of the top level; larger k is more accurate
+        """
+        if k < 8:
+            raise ValueError(f"KLL k must be at least 8, got {k}")
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+    
+    def _capacity(self, level: int) -> int:
+        """Capacity of a level, k for the top and 2/3 of the one above for each below"""
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+    
+    def _compress(self):
+        """Compact full levels until every level is within its capacity"""
+        while True:
+            full = [level for level, values in enumerate(self.levels) if len(values) > self._capacity(level)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            values = np.sort(self.levels[level])
+            paired = len(values) - len(values) % 2
+            promoted = values[_compaction_offsets.integers(2):paired:2]
+            self.levels[level] = values[paired:]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+    
+    def add(self, values: Iterable[float]):
+        """Add values; NaN (SQL NULL) values are ignored"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+    
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Fold another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+    
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles
+        
+        Args:
+            qs: Quantiles between 0 and 1
+        
+        Returns:
+            np.ndarray: The smallest retained value whose estimated rank reaches
+                        each quantile (exact min and max at 0 and 1), NaN when empty
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        positions = np.minimum(np.searchsorted(cumulative, qs * cumulative[-1], side='left'), len(values) - 1)
+        result = values[positions]
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+class ActivitySketch:
+    """Sketches of one segment's activity over one day, month or merged range"""
+    
+    def __init__(self, precision: int = HLL_PRECISION, k: int = KLL_K):
+        self.users = HyperLogLog(precision)          # users with an enrollment or interaction
+        self.courses = HyperLogLog(precision)        # enrolled courses
+        self.interactions = HyperLogLog(precision)   # interaction ids
+        self.progress = KLLSketch(k)                 # progress_per of enrollments
+        self.content_duration = KLLSketch(k)         # content_duration of enrolled courses
+        # Exact, as sums merge without error
+        self.enrollments = 0
+        self.progress_sum = 0.0
+        self.progress_count = 0
+    
+    def add_enrollments(self, columns: Dict[str, np.ndarray]):
+        """Add erp rows: ENROLLMENT_ACTIVITY columns, ids hashed by hash_ids() and numbers as float64"""
+        progress = columns['progress_per']
+        self.users.add_hashes(columns['user_id'])
+        self.courses.add_hashes(columns['course_id'])
+        self.progress.add(progress)
+        self.content_duration.add(columns['content_duration'])
+        self.enrollments += len(progress)
+        self.progress_sum += float(np.nansum(progress))
+        self.progress_count += int(np.count_nonzero(~np.isnan(progress)))
+    
+    def add_interactions(self, columns: Dict[str, np.ndarray]):
+        """Add course_interactions rows: INTERACTION_ACTIVITY columns, ids hashed by hash_ids()"""
+        self.users.add_hashes(columns['user_id'])
+        self.interactions.add_hashes(columns['interaction_id'])
+    
+    def merge(self, other: 'ActivitySketch') -> 'ActivitySketch':
+        """Fold another segment sketch into this one"""
+        for name in ('users', 'courses', 'interactions', 'progress', 'content_duration'):
+            getattr(self, name).merge(getattr(other, name))
+        self.enrollments += other.enrollments
+        self.progress_sum += other.progress_sum
+        self.progress_count += other.progress_count
+        return self
+
+def merge_segments(target: Dict[str, ActivitySketch], source: Dict[str, ActivitySketch]):
+    """Fold per-segment sketches into target, segment by segment"""
+    for segment, sketch in source.items():
+        if segment in target:
+            target[segment].merge(sketch)
+        else:
+            target[segment] = copy.deepcopy(sketch)
+
+class SketchStore:
+    """
+    Per-day and per-month activity sketches on disk
+    
+    Each day file maps subscription type ('' for NULL) to the ActivitySketch
+    of that day's enrollments and interactions, and each month file is the
+    merge of its days. A date range is answered by merging the month files
+    it covers completely and the day files at its edges, so the cost depends
+    on the number of periods, not on the rows behind them. Windows are
+    widened to whole days. Users are segmented by their subscription type
+    when the day was sketched.
+    """
+    
+    def __init__(self, directory: str, precision: int = HLL_PRECISION, k: int = KLL_K,
+                 chunksize: int = 200000):
+        """
+        Initialize the store
+        
+        Args:
+            directory: Directory of the sketch files, created when missing
+            precision: HyperLogLog precision of new sketches
+            k: KLL accuracy parameter of new sketches
+            chunksize: Activity rows read per chunk while sketching
+        """
+        self.directory = directory
+        self.precision = precision
+        self.k = k
+        self.chunksize = chunksize
+        for kind in ('day', 'month'):
+            os.makedirs(os.path.join(directory, kind), exist_ok=True)
+        state = self._read_state()
+        if state and (state['precision'], state['k']) != (precision, k):
+            raise ValueError(f"{directory} holds sketches with precision {state['precision']} and k {state['k']}")
+    
+    def _path(self, kind: str, period: str) -> str:
+        return os.path.join(self.directory, kind, f"{period}.pkl")
+    
+    def _read_state(self) -> Optional[Dict]:
+        path = os.path.join(self.directory, 'state.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write(self, path: str, sketches: Dict[str, ActivitySketch]):
+        """Write a sketch file atomically, so readers never see a partial one"""
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(sketches, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+    
+    def _load(self, kind: str, period: str) -> Dict[str, ActivitySketch]:
+        path = self._path(kind, period)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
+    def periods(self, kind: str) -> List[str]:
+        """Sorted periods stored for 'day' or 'month'"""
+        return sorted(name[:-4] for name in os.listdir(os.path.join(self.directory, kind)) if name.endswith('.pkl'))
+    
+    def _sketch_days(self, db: DatabaseConnection, since: Optional[pd.Timestamp]) -> Dict[str, Dict[str, ActivitySketch]]:
+        """Sketch every day of activity from since (default: all activity)"""
+        days: Dict[str, Dict[str, ActivitySketch]] = {}
+        window = {'start': since} if since is not None else {}
+        
+        sources = (
+            (ENROLLMENT_ACTIVITY, 'e.erp_date', ActivitySketch.add_enrollments,
+             ('user_id', 'course_id'), ('progress_per', 'content_duration')),
+            (INTERACTION_ACTIVITY, 'ci.interaction_data', ActivitySketch.add_interactions,
+             ('user_id', 'interaction_id'), ())
+        )
+        for query, time_column, add, id_columns, value_columns in sources:
+            predicates, params = filter_predicates(window, window=time_column)
+            for chunk in db.fetch_iter(f"{query} {where_clause(predicates)}", self.chunksize,
+                                       label='activity_sketches', params=params):
+                chunk = chunk[chunk['activity_time'].notna()]
+                if chunk.empty:
+                    continue
+                day = pd.to_datetime(chunk['activity_time']).dt.strftime('%Y-%m-%d')
+                segment = chunk['subscription_type'].astype(object).where(chunk['subscription_type'].notna(), '')
+                groups, keys = pd.MultiIndex.from_arrays([day, segment]).factorize()
+                
+                # Rows sorted by (day, segment) group, so each group is one slice
+                order = np.argsort(groups, kind='stable')
+                columns = {name: hash_ids(chunk[name].to_numpy()[order]) for name in id_columns}
+                columns.update({name: chunk[name].to_numpy(dtype='float64', na_value=np.nan)[order]
+                                for name in value_columns})
+                bounds = np.searchsorted(groups[order], np.arange(len(keys) + 1))
+                for group, (period, name) in enumerate(keys):
+                    sketches = days.setdefault(period, {})
+                    if name not in sketches:
+                        sketches[name] = ActivitySketch(self.precision, self.k)
+                    add(sketches[name], {column: values[bounds[group]:bounds[group + 1]]
+                                         for column, values in columns.items()})
+        return days
+    
+    def _write_days(self, days: Dict[str, Dict[str, ActivitySketch]], since: Optional[pd.Timestamp]):
+        """Replace the stored days from since with freshly sketched ones and roll up their months"""
+        first = since.strftime('%Y-%m-%d') if since is not None else ''
+        for period in self.periods('day'):
+            if period >= first and period not in days:
+                os.remove(self._path('day', period))
+        for period, sketches in days.items():
+            self._write(self._path('day', period), sketches)
+        
+        stored = self.periods('day')
+        months = {period[:7] for period in stored if period >= first}
+        for month in self.periods('month'):
+            if month >= first[:7] and month not in months:
+                os.remove(self._path('month', month))
+        for month in sorted(months):
+            merged: Dict[str, ActivitySketch] = {}
+            for period in stored:
+                if period.startswith(month):
+                    merge_segments(merged, self._load('day', period))
+            self._write(self._path('month', month), merged)
+    
+    def refresh(self, db: DatabaseConnection, rebuild: bool = False) -> bool:
+        """
+        Sketch the activity since the last refresh
+        
+        Days are re-sketched from the start of the day of the last refresh,
+        so the partial day it saw is completed. Rows inserted later with an
+        older timestamp need a rebuild.
+        
+        Args:
+            db: Connected DatabaseConnection
+            rebuild: Re-sketch all activity instead
+        
+        Returns:
+            bool: True if the sketches are current
+        """
+        started = time.perf_counter()
+        try:
+            now = db.fetch_dataframe("SELECT NOW() AS now", label='now')
+            if now is None:
+                return False
+            now = pd.Timestamp(now['now'].iloc[0])
+            now = now.tz_localize(None) if now.tzinfo is not None else now
+            
+            state = None if rebuild else self._read_state()
+            since = pd.Timestamp(state['built_through']) if state else None
+            days = self._sketch_days(db, since)
+            self._write_days(days, since)
+            state_path = os.path.join(self.directory, 'state.json')
+            with open(state_path + '.tmp', 'w') as f:
+                json.dump({'built_through': now.floor('D').isoformat(), 'precision': self.precision, 'k': self.k}, f)
+            os.replace(state_path + '.tmp', state_path)
+        except (ConnectionError, OSError, ValueError) as e:
+            logger.error(f"Error refreshing activity sketches: {e}")
+            return False
+        logger.info(f"Sketched {len(days)} days of activity in {time.perf_counter() - started:.2f}s")
+        return True
+    
+    @staticmethod
+    def supports(filters: Dict) -> bool:
+        """Whether the sketches can answer filters: only time windows are sketched"""
+        return set(filters) <= {'start', 'end'}
+    
+    def merged(self, filters: Optional[Dict] = None) -> Optional[Dict[str, ActivitySketch]]:
+        """
+        Merge the stored sketches of a date range
+        
+        Args:
+            filters: Optional 'start'/'end' window, widened to whole days
+        
+        Returns:
+            dict: subscription type -> merged ActivitySketch, None if the filters
+                  are not supported
+        """
+        filters = validate_filters(filters)
+        if not self.supports(filters):
+            logger.error(f"Activity sketches only support time windows, got {', '.join(filters)}")
+            return None
+        first = filters['start'].strftime('%Y-%m-%d') if 'start' in filters else ''
+        # Last day overlapping the half-open window
+        last = (filters['end'] - pd.Timedelta(1, 'ns')).strftime('%Y-%m-%d') if 'end' in filters else '9999-12-31'
+        
+        merged: Dict[str, ActivitySketch] = {}
+        complete_months = set(self.periods('month'))
+        days = [period for period in self.periods('day') if first <= period <= last]
+        for month in sorted({period[:7] for period in days}):
+            month_start = pd.Period(month, 'M').start_time.strftime('%Y-%m-%d')
+            month_end = pd.Period(month, 'M').end_time.strftime('%Y-%m-%d')
+            if month in complete_months and first <= month_start and month_end <= last:
+                merge_segments(merged, self._load('month', month))
+            else:
+                for period in days:
+                    if period.startswith(month):
+                        merge_segments(merged, self._load('day', period))
+        return merged
+    
+    def engagement_metrics(self, filters: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+        """
+        Approximate get_engagement_metrics for a date range
+        
+        Distinct enrolled courses and interactions come from HyperLogLog
+        sketches; the average progress is exact. Subscription types without
+        activity in the range are left out.
+        """
+        merged = self.merged(filters)
+        if merged is None:
+            return None
+        rows = [{
+            'subscription_type': segment or None,
+            'avg_courses_enrolled': sketch.courses.count(),
+            'avg_completion_rate': (round(sketch.progress_sum / sketch.progress_count, 4)
+                                    if sketch.progress_count else None),
+            'total_interactions': sketch.interactions.count()
+        } for segment, sketch in sorted(merged.items())]
+        return pd.DataFrame(rows, columns=['subscription_type', 'avg_courses_enrolled',
+                                           'avg_completion_rate', 'total_interactions'])
+    
+    def activity_quantiles(self, filters: Optional[Dict] = None,
+                           quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Optional[pd.DataFrame]:
+        """
+        Active users and progress/content duration quantiles per subscription type
+        
+        Args:
+            filters: Optional 'start'/'end' window
+            quantiles: Quantiles between 0 and 1
+        
+        Returns:
+            pd.DataFrame: subscription_type, active_users, enrollments and a
+                          progress_pNN and content_duration_pNN column per quantile
+        """
+        merged = self.merged(filters)
+        if merged is None:
+            return None
+        rows = []
+        for segment, sketch in sorted(merged.items()):
+            row = {'subscription_type': segment or None, 'active_users': sketch.users.count(),
+                   'enrollments': sketch.enrollments}
+            for name in ('progress', 'content_duration'):
+                for q, value in zip(quantiles, getattr(sketch, name).quantiles(quantiles)):
+                    row[f"{name}_p{q * 100:g}"] = value
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+def main():
+    """Refresh the activity sketches and report a date range from the command line"""
+    parser = argparse.ArgumentParser(description="Maintain per-day activity sketches for approximate analytics")
+    parser.add_argument('--directory', default='activity_sketches', help="Sketch directory")
+    parser.add_argument('--rebuild', action='store_true', help="Re-sketch all activity (after backfills or deletes)")
+    parser.add_argument('--since', metavar='DATE', help="Report window start")
+    parser.add_argument('--until', metavar='DATE', help="Report window end (exclusive)")
+    args = parser.parse_args()
+    
+    db = DatabaseConnection()
+    if not db.connect():
+        print("[ERROR] Database connection failed")
+        return
+    
+    try:
+        store = SketchStore(args.directory)
+        if not store.refresh(db, rebuild=args.rebuild):
+            print("[ERROR] Sketch refresh failed")
+            return
+        window = {'start': args.since, 'end': args.until}
+        print(store.engagement_metrics(window).to_string(index=False))
+        print(store.activity_quantiles(window).to_string(index=False))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
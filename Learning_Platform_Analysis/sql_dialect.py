@@ -0,0 +1,141 @@
+"""
+SQL Dialect Translation for Course Platform Analytics
+Rewrites the MySQL used by the analytics queries for DuckDB and SQLite
+"""
+
+from typing import Callable, List
+import re
+
+DIALECTS = ('mysql', 'duckdb', 'sqlite')
+
+# MySQL DATE_FORMAT specifiers that differ from strftime
+DATE_FORMAT_SPECIFIERS = {
+    '%i': '%M',  # minutes
+    '%s': '%S',  # seconds
+    '%h': '%I',  # 12-hour clock
+    '%M': '%B'   # month name
+}
+
+# Named parameter style of each dialect's driver, for MySQL's %(name)s
+PARAMETER_STYLES = {'duckdb': '$', 'sqlite': ':'}
+
+# SQLite datetime() modifiers use plural unit names
+SQLITE_UNITS = {'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+                'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years'}
+
+def _split_args(text: str) -> List[str]:
+    """Split a function argument list on top-level commas"""
+    args, depth, quote, current = [], 0, None, ''
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(current.strip())
+            current = ''
+            continue
+        current += char
+    args.append(current.strip())
+    return args
+
+def _replace_calls(query: str, name: str, render: Callable[[List[str]], str]) -> str:
+    """
+    Replace every call of a SQL function, innermost arguments first
+    
+    Args:
+        query: SQL text
+        name: Function name, matched case-insensitively
+        render: Builds the replacement from the (already translated) arguments
+    
+    Returns:
+        str: SQL text with the calls replaced
+    """
+    pattern = re.compile(rf'\b{name}\s*\(', re.IGNORECASE)
+    match = pattern.search(query)
+    while match:
+        depth, quote, end = 1, None, match.end()
+        while depth:
+            char = query[end]
+            if quote:
+                quote = None if char == quote else quote
+            elif char in "'\"":
+                quote = char
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            end += 1
+        args = _split_args(_replace_calls(query[match.end():end - 1], name, render))
+        replacement = render(args)
+        query = query[:match.start()] + replacement + query[end:]
+        match = pattern.search(query, match.start() + len(replacement))
+    return query
+
+def _strftime_format(mysql_format: str) -> str:
+    """Convert a quoted MySQL DATE_FORMAT pattern to strftime"""
+    return re.sub(r'%[a-zA-Z]', lambda m: DATE_FORMAT_SPECIFIERS.get(m.group(0), m.group(0)), mysql_format)
+
+def _interval(interval: str):
+    """Split 'INTERVAL 30 DAY' into ('30', 'DAY')"""
+    match = re.match(r'INTERVAL\s+(-?\d+)\s+(\w+)', interval.strip(), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return match.group(1), match.group(2).upper()
+
+def _outside_literals(query: str, rewrite: Callable[[str], str]) -> str:
+    """Apply rewrite to the parts of a query that are not string literals"""
+    parts = re.split(r"('(?:[^']|'')*')", query)
+    return ''.join(part if i % 2 else rewrite(part) for i, part in enumerate(parts))
+
+def translate(query: str, dialect: str) -> str:
+    """
+    Translate a MySQL query to another SQL dialect
+    
+    Handles the MySQL constructs the analytics queries use: DATE_FORMAT,
+    DATE_SUB/DATE_ADD with INTERVAL, NOW(), DATE(), CAST(... AS SIGNED),
+    backtick quoting, named %(name)s parameters and, for SQLite, integer division.
+    
+    Args:
+        query: MySQL query string
+        dialect: Target dialect, one of DIALECTS
+    
+    Returns:
+        str: Query for the target dialect
+    """
+    if dialect not in DIALECTS:
+        raise ValueError(f"Unknown SQL dialect: {dialect}")
+    if dialect == 'mysql':
+        return query
+    
+    query = _outside_literals(query, lambda part: re.sub(
+        r'%\((\w+)\)s', lambda m: PARAMETER_STYLES[dialect] + m.group(1), part.replace('`', '"')))
+    
+    if dialect == 'duckdb':
+        query = _replace_calls(query, 'DATE_FORMAT',
+                               lambda a: f"strftime({a[0]}, {_strftime_format(a[1])})")
+        for name, sign in (('DATE_SUB', '-'), ('DATE_ADD', '+')):
+            query = _replace_calls(query, name, lambda a, sign=sign: f"({a[0]} {sign} {a[1]})")
+        query = _replace_calls(query, 'NOW', lambda a: "CAST(NOW() AS TIMESTAMP)"
+                               if a == [''] else f"NOW({', '.join(a)})")
+        query = _replace_calls(query, 'DATE', lambda a: f"CAST({a[0]} AS DATE)")
+        query = re.sub(r'\bAS\s+SIGNED\b', 'AS BIGINT', query, flags=re.IGNORECASE)
+        return query
+    
+    # SQLite: dates are ISO text, so strftime/datetime() produce comparable strings
+    query = _replace_calls(query, 'DATE_FORMAT',
+                           lambda a: f"strftime({_strftime_format(a[1])}, {a[0]})")
+    for name, sign in (('DATE_SUB', '-'), ('DATE_ADD', '')):
+        def render(a, sign=sign):
+            amount, unit = _interval(a[1])
+            return f"datetime({a[0]}, '{sign}{amount} {SQLITE_UNITS[unit]}')"
+        query = _replace_calls(query, name, render)
+    query = _replace_calls(query, 'NOW', lambda a: "datetime('now', 'localtime')")
+    query = re.sub(r'\bAS\s+SIGNED\b', 'AS INTEGER', query, flags=re.IGNORECASE)
+    # MySQL '/' always returns a decimal, SQLite truncates integer operands
+    query = _outside_literals(query, lambda part: part.replace('/', ' * 1.0 /'))
+    return query
@@ -0,0 +1,348 @@
+"""
+Synthetic Data Generator for Course Platform Analytics
+Fills all six tables with seeded, vectorized data at a configurable scale factor
+"""
+
+import numpy as np
+import pandas as pd
+from database_connection import DatabaseConnection
+from import_csv_data import COURSE_COLUMN_MAP
+from typing import Dict, Optional
+import argparse
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Rows at scale factor 1; users, courses and all activity grow linearly with it
+BASE_USERS = 10000
+BASE_COURSES = 500
+
+CATEGORIES = ['Development', 'Business', 'Finance & Accounting', 'IT & Software', 'Office Productivity',
+              'Personal Development', 'Design', 'Marketing', 'Lifestyle', 'Photography & Video',
+              'Health & Fitness', 'Music']
+SUBJECTS = ['Web Development', 'Business Finance', 'Musical Instruments', 'Graphic Design']
+LEVELS = ['All Levels', 'Beginner Level', 'Intermediate Level', 'Expert Level']
+LEVEL_WEIGHTS = [0.52, 0.35, 0.11, 0.02]
+COUNTRIES = ['India', 'United States', 'United Kingdom', 'Germany', 'Brazil', 'Canada', 'Australia', 'Nigeria']
+COUNTRY_WEIGHTS = [0.3, 0.25, 0.1, 0.08, 0.08, 0.07, 0.07, 0.05]
+
+SUBSCRIPTION_TYPES = ['free', 'premium', 'pro']
+SUBSCRIPTION_WEIGHTS = [0.6, 0.28, 0.12]
+# Relative activity of each subscription type (enrollments, interactions)
+ACTIVITY_MULTIPLIER = np.array([0.7, 1.4, 2.0])
+# Mean days since the last login per subscription type, drives login recency
+LOGIN_RECENCY_DAYS = np.array([45.0, 15.0, 8.0])
+# Share of free users that never logged in
+NEVER_LOGGED_IN = 0.08
+
+PLAN_FEES = {'premium': 9.99, 'pro': 19.99}
+# Monthly probability that a subscription is not renewed, the churn curve per plan
+MONTHLY_CHURN = {'premium': 0.08, 'pro': 0.05}
+# Share of free users with a lapsed subscription in their history
+LAPSED_FREE_USERS = 0.1
+
+INTERACTION_TYPES = ['view', 'enroll', 'complete', 'rate', 'review']
+INTERACTION_WEIGHTS = [0.6, 0.15, 0.1, 0.1, 0.05]
+RATING_WEIGHTS = [0.03, 0.05, 0.12, 0.35, 0.45]
+
+HISTORY_DAYS = 1095
+
+def zipf_choice(rng: np.random.Generator, n_items: int, size: int, exponent: float = 1.1) -> np.ndarray:
+    """
+    Draw item indices with Zipfian popularity
+    
+    The item of popularity rank r is drawn with probability proportional to
+    1 / r**exponent. Ranks are assigned to items in random order, so the
+    popular items are not simply the lowest ids.
+    
+    Args:
+        rng: Random generator
+        n_items: Number of items
+        size: Number of draws
+        exponent: Zipf exponent, larger is more skewed
+    
+    Returns:
+        np.ndarray: Item indices in [0, n_items)
+    """
+    cdf = np.cumsum(1.0 / np.arange(1, n_items + 1) ** exponent)
+    ranks = np.searchsorted(cdf, rng.random(size) * cdf[-1])
+    return rng.permutation(n_items)[np.minimum(ranks, n_items - 1)]
+
+def _between(rng: np.random.Generator, start: pd.Series, end: pd.Timestamp) -> np.ndarray:
+    """Uniform random timestamps, to the second, between each start and a common end"""
+    start_s = start.values.astype('datetime64[s]').astype(np.int64)
+    end_s = np.int64(end.value // 10**9)
+    return (start_s + (rng.random(len(start_s)) * (end_s - start_s)).astype(np.int64)).astype('datetime64[s]')
+
+def generate_categories() -> pd.DataFrame:
+    """Build the fixed category table"""
+    return pd.DataFrame({
+        'cat_id': np.arange(1, len(CATEGORIES) + 1, dtype=np.int32),
+        'cat_name': CATEGORIES,
+        'description': [f"{name} courses" for name in CATEGORIES],
+        'created_at': pd.Timestamp('2020-01-01')
+    })
+
+def generate_courses(rng: np.random.Generator, n_courses: int, now: pd.Timestamp) -> pd.DataFrame:
+    """Build the course table with udemy-like prices, levels and subjects"""
+    course_id = np.arange(1, n_courses + 1, dtype=np.int32)
+    subject = rng.choice(SUBJECTS, n_courses)
+    level = rng.choice(LEVELS, n_courses, p=LEVEL_WEIGHTS)
+    is_paid = rng.random(n_courses) < 0.9
+    instructors = max(n_courses // 5, 1)
+    
+    return pd.DataFrame({
+        'course_id': course_id,
+        'course_title': pd.Series(subject).str.cat(course_id.astype(str), sep=' Course '),
+        'course_url': [f"https://www.udemy.com/course-{i}/" for i in course_id],
+        'price': np.where(is_paid, rng.choice([20, 50, 100, 150, 200], n_courses), 0).astype(np.float64),
+        'num_subscription': rng.lognormal(7, 1.5, n_courses).astype(np.int32),
+        'num_review': rng.lognormal(4, 1.5, n_courses).astype(np.int32),
+        'num_lec': rng.integers(5, 300, n_courses, dtype=np.int32),
+        'level': level,
+        'content_duration': np.round(rng.gamma(2.0, 2.5, n_courses), 1),
+        'publised_timestamp': now - pd.to_timedelta(rng.integers(0, 6 * 365, n_courses), unit='D'),
+        'subject': subject,
+        'instructor_name': [f"Instructor {i}" for i in zipf_choice(rng, instructors, n_courses) + 1],
+        'is_paid': is_paid,
+        'cat_id': rng.integers(1, len(CATEGORIES) + 1, n_courses, dtype=np.int32),
+        'created_at': now
+    })
+
+def generate_users(rng: np.random.Generator, n_users: int, now: pd.Timestamp) -> pd.DataFrame:
+    """
+    Build the user table
+    
+    Registrations grow exponentially over HISTORY_DAYS. Days since the last
+    login are exponential with a mean per subscription type, and users that
+    last logged in more than 90 days ago are inactive.
+    """
+    user_id = np.arange(1, n_users + 1, dtype=np.int32)
+    type_index = rng.choice(len(SUBSCRIPTION_TYPES), n_users, p=SUBSCRIPTION_WEIGHTS)
+    
+    # Inverse CDF of a density proportional to exp(growth * t) on [0, 1]
+    growth = 2.0
+    t = np.log1p(rng.random(n_users) * np.expm1(growth)) / growth
+    regi_date = (now - pd.to_timedelta((1 - t) * HISTORY_DAYS, unit='D')).floor('s').to_numpy()
+    
+    recency = pd.to_timedelta(rng.exponential(LOGIN_RECENCY_DAYS[type_index]), unit='D')
+    last_login = pd.Series(np.maximum((now - recency).floor('s').to_numpy(), regi_date))
+    never = (type_index == 0) & (rng.random(n_users) < NEVER_LOGGED_IN)
+    last_login[never] = pd.NaT
+    
+    return pd.DataFrame({
+        'user_id': user_id,
+        'userName': np.char.add('user', user_id.astype(str)),
+        'email': np.char.add(np.char.add('user', user_id.astype(str)), '@example.com'),
+        'first_name': 'First',
+        'last_name': 'Last',
+        'subscription_type': np.array(SUBSCRIPTION_TYPES)[type_index],
+        'regi_date': regi_date,
+        'last_login': last_login,
+        'country': rng.choice(COUNTRIES, n_users, p=COUNTRY_WEIGHTS),
+        'is_active': (now - last_login).dt.days.lt(90).to_numpy()
+    })
+
+def generate_enrollments(rng: np.random.Generator, users: pd.DataFrame, n_courses: int,
+                         per_user: float, now: pd.Timestamp) -> pd.DataFrame:
+    """Build erp with Zipfian course popularity and progress-driven completion and ratings"""
+    type_index = pd.Categorical(users['subscription_type'], categories=SUBSCRIPTION_TYPES).codes
+    counts = rng.poisson(per_user * ACTIVITY_MULTIPLIER[type_index])
+    rows = int(counts.sum())
+    
+    user_rows = np.repeat(np.arange(len(users)), counts)
+    progress = rng.integers(1, 100, rows, dtype=np.int32)
+    outcome = rng.random(rows)
+    progress[outcome < 0.3] = 100
+    progress[(outcome >= 0.3) & (outcome < 0.45)] = 0
+    status = np.where(progress == 100, 'completed', np.where(progress == 0, 'not_started', 'in_progress'))
+    
+    rated = rng.random(rows) < np.where(progress == 100, 0.8, 0.2)
+    rating = pd.array(rng.choice(np.arange(1, 6), rows, p=RATING_WEIGHTS), dtype='Int32')
+    rating[~rated] = pd.NA
+    
+    return pd.DataFrame({
+        'erp_id': np.arange(1, rows + 1, dtype=np.int32),
+        'user_id': users['user_id'].to_numpy()[user_rows],
+        'course_id': (zipf_choice(rng, n_courses, rows) + 1).astype(np.int32),
+        'erp_date': _between(rng, users['regi_date'].iloc[user_rows], now),
+        'completion_status': status,
+        'progress_per': progress,
+        'rating_given': rating
+    })
+
+def generate_subscriptions(rng: np.random.Generator, users: pd.DataFrame, now: pd.Timestamp) -> pd.DataFrame:
+    """
+    Build subscriptions following a per-plan churn curve
+    
+    Every paid user has a subscription for their plan and some free users
+    have a lapsed one. Tenure in months is geometric with the plan's monthly
+    churn, so subscriptions still running today are active and ended ones are
+    cancelled or expired.
+    """
+    paid = users['subscription_type'].ne('free').to_numpy()
+    lapsed = ~paid & (rng.random(len(users)) < LAPSED_FREE_USERS)
+    owners = users[paid | lapsed]
+    n = len(owners)
+    
+    plan_type = np.where(owners['subscription_type'].eq('free'),
+                         rng.choice(list(PLAN_FEES), n), owners['subscription_type'])
+    churn = np.vectorize(MONTHLY_CHURN.get)(plan_type)
+    tenure_days = rng.geometric(churn) * 30
+    
+    start = pd.Series(_between(rng, owners['regi_date'], now))
+    end = start + pd.to_timedelta(tenure_days, unit='D')
+    running = (end > now).to_numpy() & owners['subscription_type'].ne('free').to_numpy()
+    # Lapsed free users' subscriptions ended before today
+    end = end.where(running | (end <= now), now - pd.to_timedelta(rng.integers(1, 30, n), unit='D'))
+    end = end.where(end > start, start + pd.Timedelta(days=1))
+    
+    status = np.where(running, 'active', np.where(rng.random(n) < 0.6, 'cancelled', 'expired'))
+    
+    return pd.DataFrame({
+        'subscription_id': np.arange(1, n + 1, dtype=np.int32),
+        'user_id': owners['user_id'].to_numpy(),
+        'plan_type': plan_type,
+        'start_date': start.dt.normalize(),
+        'end_date': end.dt.normalize(),
+        'monthely_fee': np.vectorize(PLAN_FEES.get)(plan_type),
+        'status': status
+    })
+
+def generate_interactions(rng: np.random.Generator, users: pd.DataFrame, n_courses: int,
+                          per_user: float, now: pd.Timestamp) -> pd.DataFrame:
+    """Build course_interactions with heavy-tailed per-user activity and Zipfian courses"""
+    type_index = pd.Categorical(users['subscription_type'], categories=SUBSCRIPTION_TYPES).codes
+    # Lognormal activity with mean 1 gives a few very active users
+    activity = rng.lognormal(-0.5, 1.0, len(users)) * ACTIVITY_MULTIPLIER[type_index]
+    counts = rng.poisson(per_user * activity)
+    rows = int(counts.sum())
+    user_rows = np.repeat(np.arange(len(users)), counts)
+    
+    return pd.DataFrame({
+        'interaction_id': np.arange(1, rows + 1, dtype=np.int32),
+        'user_id': users['user_id'].to_numpy()[user_rows],
+        'course_id': (zipf_choice(rng, n_courses, rows) + 1).astype(np.int32),
+        'interaction_type': rng.choice(INTERACTION_TYPES, rows, p=INTERACTION_WEIGHTS),
+        'interaction_data': _between(rng, users['regi_date'].iloc[user_rows], now),
+        'session_duration': np.ceil(rng.lognormal(2.5, 0.8, rows)).astype(np.int32)
+    })
+
+def generate_tables(scale_factor: float = 1, seed: int = 42, enrollments_per_user: float = 5,
+                    interactions_per_user: float = 10,
+                    now: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Generate all six tables
+    
+    Scale factor 1 is 10,000 users and 500 courses. The same seed and scale
+    factor always produce the same rows (relative to now).
+    
+    Args:
+        scale_factor: Multiplier of the users, courses and activity
+        seed: Random seed
+        enrollments_per_user: Mean enrollments of a user before the subscription multiplier
+        interactions_per_user: Mean interactions of a user before the subscription multiplier
+        now: Reference time for dates, defaults to the current time
+    
+    Returns:
+        dict: table name -> DataFrame, in foreign key order
+    """
+    rng = np.random.default_rng(seed)
+    now = (now or pd.Timestamp.now()).floor('s')
+    n_users = max(int(BASE_USERS * scale_factor), 1)
+    n_courses = max(int(BASE_COURSES * scale_factor), 1)
+    
+    started = time.perf_counter()
+    tables = {'cat': generate_categories(), 'course': generate_courses(rng, n_courses, now)}
+    tables['user'] = generate_users(rng, n_users, now)
+    tables['erp'] = generate_enrollments(rng, tables['user'], n_courses, enrollments_per_user, now)
+    tables['subscriptions'] = generate_subscriptions(rng, tables['user'], now)
+    tables['course_interactions'] = generate_interactions(rng, tables['user'], n_courses,
+                                                          interactions_per_user, now)
+    
+    sizes = ', '.join(f"{table} {len(df)}" for table, df in tables.items())
+    logger.info(f"Generated scale factor {scale_factor} in {time.perf_counter() - started:.2f}s: {sizes}")
+    return tables
+
+def write_snapshot(tables: Dict[str, pd.DataFrame], snapshot_dir: str, fmt: str = 'parquet'):
+    """
+    Write the tables as a snapshot that EmbeddedConnection can load
+    
+    Args:
+        tables: Tables from generate_tables()
+        snapshot_dir: Output directory
+        fmt: 'parquet' or 'csv'
+    """
+    if not os.path.exists(snapshot_dir):
+        os.makedirs(snapshot_dir)
+    for table, df in tables.items():
+        path = os.path.join(snapshot_dir, f"{table}.{fmt}")
+        if fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+    logger.info(f"Wrote {len(tables)} tables to {snapshot_dir}")
+
+def write_udemy_csv(courses: pd.DataFrame, path: str):
+    """
+    Write courses in the udemy_courses.csv layout, as input for the importer
+    
+    Args:
+        courses: Course table from generate_tables()
+        path: Output CSV path
+    """
+    udemy = courses.rename(columns={column: source for source, column in COURSE_COLUMN_MAP.items()})
+    udemy['published_timestamp'] = udemy['published_timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    udemy[list(COURSE_COLUMN_MAP)].to_csv(path, index=False)
+
+def load_into_database(db: DatabaseConnection, tables: Dict[str, pd.DataFrame], batch_size: int = 10000):
+    """
+    Replace the contents of a stand-in MySQL database with the generated tables
+    
+    Existing rows are deleted children first and the tables are filled
+    parents first. Only use this on a scratch database.
+    
+    Args:
+        db: Connected DatabaseConnection to the stand-in database
+        tables: Tables from generate_tables()
+        batch_size: Rows per executemany batch and commit
+    """
+    with db.checkout() as connection:
+        cursor = connection.cursor()
+        try:
+            for table in reversed(list(tables)):
+                cursor.execute(f"DELETE FROM `{table}`")
+            connection.commit()
+            
+            for table, df in tables.items():
+                started = time.perf_counter()
+                insert = (f"INSERT INTO `{table}` ({', '.join(f'`{column}`' for column in df.columns)}) "
+                          f"VALUES ({', '.join(['%s'] * len(df.columns))})")
+                values = df.astype(object).where(df.notna(), None)
+                for offset in range(0, len(values), batch_size):
+                    batch = values.iloc[offset:offset + batch_size]
+                    cursor.executemany(insert, list(batch.itertuples(index=False, name=None)))
+                    connection.commit()
+                logger.info(f"Loaded {len(df)} rows into {table} in {time.perf_counter() - started:.2f}s")
+        finally:
+            cursor.close()
+
+def main():
+    """Generate a synthetic snapshot from the command line"""
+    parser = argparse.ArgumentParser(description="Generate synthetic course platform data")
+    parser.add_argument('snapshot_dir', help="Directory the <table>.parquet files are written to")
+    parser.add_argument('--scale-factor', type=float, default=1, help="1 = 10,000 users and 500 courses")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args()
+    
+    tables = generate_tables(args.scale_factor, args.seed)
+    write_snapshot(tables, args.snapshot_dir, args.format)
+    write_udemy_csv(tables['course'], os.path.join(args.snapshot_dir, 'udemy_courses_synthetic.csv'))
+    print(f"[SUCCESS] Wrote scale factor {args.scale_factor} snapshot to {args.snapshot_dir}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()